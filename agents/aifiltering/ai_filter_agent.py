@@ -1,5 +1,8 @@
 # agents/aifiltering/ai_filter_agent.py
 from utils.llm_utils import call_llm
+from utils.log_utils import get_logger
+
+log = get_logger("ai_filter")
 
 class AIFilterAgent:
     def __init__(self, primary_groq_model="llama3-8b-8192", fallback_or_model=None): # Renamed for clarity
@@ -8,7 +11,8 @@ class AIFilterAgent:
         self.fallback_openrouter_model_for_agent = fallback_or_model 
         # If fallback_or_model is None, call_llm will use the .env default for OpenRouter fallback
 
-    def is_about_ai(self, title: str, summary: str) -> bool:
+    def is_about_ai(self, title: str, summary: str) -> bool | None:
+        """True/False for the LLM's yes/no answer; None if the LLM call failed (nothing worth keeping)."""
         # Truncate to stay within context limits. Adjust these values as needed.
         # Consider that the prompt itself adds tokens.
         max_title_chars = 200
@@ -23,7 +27,7 @@ class AIFilterAgent:
         # Truncate summary if it's too long
         if len(summary) > max_summary_chars_for_filtering:
             trimmed_summary = summary[:max_summary_chars_for_filtering] + " [SUMMARY TRUNCATED]"
-            print(f"[AIFilterAgent] Summary truncated for title: {trimmed_title[:50]}...")
+            log.debug("Summary truncated for title: %s...", trimmed_title[:50])
         else:
             trimmed_summary = summary
 
@@ -41,13 +45,11 @@ class AIFilterAgent:
                 fallback_openrouter_model_override=self.fallback_openrouter_model_for_agent
             ).strip().lower()
 
-            if "Error:" in response_content: # Check if call_llm returned an error message
-                print(f"[AIFilterAgent] LLM call failed during AI relevance check: {response_content} for title: {trimmed_title[:50]}")
-                return False # Default to False on error
+            if response_content.startswith("error:"): # call_llm returned an error message (lowercased above)
+                log.warning("LLM call failed during AI relevance check: %s for title: %s", response_content, trimmed_title[:50])
+                return None
             
             return response_content.startswith("yes")
         except Exception as e: # Catch any other unexpected exceptions from strip(), lower() etc.
-            print(f"[AIFilterAgent] Unexpected error during AI relevance check: {e} for title: {trimmed_title[:50]}")
-            import traceback
-            traceback.print_exc()
-            return False
+            log.error("Unexpected error during AI relevance check: %s for title: %s", e, trimmed_title[:50], exc_info=True)
+            return None
@@ -1,8 +1,6 @@
 # BittyNews/agents/scraper/scraper_agent.py
 
 import feedparser
-from bs4 import BeautifulSoup
-from newspaper import Article, Config
 import time
 import os
 
@@ -11,7 +9,15 @@ import os
 # For direct script running (python agents/scraper/scraper_agent.py), sys.path needs BittyNews/.
 try:
     from utils.source_loader import load_sources
-    from utils.db_utils import add_article
+    from utils.db_utils import upsert_article, get_source_health_states, save_feed_validators
+    from utils import health_utils
+    from utils import poll_utils
+    from utils import metrics_utils
+    from utils import profile_utils
+    from utils import cassette_utils
+    from utils import http_utils
+    from utils.log_utils import get_logger, get_article_logger
+    from utils.settings import get_settings
 except ImportError:
     # Fallback for direct execution if sys.path isn't set up yet by a top-level script
     # This assumes scraper_agent.py is in agents/scraper/ and utils is in ../../utils
@@ -26,27 +32,44 @@ except ImportError:
         sys.path.insert(0, project_root_for_direct_run)
     
     from source_loader import load_sources # Now should work if utils_path was added
-    from db_utils import add_article
+    from db_utils import upsert_article, get_source_health_states, save_feed_validators
+    import health_utils
+    import poll_utils
+    import metrics_utils
+    import profile_utils
+    import cassette_utils
+    import http_utils
+    from log_utils import get_logger, get_article_logger
+    from settings import get_settings
+
+log = get_logger("scraper")
+article_log = get_article_logger("scraper")
 
 
 class ScraperAgent:
     def __init__(self):
+        settings = get_settings()
         self.sources = load_sources()
-        self.user_agent = os.getenv("SCRAPER_USER_AGENT", "BittyNewsFetcher/1.0 (+https://your-project-url.com)") # Update your project URL
-        self.request_timeout = int(os.getenv("SCRAPER_REQUEST_TIMEOUT", 15))
-        self.article_fetch_delay = float(os.getenv("ARTICLE_FETCH_DELAY_SECONDS", 2.0))
-        self.rss_fallback_threshold = int(os.getenv("RSS_CONTENT_FALLBACK_THRESHOLD", 150)) # Min chars from newspaper3k
+        self.user_agent = settings.scraper_user_agent # Update your project URL (SCRAPER_USER_AGENT)
+        self.request_timeout = settings.scraper_request_timeout
+        self.article_fetch_delay = settings.article_fetch_delay_seconds
+        self.rss_fallback_threshold = settings.rss_content_fallback_threshold # Min chars from newspaper3k
+        self.article_max_bytes = settings.article_max_bytes
+        self.article_ttfb = settings.article_ttfb_seconds
+        self._config = None # newspaper3k Config, built on the first full-text fetch
 
         if not self.sources:
-            print("DEBUG ScraperAgent: No sources loaded. Check utils/source_loader.py and sources.yml.")
-        print(f"DEBUG ScraperAgent: Initialized with {len(self.sources)} configured sources.")
+            log.warning("No sources loaded. Check utils/source_loader.py and sources.yml.")
+        log.debug("Initialized with %d configured sources.", len(self.sources))
 
     def _get_text_from_html(self, html_content: str) -> str:
         """Safely extracts plain text from HTML content using BeautifulSoup."""
         if not html_content: return ""
         try:
-            soup = BeautifulSoup(html_content, "html.parser")
-            return soup.get_text(separator=" ", strip=True)
+            from bs4 import BeautifulSoup # Deferred: only needed once a feed actually has entries
+            with profile_utils.span("bs4"):
+                soup = BeautifulSoup(html_content, "html.parser")
+                return soup.get_text(separator=" ", strip=True)
         except Exception: return ""
 
     def _get_content_from_rss_entry(self, entry) -> str:
@@ -62,51 +85,159 @@ class ScraperAgent:
         if not content_html and hasattr(entry, 'description') and entry.description: content_html = entry.description
         return self._get_text_from_html(content_html)
 
-    def _fetch_full_article_text_with_newspaper3k(self, url: str) -> str:
-        """Attempts to download and parse full article text using newspaper3k."""
-        if not url: return ""
+    def _fetch_full_article_text_with_newspaper3k(self, url: str) -> tuple[str, str | None]:
+        """
+        Attempts to download and parse full article text using newspaper3k. Returns (text, abort
+        reason); the reason is set when the download was given up on (see http_utils.fetch_bounded).
+
+        The page is streamed over the shared keep-alive session (newspaper3k's own download opens
+        a new connection per article and reads any body whole), bounded by ARTICLE_MAX_BYTES and
+        ARTICLE_TTFB_SECONDS, and handed to newspaper3k as HTML.
+        """
+        if not url: return "", None
+        started = time.perf_counter()
         try:
+            from newspaper import Article # Deferred: a poll where no source is due never loads it
+            with profile_utils.span("newspaper3k_download"):
+                response, content = http_utils.fetch_bounded(
+                    url, headers={"User-Agent": self.user_agent}, timeout=self.request_timeout,
+                    max_bytes=self.article_max_bytes, ttfb_seconds=self.article_ttfb)
+                html = http_utils.decoded_html(response, content)
+            if not html: # Empty page
+                metrics_utils.FULLTEXT_FETCHES.inc(outcome="no_html")
+                return "", None
+            article_parser = Article(url, config=self._newspaper_config())
+            article_parser.download(input_html=html)
+            with profile_utils.span("newspaper3k_parse"):
+                article_parser.parse()
+            metrics_utils.FULLTEXT_FETCHES.inc(outcome="ok")
+            return (article_parser.text.strip() if article_parser.text else ""), None
+        except http_utils.DownloadAborted as e:
+            if e.reason.startswith("http_"): # An error page, not a bound hit
+                metrics_utils.FULLTEXT_FETCHES.inc(outcome="no_html")
+                return "", None
+            metrics_utils.FULLTEXT_FETCHES.inc(outcome=f"aborted_{e.reason}")
+            article_log.warning("  Gave up on article page %s (%s)", url, e)
+            return "", e.reason
+        except Exception as e:
+            metrics_utils.FULLTEXT_FETCHES.inc(outcome="error")
+            log.warning("newspaper3k EXCEPTION for URL '%s'. Error: %s - %s", url, type(e).__name__, e)
+            return "", None
+        finally:
+            metrics_utils.FULLTEXT_FETCH_SECONDS.observe(time.perf_counter() - started)
+
+    def _newspaper_config(self):
+        """The newspaper3k Config, built once and shared by every article this agent parses."""
+        if self._config is None:
+            from newspaper import Config
             config = Config()
             config.browser_user_agent = self.user_agent
             config.request_timeout = self.request_timeout
             config.fetch_images = False
             config.memoize_articles = False
+            self._config = config
+        return self._config
 
-            article_parser = Article(url, config=config)
-            article_parser.download()
-            if not article_parser.html: return "" # Download failed or no HTML
-            article_parser.parse()
-            return article_parser.text.strip() if article_parser.text else ""
-        except Exception as e:
-            print(f"WARNING ScraperAgent: newspaper3k EXCEPTION for URL '{url}'. Error: {type(e).__name__} - {e}")
-            return ""
+    def _download_feed(self, feed_url: str, poll_state: dict | None = None):
+        """
+        Feed download bounded by request_timeout (feedparser's own fetching has none), made
+        conditional on the ETag / Last-Modified stored in `poll_state`. A 304 answer yields an
+        empty feed with status 304, as feedparser's own fetching does.
 
-    def fetch(self) -> tuple[int, int]:
-        """Fetches articles, gets content, adds new ones to DB. Returns (total_items, new_items)."""
+        Returns:
+            tuple: (feed, seconds, (etag, last_modified) to send next time)
+        """
+        headers = {"User-Agent": self.user_agent}
+        etag, last_modified = (poll_state["etag"], poll_state["last_modified"]) if poll_state else (None, None)
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+        started = time.perf_counter()
+        try:
+            with profile_utils.span("feed_download"):
+                response = http_utils.get_session().get(feed_url, headers=headers, timeout=self.request_timeout)
+        except Exception:
+            metrics_utils.FEED_FETCHES.inc(status="error")
+            raise
+        latency = time.perf_counter() - started
+        metrics_utils.FEED_FETCHES.inc(status=response.status_code)
+        metrics_utils.FEED_FETCH_SECONDS.observe(latency)
+        validators = (response.headers.get("ETag") or etag, response.headers.get("Last-Modified") or last_modified)
+        if response.status_code == 304:
+            return feedparser.FeedParserDict(bozo=False, entries=[], status=304), latency, validators
+        response.raise_for_status()
+        with profile_utils.span("feedparser"):
+            feed = feedparser.parse(response.content, response_headers={"content-type": response.headers.get("Content-Type", "")})
+        return feed, latency, (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def fetch(self, all_sources: bool = False, on_article=None, stop_event=None) -> tuple[int, int]:
+        """
+        Fetches articles, gets content, adds new ones to DB. Returns (total_items, new_items).
+        Only sources due per their adaptive poll schedule (utils/poll_utils.py) and not quarantined
+        for repeated failures (utils/health_utils.py) are fetched, unless `all_sources` is set.
+        Each fetched source's new-article count updates its schedule, and its latency, errors and
+        full-text extraction results update its health.
+
+        `on_article(article_data)` is called for each article stored as new or changed, right after
+        it is written (pipeline.py streams them to the filter stage; a blocking callback throttles
+        the scraper). If `stop_event` is set, the fetch stops after the current article.
+        """
         newly_added_count, total_items_from_feeds = 0, 0
+        refreshed_count = 0 # Existing articles whose content changed since they were stored
         if not self.sources: return 0, 0
 
-        print(f"🔎 ScraperAgent: Starting fetch from {len(self.sources)} sources...")
-        for source_config in self.sources:
+        sources, poll_states = poll_utils.due_sources(self.sources)
+        health_states = get_source_health_states()
+        if all_sources:
+            sources = self.sources
+        else:
+            metrics_utils.FEEDS_SKIPPED.inc(len(self.sources) - len(sources), reason="not_due")
+            quarantined = [src for src in sources if health_utils.is_quarantined(health_states.get(src.get("name")))]
+            for src in quarantined:
+                log.debug("Skipping %s: quarantined until %s (UTC).", src.get('name'), health_states[src.get('name')]['quarantined_until'])
+            metrics_utils.FEEDS_SKIPPED.inc(len(quarantined), reason="quarantined")
+            sources = [src for src in sources if src not in quarantined]
+        if not sources:
+            log.info("✅ ScraperAgent: None of the %d sources is due for a poll yet.", len(self.sources))
+            return 0, 0
+
+        log.info("🔎 ScraperAgent: Starting fetch from %d of %d sources...", len(sources), len(self.sources))
+        for source_config in sources:
+            if stop_event is not None and stop_event.is_set(): break
             feed_url, source_name = source_config.get("url"), source_config.get("name", "Unknown Source")
             if not feed_url: continue
 
-            print(f"📡 Fetching RSS: {source_name} ({feed_url})")
+            log.info("📡 Fetching RSS: %s (%s)", source_name, feed_url)
+            health = health_states.get(source_name)
+            # Sources whose article pages keep failing to extract: probe one page per poll, use feed content otherwise
+            fulltext_for_all = health_utils.fulltext_worthwhile(health)
+            source_new_count, fulltext_attempts, fulltext_successes, fulltext_aborts = 0, 0, 0, 0
+            latency, error, bozo, validators = None, None, False, None
             try:
-                feed = feedparser.parse(feed_url, agent=self.user_agent)
-                if feed.bozo: print(f"WARNING ScraperAgent: Malformed feed for {source_name}: {feed.get('bozo_exception', 'Unknown')}")
-                if not feed.entries: continue
+                feed, latency, validators = self._download_feed(feed_url, poll_states.get(source_name))
+                if feed.get("status") == 304: log.info("  Not modified since the last poll.")
+                bozo = bool(feed.bozo)
+                if feed.bozo: log.warning("Malformed feed for %s: %s", source_name, feed.get('bozo_exception', 'Unknown'))
+                if feed.bozo and not feed.entries:
+                    error = f"Unusable feed: {feed.get('bozo_exception', 'Unknown')}"
                 
                 total_items_from_feeds += len(feed.entries)
                 for entry in feed.entries:
+                    if stop_event is not None and stop_event.is_set(): break
                     article_link = entry.get("link")
                     entry_title = entry.get('title', 'No Title Provided').strip()
                     if not article_link: continue
 
-                    print(f"  Processing: {entry_title[:60]}...")
-                    time.sleep(self.article_fetch_delay)
-
-                    main_content = self._fetch_full_article_text_with_newspaper3k(article_link)
+                    article_log.info("  Processing: %s...", entry_title[:60])
+                    main_content, content_source = "", "feed"
+                    if fulltext_for_all or not fulltext_attempts:
+                        if not cassette_utils.replaying():
+                            time.sleep(self.article_fetch_delay)
+                        main_content, aborted = self._fetch_full_article_text_with_newspaper3k(article_link)
+                        fulltext_attempts += 1
+                        if aborted: fulltext_aborts += 1
+                        if len(main_content) >= self.rss_fallback_threshold:
+                            fulltext_successes += 1
+                            content_source = "fulltext"
                     if not main_content or len(main_content) < self.rss_fallback_threshold:
                         rss_content = self._get_content_from_rss_entry(entry)
                         if len(rss_content) > len(main_content if main_content else ""):
@@ -115,14 +246,34 @@ class ScraperAgent:
 
                     article_data = {
                         "link": article_link, "title": entry_title, "source_name": source_name,
-                        "original_summary": main_content,
+                        "original_summary": main_content, "content_source": content_source,
                         "published": entry.get("published"), "published_parsed": entry.get("published_parsed")
                     }
-                    if add_article(article_data): newly_added_count += 1
+                    with profile_utils.span("db_upsert"):
+                        upsert_result = upsert_article(article_data)
+                    metrics_utils.ARTICLES_PARSED.inc(result=upsert_result)
+                    if upsert_result == "inserted": source_new_count += 1
+                    elif upsert_result == "updated": refreshed_count += 1
+                    if on_article is not None and upsert_result in ("inserted", "updated"):
+                        on_article(article_data)
             except Exception as e:
-                print(f"❌ ERROR ScraperAgent: Processing feed for {source_name}. Error: {e}")
+                error = f"{type(e).__name__}: {e}"
+                log.error("Processing feed for %s. Error: %s", source_name, e, extra={"source": source_name})
+            newly_added_count += source_new_count
+            health_utils.record_feed_result(source_name, health, latency, error=error, bozo=bozo,
+                                            fulltext_attempts=fulltext_attempts, fulltext_successes=fulltext_successes,
+                                            fulltext_aborts=fulltext_aborts)
+            if error:
+                continue  # Quarantine handles the backoff; a failed poll says nothing about the feed's update rate
+            next_interval = poll_utils.record_poll(source_name, source_new_count, poll_states.get(source_name))
+            poll_state = poll_states.get(source_name) or {}
+            if validators != (poll_state.get("etag"), poll_state.get("last_modified")):
+                save_feed_validators(source_name, *validators)
+            log.debug("%s: %d new in %.2fs; next poll in %.0f min.", source_name, source_new_count, latency, next_interval / 60,
+                      extra={"source": source_name, "new_items": source_new_count, "seconds": round(latency, 3)})
         
-        print(f"✅ ScraperAgent: Processed {total_items_from_feeds} feed items. Added {newly_added_count} new articles.")
+        log.info("✅ ScraperAgent: Processed %d feed items. Added %d new articles, refreshed %d changed ones.",
+                 total_items_from_feeds, newly_added_count, refreshed_count)
         return total_items_from_feeds, newly_added_count
 
 # To test this script directly (e.g., python agents/scraper/scraper_agent.py):
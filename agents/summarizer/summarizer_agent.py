@@ -1,5 +1,8 @@
 # agents/summarizer/summarizer_agent.py
 from utils.llm_utils import call_llm # Assuming call_llm is in BittyNews/utils/llm_utils.py
+from utils.log_utils import get_logger
+
+log = get_logger("summarizer")
 
 class SummarizerAgent:
     def __init__(self, 
@@ -43,10 +46,10 @@ class SummarizerAgent:
                 trimmed_content = content_to_summarize[:100] + " [CONTENT HEAVILY TRUNCATED]"
             
             input_for_llm = f"Title: {trimmed_title}\n\nContent: {trimmed_content}"
-            print(f"[SummarizerAgent] Input content truncated for title: {trimmed_title[:50]}...")
+            log.debug("Input content truncated for title: %s...", trimmed_title[:50])
         
         if content_to_summarize == "No content available for summarization." or not content_to_summarize.strip():
-            print(f"[SummarizerAgent] No content to summarize for title: {trimmed_title[:50]}")
+            log.warning("No content to summarize for title: %s", trimmed_title[:50])
             return "[Summary N/A - No content provided]"
 
         prompt = (
@@ -63,7 +66,7 @@ class SummarizerAgent:
         )
 
         if "Error:" in summary_text:
-            print(f"[SummarizerAgent] LLM call failed during summarization. Title: {trimmed_title[:50]}... Details: {summary_text}")
+            log.warning("LLM call failed during summarization. Title: %s... Details: %s", trimmed_title[:50], summary_text)
             # Return a more specific error indicating which step failed
             return f"[Summary unavailable due to LLM error: {summary_text.replace('Error: ', '')}]"
         
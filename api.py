@@ -0,0 +1,412 @@
+# BittyNews/api.py
+"""
+Local HTTP API over the article database, for a reader UI (planning/roadmapv11.md, Phase 3).
+
+    python bittynews.py serve        (or: python api.py --port 8088)
+
+    GET  /articles?limit=50&cursor=...&source=...&relevant=yes|no&saved=yes|no&interesting=yes|no
+    GET  /articles/{id}                      One article, body included
+    POST /articles/{id}/save                 Optional body {"value": false} to unsave
+    POST /articles/{id}/mark_interesting     Optional body {"value": false}
+    POST /articles/flags                     {"updates": [{"id": 1, "saved": true, "interesting": false}, ...]}
+    GET  /metrics                            Prometheus text format
+
+Listings are newest fetched first and paginated by cursor: each page returns `next_cursor`, an
+opaque (fetched_at, id) keyset position. A deep page costs the same as the first, and articles
+stored while a reader pages never shift or repeat what it sees.
+
+Reads: every GET answer carries a strong ETag. A request whose If-None-Match matches gets
+304 Not Modified with no body. Encoded answers are kept in an in-process LRU cache
+(API_CACHE_ENTRIES) keyed by path and normalized query. Before each request,
+PRAGMA data_version (db_utils.DataVersion) tells whether anything was committed to the
+database since the last check, by any process: the pipeline, the daemon or this API's own
+writes. If so, the whole cache is dropped. A reader never gets an answer older than the last commit.
+
+Writes: flag updates from concurrent requests are queued and applied by one writer thread, which
+applies everything queued in a single transaction (group commit). N clients marking articles
+at once pay for about one commit, not N. A request returns once its update is committed.
+
+There is no authentication, so the API binds to 127.0.0.1 unless API_HOST says otherwise.
+"""
+import base64
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from utils.settings import get_settings
+get_settings() # Load .env before the modules below read their import-time configuration (DATABASE_NAME, ...)
+
+from utils import db_utils
+from utils import metrics_utils
+from utils.log_utils import get_logger
+
+log = get_logger("api")
+
+# --- API Configuration ---
+MAX_PAGE_SIZE = 200            # ?limit= above this is clamped
+MAX_BODY_BYTES = 1_000_000     # Larger POST bodies are refused (413)
+WRITE_BATCH_MAX = 500          # Flag updates applied per write transaction, at most
+SQLITE_MAX_INTEGER = 2**63 - 1 # Larger ids don't fit SQLite's INTEGER (OverflowError on bind)
+_BOOLEAN_COLUMNS = ("is_ai_relevant", "user_saved", "user_marked_interesting")
+_CHOICES = {"yes": True, "no": False, "any": None, "true": True, "false": False, "1": True, "0": False}
+_ARTICLE_PATH = re.compile(r"^/articles/(\d+)$")
+_FLAG_PATH = re.compile(r"^/articles/(\d+)/(save|mark_interesting)$")
+_FLAG_COLUMNS = {"save": "saved", "mark_interesting": "interesting"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(fetched_at: str, article_id: int) -> str:
+    raw = json.dumps([fetched_at, article_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        fetched_at, article_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(fetched_at, str):
+            raise TypeError("fetched_at must be a string")
+        return fetched_at, _article_id(article_id)
+    except (ValueError, TypeError, OverflowError, ApiError) as e:
+        raise ApiError(400, "Invalid cursor") from e
+
+
+def _article_json(row) -> dict:
+    article = dict(row)
+    for column in _BOOLEAN_COLUMNS:
+        if article.get(column) is not None:
+            article[column] = bool(article[column])
+    return article
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseCache:
+    """LRU cache of encoded GET answers, dropped as a whole whenever the database's data_version moves."""
+    def __init__(self, max_entries: int, data_version: "db_utils.DataVersion"):
+        self.max_entries = max_entries
+        self._data_version = data_version
+        self._entries = OrderedDict()  # key -> (body, etag)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> int:
+        """Checks for commits since the last request (emptying the cache if any) and returns the current version."""
+        version = self._data_version.current()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+        return version
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: tuple, version: int):
+        """Stores an answer built after snapshot() returned `version`, unless a commit has happened since."""
+        with self._lock:
+            if not self.max_entries or version != self._version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _WriteJob:
+    __slots__ = ("updates", "found", "done")
+
+    def __init__(self, updates: list):
+        self.updates = updates
+        self.found = None
+        self.done = threading.Event()
+
+
+class FlagWriter:
+    """
+    One thread applying flag updates. Whatever has queued up while the previous transaction
+    committed goes into the next one, so concurrent writers share commits.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="api-writer", daemon=True).start()
+
+    def submit(self, updates: list[tuple[int, bool | None, bool | None]]) -> list[bool]:
+        """Applies `updates` and waits for the commit. Returns, per update, whether the article exists."""
+        job = _WriteJob(updates)
+        self._queue.put(job)
+        job.done.wait()
+        if job.found is None:
+            raise ApiError(500, "Could not update the database")
+        return job.found
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            try:
+                pending = len(jobs[0].updates)
+                while pending < WRITE_BATCH_MAX:
+                    try:
+                        jobs.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    pending += len(jobs[-1].updates)
+                found = db_utils.set_article_flags([update for job in jobs for update in job.updates])
+                metrics_utils.API_WRITE_BATCHES.observe(pending)
+                offset = 0
+                for job in jobs:
+                    job.found = None if found is None else found[offset:offset + len(job.updates)]
+                    offset += len(job.updates)
+            except Exception as e:  # Keep the thread alive: every later write waits on it
+                log.error("Flag write failed: %s", e)
+            finally:
+                for job in jobs:
+                    job.done.set()  # Jobs left with found=None answer 500
+
+
+def _article_id(value) -> int:
+    """`value` if it is an id SQLite can bind; one that isn't would fail the whole shared write batch."""
+    if type(value) is not int or not -SQLITE_MAX_INTEGER - 1 <= value <= SQLITE_MAX_INTEGER:
+        raise ApiError(400, "Article ids must be 64-bit integers")
+    return value
+
+
+def _choice(query: dict, name: str) -> bool | None:
+    value = query.get(name)
+    if value is None:
+        return None
+    if value.lower() not in _CHOICES:
+        raise ApiError(400, f"{name} must be yes, no or any")
+    return _CHOICES[value.lower()]
+
+
+class ArticleApi:
+    """The routes, independent of the HTTP plumbing. Each returns the JSON payload or raises ApiError."""
+    def __init__(self, cache_entries: int | None = None, page_size: int | None = None):
+        settings = get_settings()
+        self.page_size = page_size or settings.api_page_size
+        self.data_version = db_utils.DataVersion()
+        self.cache = ResponseCache(settings.api_cache_entries if cache_entries is None else cache_entries, self.data_version)
+        self.writer = FlagWriter()
+
+    def list_articles(self, query: dict) -> dict:
+        try:
+            limit = min(max(int(query.get("limit", self.page_size)), 1), MAX_PAGE_SIZE)
+        except ValueError as e:
+            raise ApiError(400, "limit must be a number") from e
+        after = decode_cursor(query["cursor"]) if query.get("cursor") else None
+        # One extra row tells whether there is a next page
+        rows = db_utils.get_articles_page(limit + 1, after=after, source=query.get("source"),
+                                          relevant=_choice(query, "relevant"), saved=_choice(query, "saved"),
+                                          interesting=_choice(query, "interesting"))
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1]["fetched_at"], page[-1]["id"]) if len(rows) > limit else None
+        return {"articles": [_article_json(row) for row in page], "next_cursor": next_cursor}
+
+    def get_article(self, article_id: int) -> dict:
+        article = db_utils.get_article(_article_id(article_id))
+        if article is None:
+            raise ApiError(404, f"No article {article_id}")
+        return _article_json(article)
+
+    def set_flag(self, article_id: int, action: str, body: dict) -> dict:
+        value = body.get("value", True)
+        if not isinstance(value, bool):
+            raise ApiError(400, "value must be true or false")
+        flags = {"saved": None, "interesting": None, _FLAG_COLUMNS[action]: value}
+        if not self.writer.submit([(_article_id(article_id), flags["saved"], flags["interesting"])])[0]:
+            raise ApiError(404, f"No article {article_id}")
+        return {"id": article_id, _FLAG_COLUMNS[action]: value}
+
+    def set_flags(self, body: dict) -> dict:
+        updates = []
+        for update in body.get("updates") or []:
+            if not isinstance(update, dict) or type(update.get("id")) is not int:
+                raise ApiError(400, "Each update needs an integer id")
+            saved, interesting = update.get("saved"), update.get("interesting")
+            if any(value is not None and not isinstance(value, bool) for value in (saved, interesting)):
+                raise ApiError(400, "saved and interesting must be true, false or left out")
+            updates.append((_article_id(update["id"]), saved, interesting))
+        if not updates:
+            raise ApiError(400, "No updates")
+        found = self.writer.submit(updates)
+        return {"updated": sum(found), "missing": [update[0] for update, exists in zip(updates, found) if not exists]}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive: a UI paging through articles reuses its connection
+    server_version = "BittyNews"
+    disable_nagle_algorithm = True  # Headers and body are separate writes; without this each response waits ~40ms for an ACK
+
+    @property
+    def api(self) -> ArticleApi:
+        return self.server.api
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        route, outcome = "unknown", "error"
+        try:
+            if url.path == "/metrics":
+                route, outcome = "metrics", "miss"
+                return self._send(200, metrics_utils.render_metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            query = dict(parse_qsl(url.query))
+            if url.path in ("/articles", "/articles/"):
+                route, build, argument = "articles", self.api.list_articles, query
+            elif match := _ARTICLE_PATH.match(url.path):
+                route, build, argument = "article", self.api.get_article, int(match.group(1))
+            else:
+                raise ApiError(404, "Not found")
+            key = f"{url.path.rstrip('/')}?{urlencode(sorted(query.items()))}"
+            version = self.api.cache.snapshot()
+            entry = self.api.cache.get(key)
+            outcome = "hit"
+            if entry is None:
+                body = _encode(build(argument))
+                entry = (body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+                self.api.cache.put(key, entry, version)
+                outcome = "miss"
+            body, etag = entry
+            if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+                outcome = "not_modified"
+                return self._send(304, None, etag=etag)
+            self._send(200, body, etag=etag)
+        except ApiError as e:
+            outcome = "error"
+            self._send_error(e.status, str(e))
+        except ConnectionError:
+            outcome = "error"
+            raise  # The client went away; there is nobody to answer
+        except Exception as e:
+            outcome = "error"
+            log.error("GET %s failed: %s", self.path, e, exc_info=True)
+            self._send_error(500, "Internal server error")
+        finally:
+            metrics_utils.API_REQUESTS.inc(route=route, outcome=outcome)
+            metrics_utils.API_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route)
+
+    def do_POST(self):
+        started = time.perf_counter()
+        path = urlsplit(self.path).path
+        route, outcome = "unknown", "error"
+        try:
+            body = self._read_json()
+            if path == "/articles/flags":
+                route = "flags"
+                payload = self.api.set_flags(body)
+            elif match := _FLAG_PATH.match(path):
+                route = match.group(2)
+                payload = self.api.set_flag(int(match.group(1)), match.group(2), body)
+            else:
+                raise ApiError(404, "Not found")
+            outcome = "write"
+            self._send(200, _encode(payload))
+        except ApiError as e:
+            self._send_error(e.status, str(e))
+        except ConnectionError:
+            raise  # The client went away; there is nobody to answer
+        except Exception as e:
+            log.error("POST %s failed: %s", self.path, e, exc_info=True)
+            self._send_error(500, "Internal server error")
+        finally:
+            metrics_utils.API_REQUESTS.inc(route=route, outcome=outcome)
+            metrics_utils.API_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route)
+
+    def _read_json(self) -> dict:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError as e:
+            self.close_connection = True  # Where the body ends is unknown
+            raise ApiError(400, "Invalid Content-Length") from e
+        if length < 0:
+            self.close_connection = True
+            raise ApiError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True  # The unread body would be taken for the next request
+            raise ApiError(413, "Request body too large")
+        raw = self.rfile.read(length) if length else b""
+        if not raw.strip():
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError as e:
+            raise ApiError(400, "Body is not valid JSON") from e
+        if not isinstance(body, dict):
+            raise ApiError(400, "Body must be a JSON object")
+        return body
+
+    def _send(self, status: int, body: bytes | None, content_type: str = "application/json", etag: str | None = None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Clients may keep it, but revalidate (a cheap 304)
+        if body is not None:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str):
+        self._send(status, _encode({"error": message}))
+
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.address_string(), format % args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Listen backlog; the default of 5 refuses bursts of new connections
+
+    def __init__(self, address: tuple[str, int], api: ArticleApi):
+        super().__init__(address, ApiHandler)
+        self.api = api
+
+
+def create_server(host: str | None = None, port: int | None = None, cache_entries: int | None = None) -> ApiServer:
+    """The API server, bound but not yet serving (port 0 picks a free port)."""
+    settings = get_settings()
+    db_utils.create_tables_if_not_exist()
+    host = settings.api_host if host is None else host
+    port = settings.api_port if port is None else port
+    return ApiServer((host, port), ArticleApi(cache_entries=cache_entries))
+
+
+def serve(host: str | None = None, port: int | None = None, cache_entries: int | None = None):
+    """Serves the API until interrupted."""
+    server = create_server(host, port, cache_entries)
+    host, port = server.server_address[:2]
+    log.info("📡 BittyNews API on http://%s:%d/articles (cache: %d responses)", host, port, server.api.cache.max_entries)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("\n🛑 Stopping the API.")
+    finally:
+        server.server_close()
+        server.api.data_version.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local HTTP API over the article database.")
+    parser.add_argument("--host", default=None, help="Defaults to API_HOST (127.0.0.1).")
+    parser.add_argument("--port", type=int, default=None, help="Defaults to API_PORT (8088).")
+    parser.add_argument("--cache-entries", type=int, default=None, help="Defaults to API_CACHE_ENTRIES (512); 0 disables the cache.")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cache_entries)
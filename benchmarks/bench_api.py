@@ -0,0 +1,181 @@
+# BittyNews/benchmarks/bench_api.py
+"""
+Load test for the reader HTTP API (api.py) against a populated database.
+
+Builds a throwaway database of synthetic articles, starts the API in a separate process (once
+with the response cache, once without), and runs concurrent keep-alive clients through these
+workloads, each for --seconds:
+
+    first-page     GET /articles?limit=50, the same page over and over (a UI's landing page)
+    revalidate     the same, with If-None-Match: answered 304 with no body
+    paginate       each client walks cursor pages from the newest article on
+    article        GET /articles/{id} for random ids
+    mixed          paginate, with 5% of requests marking an article saved (every write drops the cache)
+    writes         POST /articles/{id}/save only; shows how many updates share one commit
+
+Reports requests/s and p50 / p99 latency per workload. Runs fully offline:
+
+    python benchmarks/bench_api.py --rows 50000 --clients 8 --seconds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+WORDS = ("model training inference agent startup funding robotics chip gpu cloud open source regulation privacy "
+         "policy benchmark dataset transformer reasoning multimodal vision speech search browser assistant").split()
+SOURCES = ["The Verge", "TechCrunch (Official)", "MIT Technology Review", "Wired", "VentureBeat AI"]
+WORKLOADS = ("first-page", "revalidate", "paginate", "article", "mixed", "writes")
+
+
+def build_database(path: str, rows: int, rng: random.Random):
+    """Creates the schema at `path` and fills it with `rows` articles, one minute apart."""
+    os.environ["DATABASE_NAME"] = path
+    from utils import db_utils
+    db_utils.create_tables_if_not_exist()
+    conn = db_utils.get_db_connection()
+    started = time.time() - rows * 60
+
+    def article(i):
+        title = " ".join(rng.choices(WORDS, k=8)).capitalize()
+        return (f"https://example.com/a/{i}", title, rng.choice(SOURCES), " ".join(rng.choices(WORDS, k=400)),
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(started + i * 60)), rng.choice([0, 1, None]),
+                f"{title}: a one-sentence summary of about the usual length for the digest.")
+
+    conn.executemany("""
+        INSERT INTO articles (link, title, source_name, original_summary, fetched_at, is_ai_relevant, llm_summary)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (article(i) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, cache_entries: int) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_NAME=db_path, LOG_LEVEL="WARNING")
+    process = subprocess.Popen([sys.executable, "api.py", "--port", str(port), "--cache-entries", str(cache_entries)],
+                               cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL)
+    for _ in range(600):  # Up to 30s: the server ensures the schema first
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("The API did not start")
+
+
+class Client:
+    """One keep-alive connection; requests return (status, parsed JSON or None, ETag)."""
+    def __init__(self, port: int):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        self.conn.request(method, path, body=payload, headers=headers or {})
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else None, response.getheader("ETag")
+
+
+def run_workload(port: int, workload: str, clients: int, seconds: float, max_id: int) -> dict:
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = Client(port)
+        _, _, etag = client.request("GET", "/articles?limit=50")
+        cursor, mine, bad = None, [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if workload == "first-page":
+                status, _, _ = client.request("GET", "/articles?limit=50")
+            elif workload == "revalidate":
+                status, _, _ = client.request("GET", "/articles?limit=50", headers={"If-None-Match": etag})
+                status = 200 if status == 304 else status
+            elif workload == "article":
+                status, _, _ = client.request("GET", f"/articles/{rng.randint(1, max_id)}")
+            elif workload == "writes" or (workload == "mixed" and rng.random() < 0.05):
+                status, _, _ = client.request("POST", f"/articles/{rng.randint(1, max_id)}/save", body={})
+            else:  # paginate / mixed reads
+                status, page, _ = client.request("GET", f"/articles?limit=50&cursor={cursor}" if cursor else "/articles?limit=50")
+                cursor = page["next_cursor"] if status == 200 else None
+            mine.append(time.perf_counter() - started)
+            bad += status != 200
+        with lock:
+            latencies.extend(mine)
+            errors[0] += bad
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    count = len(latencies)
+    return {"requests": count, "rps": count / seconds, "errors": errors[0],
+            "p50_ms": latencies[count // 2] * 1000 if count else 0,
+            "p99_ms": latencies[min(int(count * 0.99), count - 1)] * 1000 if count else 0}
+
+
+def write_batching(port: int) -> str:
+    """Mean flag updates per commit, from the server's /metrics."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode("utf-8")
+    values = {line.split()[0]: float(line.split()[1]) for line in text.splitlines()
+              if line.startswith("bittynews_api_write_batch_size_") and "{" not in line}
+    count = values.get("bittynews_api_write_batch_size_count", 0)
+    return f"{values.get('bittynews_api_write_batch_size_sum', 0) / count:.1f} updates per commit" if count else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(WORKLOADS)}")
+    args = parser.parse_args()
+    workloads = [name.strip() for name in args.only.split(",")] if args.only else list(WORKLOADS)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bittynews-api-"), "bench.db")
+    started = time.perf_counter()
+    build_database(db_path, args.rows, random.Random(42))
+    print(f"{args.rows} articles in {db_path} ({time.perf_counter() - started:.1f}s); "
+          f"{args.clients} clients, {args.seconds:g}s per workload")
+    print(f"{'workload':<12} {'cache':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for cache_entries in (512, 0):
+        process, port = start_server(db_path, cache_entries)
+        try:
+            for workload in workloads:
+                if cache_entries == 0 and workload in ("revalidate", "writes"):
+                    continue  # The cache plays no part in these
+                result = run_workload(port, workload, args.clients, args.seconds, args.rows)
+                note = f"  ({write_batching(port)})" if workload == "writes" else ""
+                print(f"{workload:<12} {'on' if cache_entries else 'off':<6} {result['rps']:>8.0f} "
+                      f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7}{note}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# BittyNews/benchmarks/bench_clusters.py
+"""
+Story clustering benchmark: hashed TF-IDF vectors and incremental cluster assignment over a
+synthetic window of articles (utils/cluster_utils.py).
+
+Each synthetic story has a few distinctive words. Its articles mix those with Zipf-distributed
+filler words, the way real coverage of one event shares names and terms. The benchmark times
+a cold run (every article new), then an incremental run where only the newest --new articles
+are unassigned, and reports how well the clusters match the stories (purity). No database or
+network needed:
+
+    python benchmarks/bench_clusters.py --articles 30000 --stories 1500
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 9)))
+
+
+def synthetic_articles(count: int, stories: int, rng: random.Random) -> tuple[list[tuple], list[int]]:
+    """db_utils.get_articles_for_clustering-style rows (oldest first) and each one's true story."""
+    filler = [_word(rng) for _ in range(20_000)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(filler))))  # Zipf-like
+    story_words = [[_word(rng) for _ in range(8)] for _ in range(stories)]
+    rows, truth = [], []
+    for i in range(count):
+        story = rng.randrange(stories)
+        title = rng.sample(story_words[story], 4) + rng.choices(filler, cum_weights=cumulative, k=4)
+        body = rng.choices(story_words[story], k=12) + rng.choices(filler, cum_weights=cumulative, k=180)
+        rng.shuffle(title)
+        rng.shuffle(body)
+        rows.append((i + 1, " ".join(title), " ".join(body), "2025-06-08 07:00:00", None))
+        truth.append(story)
+    return rows, truth
+
+
+def purity(clusters: dict[int, list[int]], truth: dict[int, int]) -> float:
+    """Share of clustered articles whose cluster's most common story is their own."""
+    agreeing = total = 0
+    for article_ids in clusters.values():
+        counts = {}
+        for article_id in article_ids:
+            counts[truth[article_id]] = counts.get(truth[article_id], 0) + 1
+        agreeing += max(counts.values())
+        total += len(article_ids)
+    return agreeing / max(total, 1)
+
+
+def main():
+    from utils.cluster_utils import assign_clusters
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=30_000)
+    parser.add_argument("--stories", type=int, default=1_500)
+    parser.add_argument("--new", type=int, default=2_000, help="Unassigned articles in the incremental run.")
+    parser.add_argument("--similarity", type=float, default=0.25)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    rows, stories = synthetic_articles(args.articles, args.stories, rng)
+    truth = {row[0]: story for row, story in zip(rows, stories)}
+    print(f"{args.articles} articles about {args.stories} stories generated in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    new_clusters, _, _ = assign_clusters(rows, args.similarity)
+    cold_s = time.perf_counter() - started
+    cluster_of = {}
+    clusters = {}
+    for number, (_, article_ids) in enumerate(new_clusters):
+        clusters[number] = article_ids
+        for article_id in article_ids:
+            cluster_of[article_id] = number
+    print(f"  cold run          {cold_s * 1000:9.1f} ms  ({len(new_clusters)} clusters, "
+          f"{len(cluster_of) / len(rows):.1%} clustered, purity {purity(clusters, truth):.1%})")
+
+    # The oldest articles keep the clusters of the cold run; the newest --new arrive unassigned
+    cutoff = len(rows) - args.new
+    incremental_rows = [row[:4] + ((cluster_of.get(row[0]) if i < cutoff else None),) for i, row in enumerate(rows)]
+    started = time.perf_counter()
+    new_clusters, joined, _ = assign_clusters(incremental_rows, args.similarity)
+    incremental_s = time.perf_counter() - started
+    joined_correctly = sum(truth[article_id] == truth[clusters[number][0]] for article_id, number in joined
+                           if clusters.get(number))
+    print(f"  incremental run   {incremental_s * 1000:9.1f} ms  ({args.new} new: {len(joined)} joined existing "
+          f"clusters, {joined_correctly / max(len(joined), 1):.1%} to the right story; {len(new_clusters)} new clusters)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# BittyNews/benchmarks/bench_digests.py
+"""
+Personalized digest benchmark: selecting and rendering one digest per subscriber.
+
+Builds the DigestBuilder over a synthetic candidate pool and times, separately,
+ranking (vectorized scoring), selection (inverted index + heap top-k), grouping and
+rendering for N subscribers with random tag/source preferences. No database or network needed:
+
+    python benchmarks/bench_digests.py --subscribers 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+SOURCES = [
+    {"name": "The Verge", "tags": ["AI", "Tech", "Culture"], "weight": 1.0},
+    {"name": "TechCrunch (Official)", "tags": ["AI", "Startups", "Funding"], "weight": 1.5},
+    {"name": "MIT Technology Review", "tags": ["AI", "DeepTech", "Ethics"], "weight": 2.0},
+    {"name": "Wired", "tags": ["Tech", "AI", "Society"], "weight": 1.2},
+    {"name": "VentureBeat AI", "tags": ["AI"], "weight": 0.8},
+]
+TAGS = sorted({tag for source in SOURCES for tag in source["tags"]})
+TITLE_WORDS = (
+    "OpenAI Mistral Anthropic Google Meta Nvidia Apple Microsoft DeepSeek startup raises funding "
+    "launches model agent chip datacenter regulation lawsuit benchmark robotics browser assistant "
+    "open source reasoning vision speech privacy policy earnings partnership acquisition research"
+).split()
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.sample(TITLE_WORDS, 6))
+
+
+def synthetic_pool(size: int, rng: random.Random) -> list[dict]:
+    return [{
+        "id": i + 1,
+        "link": f"https://example.com/article/{i + 1}",
+        "title": _title(rng),
+        "source_name": rng.choice(SOURCES)["name"],
+        "published_at": "2025-06-08 07:00:00",
+        "age_hours": rng.uniform(0, 72),
+        "body_chars": rng.choice([0, rng.randint(300, 12_000)]),
+        "llm_summary": "A one-sentence summary that is about as long as the real ones tend to be. " * 2,
+    } for i in range(size)]
+
+
+def synthetic_subscribers(count: int, rng: random.Random):
+    for i in range(count):
+        roll = rng.random()
+        yield {
+            "email": f"reader{i}@example.com",
+            "name": None,
+            "preferred_tags": ",".join(rng.sample(TAGS, rng.randint(1, 3))) if roll < 0.7 else None,
+            "preferred_sources": ",".join(source["name"] for source in rng.sample(SOURCES, rng.randint(1, 2)))
+                                 if 0.5 < roll < 0.8 else None,
+        }
+
+
+def main():
+    from utils.digest_utils import DigestBuilder
+    from utils.render_utils import FragmentCache
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--pool", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pool = synthetic_pool(args.pool, rng)
+    subscribers = list(synthetic_subscribers(args.subscribers, rng))
+    sent_titles = [_title(rng) for _ in range(70)]  # Two weeks of past digests
+
+    started = time.perf_counter()
+    builder = DigestBuilder(pool, k=args.k, sources=SOURCES, date_str="June 08, 2025", sent_titles=sent_titles,
+                            fragment_cache=FragmentCache(persist=False))
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    groups = builder.group_subscribers(subscribers)
+    select_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    total_bytes = sum((len(builder.render(selection)) + len(builder.render(selection, "text"))) * len(recipients)
+                      for selection, recipients in groups.items())
+    render_s = time.perf_counter() - started
+
+    print(f"{args.subscribers} subscribers, pool of {args.pool}, k={args.k}")
+    print(f"  rank + index build {build_s * 1000:9.1f} ms")
+    print(f"  select + group     {select_s * 1000:9.1f} ms  ({len(groups)} distinct digests)")
+    print(f"  render html+text   {render_s * 1000:9.1f} ms  ({total_bytes / 1e6:.1f} MB of HTML delivered)")
+    print(f"  per subscriber     {(build_s + select_s + render_s) / args.subscribers * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
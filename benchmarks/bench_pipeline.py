@@ -0,0 +1,276 @@
+# BittyNews/benchmarks/bench_pipeline.py
+"""
+Offline benchmark suite for the pipeline's hot paths, against synthetic data only:
+
+    scrape   ScraperAgent.fetch over synthetic RSS/Atom feeds and article pages served by
+             benchmarks/fixture_server.py (with injectable latency / errors)
+    extract  BeautifulSoup feed-content cleanup and newspaper3k parsing of article pages
+    db       upsert_article (new and unchanged), relevance updates, and the pipeline's reads
+    render   digest / feed rendering in every format, cold and with warm fragments
+
+Each run writes its results as JSON (benchmarks/results/<timestamp>.json by default). Pass a
+previous file to --compare to see the change per measurement:
+
+    python benchmarks/bench_pipeline.py --entries 1000
+    python benchmarks/bench_pipeline.py --entries 20000 --only scrape,db --latency-ms 50 --error-rate 0.02
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/20250608-070000.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import FixtureServer, SyntheticSite  # noqa: E402
+
+BENCHMARKS = ("scrape", "extract", "db", "render")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def _measure(items: int, started: float, **extra) -> dict:
+    seconds = time.perf_counter() - started
+    return {"seconds": round(seconds, 4), "items": items,
+            "per_second": round(items / seconds, 1) if seconds > 0 else None, **extra}
+
+
+def _use_database(work_dir: str, name: str):
+    """Points db_utils at a fresh database file for one benchmark."""
+    from utils import db_utils
+    db_utils.DB_PATH = os.path.join(work_dir, f"{name}.db")
+    db_utils.create_tables_if_not_exist()
+
+
+def _synthetic_articles(site: SyntheticSite, base_url: str) -> list[dict]:
+    return [{
+        "link": base_url + site.article_path(feed, entry),
+        "title": site.title(feed, entry),
+        "source_name": f"Synthetic {feed}",
+        "original_summary": "\n\n".join(site.paragraphs_for(feed, entry)),
+        "published": None,
+        "published_parsed": site.published(feed, entry).timetuple(),
+    } for feed in range(site.feeds) for entry in range(site.entries_per_feed)]
+
+
+def bench_scrape(site: SyntheticSite, server: FixtureServer, work_dir: str) -> dict:
+    from agents.scraper.scraper_agent import ScraperAgent
+    _use_database(work_dir, "scrape")
+    scraper = ScraperAgent()
+    scraper.sources = site.sources(server.base_url)
+    scraper.article_fetch_delay = 0  # Politeness delay; the fixture server doesn't need it
+    requests_before = server.requests
+
+    started = time.perf_counter()
+    total_items, new_items = scraper.fetch(all_sources=True)
+    first = _measure(total_items, started, new=new_items, http_requests=server.requests - requests_before)
+
+    # Second poll of the same feeds: nothing new, the steady state of a frequently polled source
+    requests_before = server.requests
+    started = time.perf_counter()
+    total_items, new_items = scraper.fetch(all_sources=True)
+    repoll = _measure(total_items, started, new=new_items, http_requests=server.requests - requests_before)
+    return {"first_poll": first, "repoll": repoll}
+
+
+def bench_extract(site: SyntheticSite, pages: int) -> dict:
+    from agents.scraper.scraper_agent import ScraperAgent
+    import feedparser
+    scraper = ScraperAgent.__new__(ScraperAgent)  # Only the parsing helpers are used; no sources or settings needed
+    targets = [(i % site.feeds, (i // site.feeds) % site.entries_per_feed) for i in range(pages)]
+    results = {}
+
+    feeds = [site.feed_xml(feed, "http://fixture") for feed in range(site.feeds)]
+    started = time.perf_counter()
+    parsed = [feedparser.parse(xml) for xml in feeds]
+    results["feedparser"] = _measure(sum(len(feed.entries) for feed in parsed), started)
+
+    entries = [entry for feed in parsed for entry in feed.entries][:pages]
+    started = time.perf_counter()
+    for entry in entries:
+        scraper._get_content_from_rss_entry(entry)
+    results["bs4_feed_content"] = _measure(len(entries), started)
+
+    try:
+        from newspaper import Article, Config
+    except ImportError:
+        results["newspaper3k_parse"] = {"skipped": "newspaper3k not installed"}
+        return results
+    config = Config()
+    config.fetch_images = False
+    config.memoize_articles = False
+    html_pages = [site.article_html(feed, entry) for feed, entry in targets]
+    started = time.perf_counter()
+    extracted_chars = 0
+    for (feed, entry), html in zip(targets, html_pages):
+        article = Article(f"http://fixture{site.article_path(feed, entry)}", config=config)
+        article.download(input_html=html)
+        article.parse()
+        extracted_chars += len(article.text)
+    results["newspaper3k_parse"] = _measure(len(html_pages), started, chars_per_page=extracted_chars // max(len(html_pages), 1))
+    return results
+
+
+def bench_db(site: SyntheticSite, work_dir: str) -> dict:
+    from utils import db_utils
+    _use_database(work_dir, "db")
+    articles = _synthetic_articles(site, "http://fixture")
+    results = {}
+
+    started = time.perf_counter()
+    for article in articles:
+        db_utils.upsert_article(article)
+    results["upsert_new"] = _measure(len(articles), started)
+
+    started = time.perf_counter()
+    for article in articles:
+        db_utils.upsert_article(article)
+    results["upsert_unchanged"] = _measure(len(articles), started)
+
+    started = time.perf_counter()
+    pending = db_utils.count_articles_for_filtering()
+    streamed = sum(1 for _ in db_utils.iter_articles_for_filtering())
+    results["read_filter_queue"] = _measure(streamed, started, counted=pending)
+
+    started = time.perf_counter()
+    for i, article in enumerate(articles):
+        db_utils.update_article_ai_relevance(article["link"], i % 3 == 0, "bench")
+    results["update_relevance"] = _measure(len(articles), started)
+
+    relevant = articles[::3]
+    started = time.perf_counter()
+    for article in relevant:
+        db_utils.update_article_llm_summary(article["link"], f"Summary of {article['title']}.", "bench")
+    results["update_summary"] = _measure(len(relevant), started)
+
+    started = time.perf_counter()
+    candidates = db_utils.get_articles_for_newsletter(limit=200)
+    results["read_newsletter_candidates"] = _measure(len(candidates), started)
+    return results
+
+
+def bench_render(site: SyntheticSite, articles_per_digest: int) -> dict:
+    from utils import render_utils
+    articles = [dict(article, id=i + 1, published_at=site.published(i % site.feeds, 0).strftime('%Y-%m-%d %H:%M:%S'),
+                     llm_summary=f"Summary of {article['title']}.")
+                for i, article in enumerate(_synthetic_articles(site, "http://fixture")[:articles_per_digest])]
+    results = {}
+    for fmt in render_utils.FORMATS:
+        cache = render_utils.FragmentCache(persist=False)
+        started = time.perf_counter()
+        size = len(render_utils.render_digest(articles, fmt, date_str="June 08, 2025", cache=cache))
+        cold = _measure(len(articles), started, bytes=size)
+        started = time.perf_counter()
+        render_utils.render_digest(articles, fmt, date_str="June 08, 2025", cache=cache)
+        results[fmt] = {"cold": cold, "warm": _measure(len(articles), started)}  # Fragments cached in memory
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    """{'scrape': {'first_poll': {'seconds': ..}}} -> {'scrape.first_poll': {...}} (leaves have 'seconds')."""
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict) and "seconds" in value:
+            flat[prefix + name] = value
+        elif isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{name}."))
+    return flat
+
+
+def print_results(results: dict, baseline: dict | None = None):
+    current, previous = _flatten(results), _flatten(baseline or {})
+    print(f"\n{'measurement':<38} {'items':>8} {'seconds':>9} {'items/s':>10}" + (f" {'vs baseline':>12}" if baseline else ""))
+    for name, value in current.items():
+        line = f"{name:<38} {value['items']:>8} {value['seconds']:>9.3f} {value['per_second'] or 0:>10.1f}"
+        if baseline and name in previous and previous[name]["seconds"]:
+            change = value["seconds"] / previous[name]["seconds"] - 1
+            line += f" {change:>+11.0%}{' slower' if change > 0.1 else ''}"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000, help="Total feed entries / articles (1k-100k).")
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Fixture server latency per request.")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fixture URLs answering HTTP 500.")
+    parser.add_argument("--extract-pages", type=int, default=500, help="Article pages parsed in the extract benchmark.")
+    parser.add_argument("--digest-articles", type=int, default=200, help="Articles per rendered digest/feed.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--compare", help="A previous results JSON to compare against.")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    work_dir = tempfile.mkdtemp(prefix="bittynews-bench-")
+    os.environ["DATABASE_NAME"] = os.path.join(work_dir, "bench.db")  # Before utils.db_utils is imported
+    os.environ.setdefault("LOG_ARTICLES", "false")  # One line per article would dominate the timings
+    from utils.settings import get_settings
+    get_settings()
+
+    site = SyntheticSite(args.feeds, max(math.ceil(args.entries / args.feeds), 1), seed=args.seed)
+    print(f"Benchmarking {', '.join(selected)} with {site.feeds} feeds x {site.entries_per_feed} entries "
+          f"({site.total_entries} total); work dir {work_dir}")
+    results = {}
+    with FixtureServer(site, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate) as server:
+        for name in selected:
+            print(f"\n--- {name} ---")
+            if name == "scrape":
+                results[name] = bench_scrape(site, server, work_dir)
+            elif name == "extract":
+                results[name] = bench_extract(site, min(args.extract_pages, site.total_entries))
+            elif name == "db":
+                results[name] = bench_db(site, work_dir)
+            elif name == "render":
+                results[name] = bench_render(site, min(args.digest_articles, site.total_entries))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["results"]
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# BittyNews/benchmarks/bench_search.py
+"""
+Search latency benchmark: FTS5 (BM25 + snippet) vs. the old LIKE '%...%' scan.
+
+Builds a throwaway database of synthetic articles and times a set of queries.
+Runs fully offline:
+
+    python benchmarks/bench_search.py --rows 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+VOCABULARY = (
+    "model training inference agent startup funding robotics chip gpu cloud open source "
+    "regulation privacy policy benchmark dataset transformer reasoning multimodal vision "
+    "speech search browser assistant enterprise developer api release launch partnership "
+    "research paper safety alignment energy datacenter smartphone app update security"
+).split()
+ENTITIES = ["OpenAI", "Mistral", "Anthropic", "Google", "Meta", "Nvidia", "Apple", "Microsoft", "DeepSeek", "xAI"]
+SOURCES = ["The Verge", "TechCrunch (Official)", "MIT Technology Review", "Wired", "VentureBeat AI"]
+QUERIES = ["Mistral", "OpenAI reasoning", "datacenter energy", "Nvidia gpu chip", "open source model release"]
+
+
+def _build_token_stream(rng: random.Random, vocabulary_size: int = 20_000, length: int = 2_000_000) -> list[str]:
+    """
+    Real topic words plus pseudo-words sampled with Zipf-like frequencies, as in natural text.
+    Sampled once up front; sentences are slices of this stream, which keeps generation cheap.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = list(VOCABULARY)
+    while len(words) < vocabulary_size:
+        words.append("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    rng.shuffle(words)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+    return rng.choices(words, cum_weights=cum_weights, k=length)
+
+
+def _sentence(rng: random.Random, stream: list[str], words: int, entity_rate: float = 0.03) -> str:
+    start = rng.randrange(len(stream) - words)
+    picked = stream[start:start + words]
+    if rng.random() < entity_rate:  # Named entities are rare, so entity queries are selective
+        picked[rng.randrange(words)] = rng.choice(ENTITIES)
+    return " ".join(picked)
+
+
+def populate(rows: int, seed: int = 42):
+    from utils import db_utils
+    rng = random.Random(seed)
+    stream = _build_token_stream(rng)
+    db_utils.create_tables_if_not_exist()
+    conn = db_utils.get_db_connection()
+    batch = []
+    started = time.perf_counter()
+    for i in range(rows):
+        day = 1 + i % 28
+        batch.append((
+            f"https://bench.example/{i}",
+            _sentence(rng, stream, 10),
+            rng.choice(SOURCES),
+            ". ".join(_sentence(rng, stream, 18) for _ in range(25)),  # ~3KB body
+            f"2025-{1 + (i // 28) % 12:02d}-{day:02d} 08:00:00",
+            rng.random() < 0.4,
+            _sentence(rng, stream, 30) if rng.random() < 0.4 else None,
+        ))
+        if len(batch) == 5000:
+            conn.executemany(
+                "INSERT INTO articles (link, title, source_name, original_summary, published_at, is_ai_relevant, llm_summary) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch)
+            conn.commit()
+            batch.clear()
+    if batch:
+        conn.executemany(
+            "INSERT INTO articles (link, title, source_name, original_summary, published_at, is_ai_relevant, llm_summary) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch)
+        conn.commit()
+    conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+    print(f"Populated {rows} rows (FTS maintained by triggers) in {time.perf_counter() - started:.1f}s")
+
+
+def _percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={p50 * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms"
+
+
+def run(repeat: int):
+    from utils import db_utils
+    from utils.search_utils import search_articles
+
+    conn = db_utils.get_db_connection()
+    print(f"\n{'query':<28} {'FTS5 bm25 + snippet':<36} {'LIKE scan':<36}")
+    for query in QUERIES:
+        fts_times, like_times = [], []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            search_articles(query, limit=20, conn=conn)
+            fts_times.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            like_clauses = " AND ".join(["(title LIKE ? OR original_summary LIKE ? OR llm_summary LIKE ?)"] * len(query.split()))
+            like_params = [f"%{term}%" for term in query.split() for _ in range(3)]
+            conn.execute(f"SELECT id FROM articles WHERE {like_clauses} ORDER BY published_at DESC LIMIT 20", like_params).fetchall()
+            like_times.append(time.perf_counter() - t0)
+        print(f"{query:<28} {_percentiles(fts_times):<36} {_percentiles(like_times):<36}")
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        search_articles("OpenAI", source="Wired", since="2025-03-01", until="2025-06-30", relevant_only=True, conn=conn)
+    print(f"\nFiltered query (source + date range + relevance): {(time.perf_counter() - t0) / repeat * 1000:.2f}ms avg")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", help="Reuse/keep this database file instead of a temporary one.")
+    args = parser.parse_args()
+
+    db_file = args.db or os.path.join(tempfile.mkdtemp(prefix="bittynews-bench-"), "bench.db")
+    os.environ["DATABASE_NAME"] = db_file  # Must be set before utils.db_utils is imported
+    print(f"Benchmark database: {db_file}")
+    if not os.path.exists(db_file) or os.path.getsize(db_file) == 0:
+        populate(args.rows)
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# BittyNews/benchmarks/bench_startup.py
+"""
+Startup benchmark: how long importing each entry point takes, from `python -X importtime`,
+and whether a heavy dependency crept back into a module that should import it lazily.
+
+Each module is imported in a fresh interpreter (best of --repeat runs). Exits non-zero if an
+entry point exceeds its budget or imports a module it must not, so it can guard CI / cron hosts:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 150 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Entry point -> top-level packages it must not import at startup (they belong to later stages)
+ENTRY_POINTS = {
+    "send_newsletter_job": ["numpy", "jinja2", "sib_api_v3_sdk", "requests", "newspaper", "bs4", "feedparser"],
+    "main": ["newspaper", "bs4", "feedparser", "requests", "numpy", "scipy", "sib_api_v3_sdk"],
+    "bittynews": ["numpy", "scipy", "jinja2", "sib_api_v3_sdk", "requests", "newspaper", "bs4", "feedparser", "dotenv"],
+    "daemon": ["newspaper", "bs4", "feedparser", "numpy", "scipy", "sib_api_v3_sdk"],
+    "api": ["numpy", "scipy", "jinja2", "sib_api_v3_sdk", "requests", "newspaper", "bs4", "feedparser"],
+    "utils.llm_utils": ["requests", "dotenv"],
+}
+DEFAULT_BUDGET_MS = 100.0
+
+
+def import_profile(module: str) -> list[tuple[int, int, str]]:
+    """[(self µs, cumulative µs, module name)] for `import module` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def _depth(name: str) -> int:
+    return len(name) - len(name.lstrip())
+
+
+def _entry(rows: list[tuple[int, int, str]], module: str) -> tuple[int, int]:
+    """(position, cumulative µs) of `module`'s own line in an import profile."""
+    for position, (_, cumulative_us, name) in enumerate(rows):
+        if name.strip() == module:
+            return position, cumulative_us
+    raise ValueError(f"{module} not found in the import profile")
+
+
+def _children(rows: list[tuple[int, int, str]], position: int) -> list[tuple[int, str]]:
+    """
+    Direct imports of the module at `position`. -X importtime prints a module after everything
+    it imported, so those are the lines just above it, one indentation level deeper.
+    """
+    depth = _depth(rows[position][2])
+    children = []
+    for _, cumulative_us, name in reversed(rows[:position]):
+        if _depth(name) <= depth:
+            break
+        if _depth(name) == depth + 2:
+            children.append((cumulative_us, name.strip()))
+    return children
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Max cumulative import time per entry point (excluding interpreter startup).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest counts.")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per entry point.")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for module, forbidden in ENTRY_POINTS.items():
+        best = min((import_profile(module) for _ in range(args.repeat)), key=lambda rows: _entry(rows, module)[1])
+        position, total_us = _entry(best, module)
+        total_ms = total_us / 1000
+        loaded = {name.strip().split(".")[0] for _, _, name in best[:position + 1]}
+        leaked = sorted(set(forbidden) & loaded)
+        over_budget = total_ms > args.budget_ms
+        failures += bool(leaked) + over_budget
+
+        status = "FAIL" if leaked or over_budget else "ok"
+        print(f"{module:<22} {total_ms:>8.1f} ms  [{status}]" + (f"  imports {', '.join(leaked)}" if leaked else ""))
+        for cumulative_us, name in sorted(_children(best, position), reverse=True)[:args.top]:
+            print(f"    {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    print(f"\nBudget {args.budget_ms:.0f} ms per entry point; {failures} problem(s).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
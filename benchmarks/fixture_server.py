@@ -0,0 +1,227 @@
+# BittyNews/benchmarks/fixture_server.py
+"""
+Synthetic feeds and article pages served from a local HTTP server, so the scraper can be
+benchmarked (and exercised) without network access.
+
+    python benchmarks/fixture_server.py --feeds 20 --entries 50 --port 8765 --latency-ms 80 --error-rate 0.05
+
+Serves:
+    /feed/<n>.xml          RSS 2.0 (even n) or Atom (odd n); `--format rss|atom` forces one
+    /article/<n>/<m>.html  an article page with navigation / footer boilerplate around the text
+
+Content is generated on request from (seed, path), so any scale costs no memory and every run
+sees the same bytes. Latency (`latency_ms` ± `jitter_ms`) and HTTP 500s (`error_rate`, chosen per
+path, so the same URLs fail every run) can be injected to model slow or flaky publishers.
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "model training inference agent startup funding robotics chip gpu cloud open source regulation "
+    "privacy policy benchmark dataset transformer reasoning multimodal vision speech search browser "
+    "assistant enterprise developer api release launch partnership research paper safety alignment "
+    "energy datacenter smartphone app update security the a of to and in for on with as by from"
+).split()
+ENTITIES = ["OpenAI", "Mistral", "Anthropic", "Google", "Meta", "Nvidia", "Apple", "Microsoft", "DeepSeek"]
+BASE_TIME = datetime(2025, 6, 8, 7, 0, tzinfo=timezone.utc)
+
+
+def _rng(seed: int, *parts) -> random.Random:
+    digest = hashlib.blake2b(repr((seed, *parts)).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    picked = rng.choices(WORDS, k=words)
+    picked[rng.randrange(words)] = rng.choice(ENTITIES)
+    text = " ".join(picked)
+    return text[0].upper() + text[1:] + "."
+
+
+class SyntheticSite:
+    """Deterministic feeds and article pages: `feeds` feeds of `entries_per_feed` entries each."""
+    def __init__(self, feeds: int = 20, entries_per_feed: int = 50, seed: int = 42, paragraphs: int = 8,
+                 feed_format: str = "mixed"):
+        self.feeds = feeds
+        self.entries_per_feed = entries_per_feed
+        self.seed = seed
+        self.paragraphs = paragraphs
+        self.feed_format = feed_format
+
+    @property
+    def total_entries(self) -> int:
+        return self.feeds * self.entries_per_feed
+
+    def feed_path(self, feed: int) -> str:
+        return f"/feed/{feed}.xml"
+
+    def article_path(self, feed: int, entry: int) -> str:
+        return f"/article/{feed}/{entry}.html"
+
+    def sources(self, base_url: str) -> list[dict]:
+        """Source entries in the sources.yaml shape, pointing at this site."""
+        return [{"name": f"Synthetic {feed}", "url": base_url + self.feed_path(feed), "enabled": True,
+                 "tags": ["AI"], "weight": 1.0} for feed in range(self.feeds)]
+
+    def title(self, feed: int, entry: int) -> str:
+        return _sentence(_rng(self.seed, "title", feed, entry), 8).rstrip(".")
+
+    def paragraphs_for(self, feed: int, entry: int) -> list[str]:
+        rng = _rng(self.seed, "body", feed, entry)
+        return [" ".join(_sentence(rng, rng.randint(12, 24)) for _ in range(rng.randint(3, 6)))
+                for _ in range(self.paragraphs)]
+
+    def published(self, feed: int, entry: int) -> datetime:
+        return BASE_TIME - timedelta(minutes=37 * entry + feed)
+
+    def is_atom(self, feed: int) -> bool:
+        return self.feed_format == "atom" or (self.feed_format == "mixed" and feed % 2 == 1)
+
+    def feed_xml(self, feed: int, base_url: str) -> str:
+        items = []
+        for entry in range(self.entries_per_feed):
+            title, link = escape(self.title(feed, entry)), base_url + self.article_path(feed, entry)
+            summary = escape(f"<p>{self.paragraphs_for(feed, entry)[0]}</p>")
+            published = self.published(feed, entry)
+            if self.is_atom(feed):
+                items.append(f"<entry><title>{title}</title><link href=\"{link}\"/><id>{link}</id>"
+                             f"<updated>{published.isoformat()}</updated><summary type=\"html\">{summary}</summary></entry>")
+            else:
+                items.append(f"<item><title>{title}</title><link>{link}</link><guid>{link}</guid>"
+                             f"<pubDate>{format_datetime(published)}</pubDate><description>{summary}</description></item>")
+        if self.is_atom(feed):
+            return ('<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+                    f"<title>Synthetic {feed}</title><id>{base_url}/feed/{feed}</id>"
+                    f"<updated>{BASE_TIME.isoformat()}</updated>{''.join(items)}</feed>")
+        return ('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel>'
+                f"<title>Synthetic {feed}</title><link>{base_url}/</link><description>Synthetic feed</description>"
+                f"{''.join(items)}</channel></rss>")
+
+    def article_html(self, feed: int, entry: int) -> str:
+        body = "".join(f"<p>{escape(paragraph)}</p>" for paragraph in self.paragraphs_for(feed, entry))
+        nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(12))
+        return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{escape(self.title(feed, entry))}</title></head>"
+                f"<body><header><nav><ul>{nav}</ul></nav></header><main><article>"
+                f"<h1>{escape(self.title(feed, entry))}</h1><p class=\"byline\">By Synthetic Writer</p>{body}"
+                f"</article></main><footer><p>© Synthetic News. All rights reserved.</p><ul>{nav}</ul></footer></body></html>")
+
+
+class FixtureServer:
+    """
+    Serves a SyntheticSite on 127.0.0.1 (an ephemeral port by default) from a background thread.
+
+        with FixtureServer(SyntheticSite(feeds=10), latency_ms=50) as server:
+            sources = server.site.sources(server.base_url)
+    """
+    def __init__(self, site: SyntheticSite, port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0.0):
+        self.site = site
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def _fails(self, path: str) -> bool:
+        return self.error_rate > 0 and _rng(self.site.seed, "error", path).random() < self.error_rate
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like real publishers
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                server._delay()
+                parts = self.path.split("?")[0].strip("/").split("/")
+                try:
+                    if server._fails(self.path):
+                        return self._send(500, "text/plain", "Injected error")
+                    if len(parts) == 2 and parts[0] == "feed" and parts[1].endswith(".xml"):
+                        feed = int(parts[1][:-4])
+                        if feed < server.site.feeds:
+                            content_type = "application/atom+xml" if server.site.is_atom(feed) else "application/rss+xml"
+                            return self._send(200, content_type, server.site.feed_xml(feed, server.base_url))
+                    if len(parts) == 3 and parts[0] == "article" and parts[2].endswith(".html"):
+                        feed, entry = int(parts[1]), int(parts[2][:-5])
+                        if feed < server.site.feeds and entry < server.site.entries_per_feed:
+                            return self._send(200, "text/html; charset=utf-8", server.site.article_html(feed, entry))
+                except ValueError:
+                    pass
+                self._send(404, "text/plain", "Not found")
+
+            def _send(self, status: int, content_type: str, body: str):
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *_args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *_exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=50, help="Entries per feed.")
+    parser.add_argument("--format", choices=["mixed", "rss", "atom"], default="mixed")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of URLs answering HTTP 500.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.feeds, args.entries, seed=args.seed, feed_format=args.format)
+    server = FixtureServer(site, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_rate=args.error_rate)
+    print(f"Serving {site.feeds} feeds x {site.entries_per_feed} entries on {server.base_url}/feed/0.xml ... (Ctrl-C stops)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
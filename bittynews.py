@@ -0,0 +1,351 @@
+# BittyNews/bittynews.py
+"""
+Command-line entry point for BittyNews maintenance and query tasks.
+
+    python bittynews.py search "mistral" --source "TechCrunch (Official)" --since 2025-04-01
+
+The daily pipeline itself still runs via main.py and send_newsletter_job.py.
+Each command imports only what it needs, so quick queries stay quick.
+"""
+import argparse
+import sys
+
+
+def cmd_search(args) -> int:
+    from utils import db_utils
+    from utils.search_utils import search_articles
+
+    db_utils.create_tables_if_not_exist()
+    relevant = {"yes": True, "no": False}.get(args.relevant)
+    results = search_articles(
+        " ".join(args.query),
+        source=args.source,
+        since=args.since,
+        until=args.until,
+        relevant_only=relevant,
+        limit=args.limit,
+        raw=args.raw,
+        include_archives=args.include_archives,
+    )
+    if not results:
+        print("No matching articles.")
+        return 0
+    for hit in results:
+        relevance = {1: "AI", 0: "--"}.get(hit["is_ai_relevant"], "??")
+        print(f"[{hit['rank']:7.2f}] {relevance} {hit['published_at'] or 'N/A':<19} {hit['source_name']} | {hit['title']}")
+        print(f"          {hit['snippet']}")
+        print(f"          {hit['link']}")
+    print(f"\n{len(results)} result(s).")
+    return 0
+
+
+def cmd_archive(args) -> int:
+    from utils import db_utils
+    from utils import archive_utils
+
+    db_utils.create_tables_if_not_exist()
+    moved = archive_utils.archive_old_articles(older_than_days=args.older_than_days, dry_run=args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    for month, count in moved.items():
+        print(f"{verb} {count:>6} articles -> {archive_utils.archive_path_for_month(month)}")
+    print(f"{verb} {sum(moved.values())} articles in total.")
+    return 0
+
+
+def cmd_export(args) -> int:
+    from utils import db_utils
+    from utils import export_utils
+
+    db_utils.create_tables_if_not_exist()
+    exported = export_utils.export_all(export_dir=args.output, chunk_rows=args.chunk_rows, full=args.full)
+    for table, count in exported.items():
+        print(f"Exported {count:>7} new rows from '{table}'.")
+    return 0
+
+
+def cmd_subscribers(args) -> int:
+    from utils import db_utils
+
+    db_utils.create_tables_if_not_exist()
+    if args.action == "add":
+        tags = db_utils.split_preferences(args.tags) if args.tags is not None else None
+        sources = db_utils.split_preferences(args.sources) if args.sources is not None else None
+        added = sum(db_utils.add_subscriber(email, tags=tags, sources=sources) for email in args.emails)
+        print(f"Added/re-activated {added} subscriber(s).")
+    elif args.action == "remove":
+        removed = sum(db_utils.unsubscribe(email) for email in args.emails)
+        print(f"Unsubscribed {removed} subscriber(s).")
+    else:
+        for subscriber in db_utils.iter_active_subscribers():
+            preferences = ", ".join(filter(None, [
+                subscriber["preferred_tags"] and f"tags: {subscriber['preferred_tags']}",
+                subscriber["preferred_sources"] and f"sources: {subscriber['preferred_sources']}",
+            ]))
+            print(f"{subscriber['email']}" + (f" ({subscriber['name']})" if subscriber["name"] else "")
+                  + (f" [{preferences}]" if preferences else ""))
+        print(f"\n{db_utils.count_active_subscribers()} active subscriber(s).")
+    return 0
+
+
+def cmd_outbox(args) -> int:
+    from utils import db_utils
+    from utils import outbox_utils
+
+    db_utils.create_tables_if_not_exist()
+    if args.action == "deliver":
+        totals = outbox_utils.deliver_outbox(max_messages=args.max_messages)
+        print(f"Sent {totals['sent']}, retrying {totals['retrying']}, failed {totals['failed']} message(s).")
+        return 1 if totals["failed"] else 0
+    status = outbox_utils.outbox_status()
+    next_attempt_at = status.pop("next_attempt_at")
+    for state, counts in sorted(status.items()):
+        print(f"{state:<8} {counts['messages']:>6} message(s) {counts['recipients'] or 0:>8} recipient(s)")
+    if next_attempt_at:
+        print(f"Next retry due at {next_attempt_at} (UTC).")
+    return 0
+
+
+def cmd_feed(args) -> int:
+    from utils import db_utils
+    from utils import render_utils
+
+    db_utils.create_tables_if_not_exist()
+    if args.write:
+        for fmt, path in render_utils.write_feeds(feed_dir=args.output).items():
+            print(f"Wrote {fmt} feed -> {path}")
+        return 0
+    articles = db_utils.get_recently_sent_articles(args.limit)
+    print(render_utils.render_digest(articles, args.format))
+    return 0
+
+
+def cmd_sources(args) -> int:
+    from utils import db_utils
+    from utils import health_utils
+
+    db_utils.create_tables_if_not_exist()
+    if args.action == "reset":
+        cleared = sum(db_utils.clear_source_quarantine(name) for name in args.names)
+        print(f"Lifted quarantine for {cleared} source(s).")
+        return 0
+    rows = health_utils.health_report(sort=args.sort)[:args.limit]
+    if not rows:
+        print("No source health recorded yet.")
+        return 0
+    print(f"{'source':<28} {'polls':>5} {'fails':>5} {'streak':>6} {'latency':>8} {'bozo':>5} {'fulltext':>8} {'aborts':>6}  quarantined until")
+    for row in rows:
+        fulltext = f"{row['fulltext_success_rate']:.0%}" if row["fulltext_success_rate"] is not None else "-"
+        print(f"{row['source_name'][:28]:<28} {row['polls']:>5} {row['failures']:>5} {row['consecutive_failures']:>6} "
+              f"{row['avg_latency_seconds'] or 0:>7.2f}s {row['bozo_rate'] or 0:>5.0%} {fulltext:>8} {row['fulltext_aborts'] or 0:>6}  "
+              f"{row['quarantined_until'] if health_utils.is_quarantined(row) else '-'}")
+        if row["consecutive_failures"] and row["last_error"]:
+            print(f"    last error: {row['last_error'][:100]}")
+    return 0
+
+
+def cmd_rules(args) -> int:
+    from collections import Counter
+    from utils import db_utils
+    from utils import rules_utils
+
+    db_utils.create_tables_if_not_exist()
+    rules = rules_utils.get_rules()
+    if rules is None:
+        print("The rule gate is off (FILTER_RULES_FILE).")
+        return 0
+    outcomes, examples, overruled, evaluated = Counter(), {}, [], 0
+    for row in db_utils.iter_recent_articles(args.limit):
+        decision = rules_utils.evaluate_article(row)
+        evaluated += 1
+        outcomes[decision.reason] += 1
+        if not decision.passed:
+            examples.setdefault(decision.reason, []).append(f"{decision.label:<32} {(row['title'] or '')[:70]}")
+            if row["is_ai_relevant"] and row["ai_filter_model_used"] != rules_utils.RULES_MODEL_NAME:
+                overruled.append(row["title"] or row["link"])
+    print(f"Rules applied to the {evaluated} most recent articles (nothing is written):")
+    for reason, count in outcomes.most_common():
+        print(f"  {reason:<12} {count:>6}  {count / max(evaluated, 1):>5.0%}")
+        for example in examples.get(reason, [])[:args.examples]:
+            print(f"      {example}")
+    if overruled:
+        print(f"\n{len(overruled)} rejected article(s) were judged AI-relevant by the LLM:")
+        for title in overruled[:args.examples]:
+            print(f"  {title[:90]}")
+    return 0
+
+
+def cmd_budget(args) -> int:
+    from datetime import datetime, timedelta
+    from utils import db_utils
+    from utils.settings import get_settings
+
+    db_utils.create_tables_if_not_exist()
+    since = (datetime.utcnow() - timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+    rows = db_utils.get_llm_token_usage(since)
+    budget = get_settings().llm_daily_token_budget
+    print(f"Daily token budget: {budget if budget else 'none'} (LLM_DAILY_TOKEN_BUDGET)")
+    if not rows:
+        print("No LLM usage recorded yet.")
+        return 0
+    print(f"{'day':<10} {'provider':<11} {'calls':>6} {'prompt':>9} {'completion':>10} {'total':>9} {'estimated':>9}")
+    for row in rows:
+        print(f"{row['day']:<10} {row['provider']:<11} {row['calls']:>6} {row['prompt_tokens']:>9} "
+              f"{row['completion_tokens']:>10} {row['total_tokens']:>9} {row['estimated_calls']:>9}")
+    return 0
+
+
+def cmd_trends(args) -> int:
+    from utils import cluster_utils
+    from utils import db_utils
+    from utils.settings import get_settings
+
+    db_utils.create_tables_if_not_exist()
+    if args.cluster:
+        cluster_utils.cluster_recent_articles()
+    settings = get_settings()
+    recent_hours = args.hours or settings.trend_recent_hours
+    baseline_hours = args.baseline_hours or settings.trend_baseline_hours
+    trends = cluster_utils.trending(recent_hours=recent_hours, baseline_hours=baseline_hours, limit=args.limit)
+    if not trends:
+        print(f"No topic is accelerating over the last {recent_hours:g}h (is the cluster stage running?).")
+        return 0
+    print(f"Topics accelerating over the last {recent_hours:g}h, against the {baseline_hours:g}h before:")
+    print(f"{'speed-up':>8} {'recent':>6} {'before':>6} {'sources':>7}  topic")
+    for trend in trends:
+        print(f"{trend['acceleration']:>7.1f}x {trend['recent']:>6} {trend['baseline']:>6} {trend['sources']:>7}  {trend['label']}")
+        for title in trend["titles"][:args.examples]:
+            print(f"{'':>31}- {(title or '')[:80]}")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    import api
+
+    api.serve(args.host, args.port, args.cache_entries)
+    return 0
+
+
+def cmd_pipeline(args) -> int:
+    import pipeline
+
+    results = pipeline.run_pipeline(filter_workers=args.filter_workers, summarize_workers=args.summarize_workers)
+    return 1 if any(stage["errors"] for stage in results.values()) else 0
+
+
+def cmd_daemon(args) -> int:
+    import daemon
+
+    intervals = daemon.stage_intervals()
+    if args.stages:
+        wanted = {stage.strip() for stage in args.stages.split(",")}
+        intervals = {stage: interval for stage, interval in intervals.items() if stage in wanted}
+    daemon.run_daemon(intervals)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bittynews", description="BittyNews command-line tools.")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Capture every HTTP exchange into this cassette (.jsonl.gz).")
+    cassette.add_argument("--replay", metavar="CASSETTE", help="Serve HTTP from this cassette instead of the network "
+                                                               "(defaults to $HTTP_CASSETTE_MODE / $HTTP_CASSETTE).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="Full-text search over stored articles (BM25 ranked).")
+    search.add_argument("query", nargs="+", help="Search terms (all must match; end a term with * for prefix).")
+    search.add_argument("--source", help="Only this source_name.")
+    search.add_argument("--since", help="Published on/after this date (YYYY-MM-DD).")
+    search.add_argument("--until", help="Published on/before this date (YYYY-MM-DD).")
+    search.add_argument("--relevant", choices=["yes", "no", "any"], default="any", help="Filter on AI relevance.")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--raw", action="store_true", help="Pass the query to FTS5 as-is (OR, NEAR, column:term).")
+    search.add_argument("--include-archives", action="store_true", help="Also search monthly archive databases.")
+    search.set_defaults(func=cmd_search)
+
+    archive = subparsers.add_parser("archive", help="Move old sent/rejected articles into monthly archive DBs.")
+    archive.add_argument("--older-than-days", type=int, default=None, help="Defaults to ARCHIVE_AFTER_DAYS (90).")
+    archive.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+    archive.set_defaults(func=cmd_archive)
+
+    export = subparsers.add_parser("export", help="Incrementally export articles and pipeline telemetry to Parquet.")
+    export.add_argument("--output", help="Export directory (defaults to EXPORT_DIR, ./exports).")
+    export.add_argument("--chunk-rows", type=int, default=None, help="Rows per read/write chunk (EXPORT_CHUNK_ROWS).")
+    export.add_argument("--full", action="store_true", help="Ignore watermarks and rewrite the datasets from scratch.")
+    export.set_defaults(func=cmd_export)
+
+    subscribers = subparsers.add_parser("subscribers", help="Manage newsletter subscribers.")
+    subscribers.add_argument("action", choices=["add", "remove", "list"])
+    subscribers.add_argument("emails", nargs="*", help="Email addresses (for add/remove).")
+    subscribers.add_argument("--tags", help="add: comma-separated source tags to favour, e.g. 'AI,Startups'.")
+    subscribers.add_argument("--sources", help="add: comma-separated source names to favour.")
+    subscribers.set_defaults(func=cmd_subscribers)
+
+    outbox = subparsers.add_parser("outbox", help="Deliver or inspect queued newsletter emails.")
+    outbox.add_argument("action", choices=["deliver", "status"])
+    outbox.add_argument("--max-messages", type=int, default=None, help="deliver: stop after this many messages.")
+    outbox.set_defaults(func=cmd_outbox)
+
+    feed = subparsers.add_parser("feed", help="Render recently sent articles as HTML, text, JSON Feed or RSS.")
+    feed.add_argument("--format", choices=["html", "text", "json", "rss"], default="rss")
+    feed.add_argument("--limit", type=int, default=50, help="Number of most recently sent articles.")
+    feed.add_argument("--write", action="store_true", help="Write the JSON Feed and RSS files (FEED_DIR) instead of printing.")
+    feed.add_argument("--output", help="--write: directory to write to instead of FEED_DIR.")
+    feed.set_defaults(func=cmd_feed)
+
+    sources = subparsers.add_parser("sources", help="Show feed health (slowest / most failing sources) or lift a quarantine.")
+    sources.add_argument("action", choices=["health", "reset"], nargs="?", default="health")
+    sources.add_argument("names", nargs="*", help="reset: source names to poll again on the next scrape.")
+    sources.add_argument("--sort", choices=["errors", "latency"], default="errors", help="health: worst first by this.")
+    sources.add_argument("--limit", type=int, default=20)
+    sources.set_defaults(func=cmd_sources)
+
+    rules = subparsers.add_parser("rules", help="Dry-run the pre-LLM rule gate (config/filter_rules.yaml) over recent articles.")
+    rules.add_argument("--limit", type=int, default=1000, help="Most recently fetched articles to check.")
+    rules.add_argument("--examples", type=int, default=3, help="Rejected titles shown per reason.")
+    rules.set_defaults(func=cmd_rules)
+
+    budget = subparsers.add_parser("budget", help="LLM tokens spent per day and provider, against LLM_DAILY_TOKEN_BUDGET.")
+    budget.add_argument("--days", type=int, default=7)
+    budget.set_defaults(func=cmd_budget)
+
+    trends = subparsers.add_parser("trends", help="Story clusters whose article rate is accelerating.")
+    trends.add_argument("--hours", type=float, default=None, help="Recent window (TREND_RECENT_HOURS, 24).")
+    trends.add_argument("--baseline-hours", type=float, default=None, help="Window before it to compare with (TREND_BASELINE_HOURS, 72).")
+    trends.add_argument("--limit", type=int, default=10)
+    trends.add_argument("--examples", type=int, default=2, help="Recent titles shown per topic.")
+    trends.add_argument("--cluster", action="store_true", help="Cluster new articles first (as the cluster stage does).")
+    trends.set_defaults(func=cmd_trends)
+
+    serve = subparsers.add_parser("serve", help="Local HTTP API over the articles (list, read, save / mark interesting).")
+    serve.add_argument("--host", default=None, help="Defaults to API_HOST (127.0.0.1).")
+    serve.add_argument("--port", type=int, default=None, help="Defaults to API_PORT (8088).")
+    serve.add_argument("--cache-entries", type=int, default=None, help="Defaults to API_CACHE_ENTRIES (512); 0 disables the cache.")
+    serve.set_defaults(func=cmd_serve)
+
+    pipeline = subparsers.add_parser("pipeline", help="One scrape/filter/summarize run with the stages streaming into each other.")
+    pipeline.add_argument("--filter-workers", type=int, default=None, help="Defaults to PIPELINE_FILTER_WORKERS (2).")
+    pipeline.add_argument("--summarize-workers", type=int, default=None, help="Defaults to PIPELINE_SUMMARIZE_WORKERS (1).")
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    daemon = subparsers.add_parser("daemon", help="Run the pipeline stages on intervals in one long-lived process.")
+    daemon.add_argument("--stages", help="Comma-separated subset of: scrape, filter, summarize, cluster, newsletter, delivery.")
+    daemon.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    from utils.settings import get_settings
+    get_settings()  # Load .env once, before the command's modules read their configuration
+    from utils import cassette_utils
+    cassette = cassette_utils.enable("record" if args.record else "replay" if args.replay else None,
+                                     args.record or args.replay)
+    status = args.func(args)
+    if cassette is not None:
+        cassette_utils.report()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# BittyNews/daemon.py
+"""
+Long-running BittyNews process, instead of cron starting main.py / send_newsletter_job.py cold.
+
+    python bittynews.py daemon        (or: python daemon.py)
+
+Each stage runs on its own interval (seconds, DAEMON_<STAGE>_INTERVAL). Stages run one at a
+time in this process, so the agents, the Brevo and LLM HTTP connection pools, the Jinja2
+environment and the render/fragment caches stay warm between cycles. When a scrape stores new
+articles, filtering is pulled forward, and likewise summarizing after filtering.
+
+On start, each stage is scheduled from its last start recorded in pipeline_runs, so restarting
+the daemon doesn't send a second newsletter.
+
+Signals: SIGTERM / SIGINT finish the stage in progress (filtering and summarizing stop after the
+current article; the rest stays queued) and exit. SIGHUP reloads sources.yaml before the next scrape.
+
+Metrics (utils/metrics_utils.py) are written to METRICS_TEXTFILE after every stage and, with
+METRICS_PORT set, served on http://127.0.0.1:<port>/metrics for the life of the process.
+"""
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+# --- Daemon Configuration ---
+STAGES = ("scrape", "filter", "summarize", "cluster", "newsletter", "delivery")  # Each on DAEMON_<STAGE>_INTERVAL
+# Stage that is pulled forward when the previous one produced work for it
+FOLLOW_UP_STAGES = {"scrape": "filter", "filter": "summarize"}
+
+
+def stage_intervals() -> dict[str, int]:
+    """{stage: interval in seconds} from the DAEMON_<STAGE>_INTERVAL settings (0 disables a stage)."""
+    from utils.settings import get_settings
+    settings = get_settings()
+    return {stage: getattr(settings, f"daemon_{stage}_interval") for stage in STAGES}
+
+
+class Daemon:
+    def __init__(self, intervals: dict | None = None):
+        import main
+        from utils import db_utils
+        from agents.aifiltering.ai_filter_agent import AIFilterAgent
+        from agents.summarizer.summarizer_agent import SummarizerAgent
+
+        from utils import metrics_utils
+        from utils.log_utils import get_logger
+
+        self.pipeline = main
+        self.db_utils = db_utils
+        self.metrics_utils = metrics_utils
+        self.log = get_logger("daemon")
+        self.intervals = {stage: interval for stage, interval in (intervals or stage_intervals()).items() if interval > 0}
+        self.stop_event = threading.Event()
+        self.reload_sources = threading.Event()
+
+        main.load_environment_and_debug()
+        db_utils.create_tables_if_not_exist()
+        # Warm state kept for the life of the process
+        self.scraper = None  # Created on the first scrape (and again after SIGHUP)
+        self.ai_filter = AIFilterAgent()
+        self.summarizer = SummarizerAgent()
+        self.next_due = self._initial_schedule()
+
+    def _initial_schedule(self) -> dict:
+        now = time.time()
+        schedule = {}
+        for stage, interval in self.intervals.items():
+            last_started = self.db_utils.get_last_stage_start(stage)
+            schedule[stage] = max(now, last_started + interval) if last_started else now
+        return schedule
+
+    def _install_signal_handlers(self):
+        def request_stop(signum, _frame):
+            self.log.info("\n🛑 Received %s; finishing the current stage, then exiting...", signal.Signals(signum).name)
+            self.stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda _signum, _frame: self.reload_sources.set())
+
+    def run_stage(self, stage: str) -> int:
+        """Runs one stage with the warm agents. Returns the amount of work it produced (new/retained/...)."""
+        run_id = self.db_utils.new_run_id()
+        if stage == "scrape":
+            if self.scraper is None or self.reload_sources.is_set():
+                from agents.scraper.scraper_agent import ScraperAgent
+                self.reload_sources.clear()
+                self.scraper = ScraperAgent()
+            return self.pipeline.run_scrape_stage(run_id, self.scraper)
+        if stage == "filter":
+            return self.pipeline.run_filter_stage(run_id, self.ai_filter, stop_event=self.stop_event)
+        if stage == "summarize":
+            return self.pipeline.run_summarize_stage(run_id, self.summarizer, stop_event=self.stop_event)
+        if stage == "cluster":
+            return self.pipeline.run_cluster_stage(run_id)
+        if stage == "newsletter":
+            import send_newsletter_job
+            send_newsletter_job.generate_and_send_newsletter()
+            return 0
+        if stage == "delivery":
+            from utils import outbox_utils
+            stage_started = time.time()
+            totals = outbox_utils.deliver_outbox()
+            if any(totals.values()):
+                self.db_utils.record_stage_run(run_id, "delivery", stage_started, items_out=totals["sent"],
+                                               errors=totals["retrying"] + totals["failed"])
+            return totals["sent"]
+        raise ValueError(f"Unknown stage '{stage}'")
+
+    def run(self):
+        self._install_signal_handlers()
+        self.log.info("--- BittyNews daemon started at %s (pid %d) ---", datetime.now(), os.getpid())
+        self.log.info("Stage intervals: %s", ", ".join(f"{stage}={interval}s" for stage, interval in self.intervals.items()))
+        metrics_server = self.metrics_utils.serve_metrics() # METRICS_PORT, if set
+        while not self.stop_event.is_set() and self.next_due:
+            stage, due = min(self.next_due.items(), key=lambda item: item[1])
+            wait_seconds = due - time.time()
+            if wait_seconds > 0:
+                self.log.debug("Next stage '%s' in %.0fs.", stage, wait_seconds)
+                if self.stop_event.wait(wait_seconds):
+                    break
+
+            self.log.info("\n▶️  [%s] Running stage '%s'...", f"{datetime.now():%Y-%m-%d %H:%M:%S}", stage)
+            produced = 0
+            try:
+                produced = self.run_stage(stage)
+            except Exception as e:
+                # A failing stage must not take the daemon down; it is retried on its next interval
+                self.log.error("Stage '%s' failed: %s", stage, e, exc_info=True, extra={"stage": stage})
+            self.metrics_utils.write_textfile() # METRICS_TEXTFILE, if set
+            self.next_due[stage] = time.time() + self.intervals[stage]
+            follow_up = FOLLOW_UP_STAGES.get(stage)
+            if produced and follow_up in self.next_due:
+                self.next_due[follow_up] = min(self.next_due[follow_up], time.time())
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        self.log.info("--- BittyNews daemon stopped at %s ---", datetime.now())
+
+
+def run_daemon(intervals: dict | None = None):
+    Daemon(intervals).run()
+
+
+if __name__ == "__main__":
+    run_daemon()
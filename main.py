@@ -1,114 +1,248 @@
 # BittyNews/main.py
-import os
 import time
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING
 
-# Import utility and agent classes
+from utils.settings import ENV_FILE, get_settings
+get_settings() # Load .env before the modules below read their import-time configuration (DATABASE_NAME, ...)
+
+from utils import budget_utils
+from utils import cassette_utils
 from utils import db_utils # For direct DB interactions from main if needed, and table creation
-from agents.scraper.scraper_agent import ScraperAgent
-from agents.aifiltering.ai_filter_agent import AIFilterAgent
-from agents.summarizer.summarizer_agent import SummarizerAgent
+from utils import metrics_utils
+from utils import profile_utils
+from utils import rules_utils
+from utils.log_utils import get_logger, get_article_logger
+
+# The agents pull in newspaper3k, bs4, feedparser and requests, so each stage imports only its own
+if TYPE_CHECKING:
+    from agents.scraper.scraper_agent import ScraperAgent
+    from agents.aifiltering.ai_filter_agent import AIFilterAgent
+    from agents.summarizer.summarizer_agent import SummarizerAgent
+
+log = get_logger("main")
+article_log = get_article_logger("main")
 
 def load_environment_and_debug():
-    """Loads .env and prints some initial debug info."""
-    # .env loading is also handled by llm_utils and db_utils,
-    # but calling it here ensures any main.py specific .env vars are loaded early.
-    # python-dotenv is safe to call multiple times.
-    dotenv_path = os.path.join(os.getcwd(), '.env')
-    loaded = load_dotenv(dotenv_path)
-    
-    print("--- Initial Environment Debug ---")
-    if loaded:
-        print(f"DEBUG main: .env successfully loaded from {dotenv_path}")
+    """Loads .env (via the settings snapshot) and prints some initial debug info."""
+    settings = get_settings()
+    if settings.env_loaded:
+        log.debug(".env successfully loaded from %s", ENV_FILE)
     else:
-        print(f"DEBUG main: WARNING - .env file not found or not loaded from {dotenv_path}")
+        log.warning(".env file not found or not loaded from %s", ENV_FILE)
         
-    print(f"DEBUG main: GROQ_API_KEY Loaded: {'Yes' if os.getenv('GROQ_API_KEY') else 'No'}")
-    print(f"DEBUG main: OPENROUTER_API_KEY Loaded: {'Yes' if os.getenv('OPENROUTER_API_KEY') else 'No'}")
-    print(f"DEBUG main: PRIMARY_GROQ_MODEL: '{os.getenv('PRIMARY_GROQ_MODEL')}'")
-    print(f"DEBUG main: FALLBACK_OPENROUTER_MODEL: '{os.getenv('FALLBACK_OPENROUTER_MODEL')}'")
-    print("---------------------------------")
+    log.debug("GROQ_API_KEY Loaded: %s", 'Yes' if settings.groq_api_key else 'No')
+    log.debug("OPENROUTER_API_KEY Loaded: %s", 'Yes' if settings.openrouter_api_key else 'No')
+    log.debug("PRIMARY_GROQ_MODEL: '%s'", settings.primary_groq_model)
+    log.debug("FALLBACK_OPENROUTER_MODEL: '%s'", settings.fallback_openrouter_model)
 
-def main():
-    load_environment_and_debug()
+def _pause(seconds: float, stop_event=None):
+    """Rate-limit pause; returns early if the daemon is shutting down."""
+    if cassette_utils.replaying(): # Responses come from a cassette; there is no remote service to spare
+        return
+    with profile_utils.span("rate_limit_pause"):
+        if stop_event is not None:
+            stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
 
-    # --- 1. Scrape and Store New Articles ---
-    scraper = ScraperAgent()
-    print("\n🔍 Fetching and storing new articles...")
-    total_feed_items, newly_added_to_db = scraper.fetch()
-    print(f"ℹ️  Scraper processed {total_feed_items} items from feeds, added {newly_added_to_db} new articles to the database.")
+def filter_article(article, ai_filter: "AIFilterAgent") -> tuple[bool, bool]:
+    """
+    AI relevance for one article (row or dict with link, title, original_summary, content_hash and
+    published_at or published_parsed), stored in the DB. Returns (is_relevant, from_cache);
+    from_cache means no LLM call was made: a cache hit, or a rejection by the rule gate.
+    """
+    title_for_filter = article['title'] or ""
+    content_for_filter = article['original_summary'] or "" # Use original_summary from DB
 
-    # --- 2. AI Relevance Filtering ---
-    ai_filter = AIFilterAgent() # Uses defaults from its __init__ or .env via call_llm
-    articles_to_filter = db_utils.get_articles_for_filtering()
+    # Cheap rules first (config/filter_rules.yaml): junk is rejected here and never reaches the LLM
+    with profile_utils.span("rules"):
+        decision = rules_utils.evaluate_article(article)
+    if decision is not None:
+        metrics_utils.RULE_DECISIONS.inc(decision=decision.reason)
+        if not decision.passed:
+            article_log.info("  ➖ Rejected by rules (%s): %s", decision.label, title_for_filter[:60])
+            db_utils.update_article_rule_rejection(article["link"], decision.label, decision.score,
+                                                   model_used=rules_utils.RULES_MODEL_NAME)
+            return False, True
 
-    if not articles_to_filter:
-        print("\n✅ No new articles to filter for AI relevance.")
+    # Identical title + body already filtered before (e.g. is_ai_relevant was reset): reuse, no LLM call
+    cached = db_utils.get_cached_llm_result(article["content_hash"], "filter")
+    if cached:
+        is_relevant, model_used = cached[0] == "1", cached[1]
+        metrics_utils.LLM_CACHE_HITS.inc(stage="filter")
     else:
-        print(f"\n🔍 Filtering {len(articles_to_filter)} articles for AI relevance...")
-        retained_count = 0
-        for i, article_dict in enumerate(articles_to_filter):
-            article_title = article_dict.get('title', 'No Title')
-            print(f"  Filtering article {i+1}/{len(articles_to_filter)}: {article_title[:70]}...")
-            
-            title_for_filter = article_dict.get("title", "")
-            content_for_filter = article_dict.get("original_summary", "") # Use original_summary from DB
+        is_relevant = ai_filter.is_about_ai(title_for_filter, content_for_filter)
+        model_used = ai_filter.primary_groq_model_for_agent or get_settings().primary_groq_model
+    
+    # Update the database with the filtering result
+    db_utils.update_article_ai_relevance(
+        link=article["link"], 
+        is_relevant=is_relevant,
+        model_used=model_used, # Log model used
+        rule_decision=decision.label if decision is not None else None,
+        rule_score=decision.score if decision is not None else None,
+    )
+    return bool(is_relevant), bool(cached)
 
-            is_relevant = ai_filter.is_about_ai(title_for_filter, content_for_filter)
-            
-            # Update the database with the filtering result
-            db_utils.update_article_ai_relevance(
-                link=article_dict["link"], 
-                is_relevant=is_relevant,
-                model_used=(ai_filter.primary_groq_model_for_agent or os.getenv("PRIMARY_GROQ_MODEL")) # Log model used
-            )
+def summarize_article(article, summarizer: "SummarizerAgent") -> tuple[str, bool]:
+    """
+    LLM summary for one AI-relevant article, stored in the DB. Returns (summary, from_cache).
+    Failed summaries are SummarizerAgent's "[Summary ...]" placeholders.
+    """
+    cached = db_utils.get_cached_llm_result(article["content_hash"], "summarize")
+    if cached:
+        generated_summary, model_used = cached
+        metrics_utils.LLM_CACHE_HITS.inc(stage="summarize")
+    else:
+        generated_summary = summarizer.summarize(article) # Pass the whole dict
+        model_used = summarizer.primary_model or get_settings().primary_groq_model
+
+    # Update the database with the summary
+    db_utils.update_article_llm_summary(
+        link=article["link"],
+        summary_text=generated_summary,
+        model_used=model_used
+    )
+    return generated_summary, bool(cached)
+
+def run_scrape_stage(run_id: str, scraper: "ScraperAgent | None" = None) -> int:
+    """Stage 1: scrape the feeds and store new articles. Returns the number of new articles."""
+    stage_started = time.time()
+    if scraper is None:
+        from agents.scraper.scraper_agent import ScraperAgent
+        scraper = ScraperAgent()
+    log.info("\n🔍 Fetching and storing new articles...")
+    total_feed_items, newly_added_to_db = scraper.fetch()
+    log.info("ℹ️  Scraper processed %d items from feeds, added %d new articles to the database.", total_feed_items, newly_added_to_db)
+    db_utils.record_stage_run(run_id, "scrape", stage_started, items_in=total_feed_items, items_out=newly_added_to_db)
+    return newly_added_to_db
+
+def run_filter_stage(run_id: str, ai_filter: "AIFilterAgent | None" = None, stop_event=None) -> int:
+    """
+    Stage 2: AI relevance filtering of the queue. Returns the number of articles marked relevant.
+    If `stop_event` is set mid-way, the article in progress is finished and the rest stays queued.
+    """
+    stage_started = time.time()
+    settings = get_settings()
+    retained_count = 0
+    if ai_filter is None:
+        from agents.aifiltering.ai_filter_agent import AIFilterAgent
+        ai_filter = AIFilterAgent() # Uses defaults from its __init__ or .env via call_llm
+    # Stream the queue page by page instead of loading every unfiltered body up front
+    pending_filter_count = db_utils.count_articles_for_filtering()
+
+    if not pending_filter_count:
+        log.info("\n✅ No new articles to filter for AI relevance.")
+    else:
+        log.info("\n🔍 Filtering %d articles for AI relevance...", pending_filter_count)
+        for i, article_row in enumerate(db_utils.iter_articles_for_filtering()):
+            if stop_event is not None and stop_event.is_set():
+                log.info("⏸️  Shutdown requested; %d articles left for the next run.", pending_filter_count - i)
+                break
+            article_title = article_row['title'] or 'No Title'
+            article_log.info("  Filtering article %d/%d: %s...", i + 1, pending_filter_count, article_title[:70])
+            is_relevant, cached = filter_article(article_row, ai_filter)
             if is_relevant:
                 retained_count +=1
             
-            # Configurable delay to respect API rate limits
-            time.sleep(float(os.getenv("FILTER_DELAY_SECONDS", 1.5)))
+            if not cached:
+                # Configurable delay to respect API rate limits
+                _pause(settings.filter_delay_seconds, stop_event)
         
-        print(f"✅ AI relevance filtering complete. {retained_count} articles marked as AI-relevant.")
+        log.info("✅ AI relevance filtering complete. %d articles marked as AI-relevant.", retained_count)
+    db_utils.record_stage_run(run_id, "filter", stage_started, items_in=pending_filter_count, items_out=retained_count)
+    return retained_count
 
-    # --- 3. Summarization of AI-Relevant Articles ---
-    summarizer = SummarizerAgent() # Uses defaults from its __init__ or .env via call_llm
+def run_summarize_stage(run_id: str, summarizer: "SummarizerAgent | None" = None, stop_event=None) -> int:
+    """Stage 3: summarize AI-relevant articles (up to TOP_N_SUMMARIES). Returns the number summarized."""
+    stage_started = time.time()
+    settings = get_settings()
+    if summarizer is None:
+        from agents.summarizer.summarizer_agent import SummarizerAgent
+        summarizer = SummarizerAgent() # Uses defaults from its __init__ or .env via call_llm
     
     # Determine how many articles to summarize
     # We query for articles that are AI-relevant AND not yet summarized
     # TOP_N_SUMMARIES refers to how many we want to process in this run.
-    top_n_to_summarize_config = int(os.getenv("TOP_N_SUMMARIES", 5))
-    articles_needing_summary = db_utils.get_articles_for_summarization(limit=top_n_to_summarize_config)
+    top_n_to_summarize_config = settings.top_n_summaries
+    if settings.llm_daily_token_budget:
+        # Rank a wider pool by source weight and recency, and spend today's token budget on the best first
+        scheduler = budget_utils.SummaryScheduler()
+        pool = list(db_utils.iter_articles_for_summarization(limit=max(budget_utils.CANDIDATE_POOL, top_n_to_summarize_config)))
+        articles_needing_summary = scheduler.plan(pool, top_n_to_summarize_config)
+    else:
+        articles_needing_summary = list(db_utils.iter_articles_for_summarization(limit=top_n_to_summarize_config))
+    failed_summary_count = 0
+    processed_count = 0
 
     if not articles_needing_summary:
-        print("\n✅ No new AI-relevant articles to summarize.")
+        log.info("\n✅ No new AI-relevant articles to summarize.")
     else:
         actual_to_summarize_count = len(articles_needing_summary)
-        print(f"\n🧠 Summarizing {actual_to_summarize_count} AI-relevant articles (up to configured top {top_n_to_summarize_config})...\n")
+        log.info("\n🧠 Summarizing %d AI-relevant articles (up to configured top %d)...\n", actual_to_summarize_count, top_n_to_summarize_config)
 
         for i, article_dict in enumerate(articles_needing_summary):
+            if stop_event is not None and stop_event.is_set():
+                log.info("⏸️  Shutdown requested; %d articles left for the next run.", actual_to_summarize_count - i)
+                break
             article_title = article_dict.get('title', 'No Title')
-            print(f"  Summarizing article {i+1}/{actual_to_summarize_count}: {article_title[:70]}...")
-            
-            generated_summary = summarizer.summarize(article_dict) # Pass the whole dict
-            
-# Update the database with the summary
-            db_utils.update_article_llm_summary(
-                link=article_dict["link"],
-                summary_text=generated_summary,  # <--- Corrected to 'summary_text'
-                model_used=(summarizer.primary_model or os.getenv("PRIMARY_GROQ_MODEL"))
-            )
-
-            print(f"📄 Article: {article_title}")
-            print(f"   Link: {article_dict.get('link')}")
-            print(f"   Summary by LLM: {generated_summary}\n")
+            article_log.info("  Summarizing article %d/%d: %s...", i + 1, actual_to_summarize_count, article_title[:70])
+            generated_summary, cached = summarize_article(article_dict, summarizer)
+            if generated_summary.startswith("[Summary"): # SummarizerAgent's N/A / LLM error placeholders
+                failed_summary_count += 1
+            processed_count += 1
+
+            article_log.info("📄 Article: %s\n   Link: %s\n   Summary by LLM: %s\n", article_title, article_dict.get('link'), generated_summary)
             
-            time.sleep(float(os.getenv("SUMMARY_DELAY_SECONDS", 2.0)))
+            if not cached:
+                _pause(settings.summary_delay_seconds, stop_event)
         
-        print(f"✅ Summarization complete for {actual_to_summarize_count} articles.")
+        log.info("✅ Summarization complete for %d articles.", processed_count)
+    db_utils.record_stage_run(run_id, "summarize", stage_started, items_in=len(articles_needing_summary),
+                              items_out=processed_count - failed_summary_count, errors=failed_summary_count)
+    return processed_count - failed_summary_count
+
+def run_cluster_stage(run_id: str) -> int:
+    """Stage 4: group new articles into story clusters for the trend report. Returns the number clustered."""
+    stage_started = time.time()
+    from utils import cluster_utils # NumPy / SciPy, only needed once the articles are in
+    result = cluster_utils.cluster_recent_articles()
+    db_utils.record_stage_run(run_id, "cluster", stage_started, items_in=result["articles"], items_out=result["assigned"])
+    return result["assigned"]
 
-    print("\n🎉 BittyNews run complete!")
+def main():
+    load_environment_and_debug()
+    run_id = db_utils.new_run_id() # Groups this run's stage rows in pipeline_runs
+
+    with profile_utils.stage("scrape"):
+        run_scrape_stage(run_id)
+    with profile_utils.stage("filter"):
+        run_filter_stage(run_id)
+    with profile_utils.stage("summarize"):
+        run_summarize_stage(run_id)
+    with profile_utils.stage("cluster"):
+        run_cluster_stage(run_id)
+    metrics_utils.write_textfile() # METRICS_TEXTFILE, if set
+    profile_utils.report() # --profile / PROFILE, if set
+    cassette_utils.report() # --record / --replay, if set
+
+    log.info("\n🎉 BittyNews run complete!")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="One scrape -> filter -> summarize -> cluster run.")
+    parser.add_argument("--profile", nargs="?", const=profile_utils.DEFAULT_PROFILE_MODES, default=None, metavar="MODES",
+                        help="Time each stage; MODES is a comma list of spans, cprofile, tracemalloc "
+                             f"(bare --profile: {profile_utils.DEFAULT_PROFILE_MODES}; defaults to $PROFILE).")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Capture every HTTP exchange into this cassette (.jsonl.gz).")
+    cassette.add_argument("--replay", metavar="CASSETTE", help="Serve HTTP from this cassette instead of the network "
+                                                               "(defaults to $HTTP_CASSETTE_MODE / $HTTP_CASSETTE).")
+    args = parser.parse_args()
+    get_settings() # .env may set PROFILE / PROFILE_DIR / HTTP_CASSETTE*
+    profile_utils.enable(args.profile)
+    cassette_utils.enable("record" if args.record else "replay" if args.replay else None, args.record or args.replay)
+
     # 0. Ensure DB tables are created before anything else
     # This should be called once when the application is first set up,
     # or at the start of each run if it's safe (CREATE TABLE IF NOT EXISTS).
@@ -0,0 +1,259 @@
+# BittyNews/pipeline.py
+"""
+Streaming pipeline mode: scrape, filter and summarize run at the same time instead of one
+after the other, connected by bounded queues.
+
+    python bittynews.py pipeline        (or: python pipeline.py)
+
+    scraper ──new/changed articles──▶ [filter queue] ──▶ filter workers ──relevant──▶ [summarize queue] ──▶ summarize workers
+    unfiltered backlog in the DB ─────▲                  unsummarized backlog in the DB ─▲
+
+The first summary no longer waits for every feed to be scraped: feed downloads, article
+extraction and the LLM calls overlap. A full queue blocks whoever feeds it, so the scraper
+can't run arbitrarily far ahead of the LLM stages (backpressure). The DB stays the source of
+truth: an article that is queued but not yet processed is still pending there, so nothing is
+lost if the run stops early, and the next run (either mode) picks it up.
+
+Shutdown: the first SIGTERM / SIGINT stops producing (the scraper stops after the current
+article) and drains what is already queued; a second one also drops the queued items
+(they stay pending in the DB) and exits after the articles in progress.
+"""
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+
+import main as stages
+from utils import budget_utils
+from utils import db_utils
+from utils import metrics_utils
+from utils.log_utils import get_logger, get_article_logger
+from utils.settings import get_settings
+
+# --- Pipeline Configuration ---
+# Queue size and worker counts: PIPELINE_QUEUE_SIZE / PIPELINE_*_WORKERS (utils/settings.py)
+_END = object()  # End of stream, one per consumer worker
+_PUT_POLL_SECONDS = 0.5  # How often a blocked producer re-checks for shutdown
+
+log = get_logger("pipeline")
+article_log = get_article_logger("pipeline")
+
+
+class StageStats:
+    """Thread-safe counters for one stage's pipeline_runs row."""
+    def __init__(self):
+        self.started = time.time()
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, items_in: int = 0, items_out: int = 0, errors: int = 0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += errors
+
+
+class StreamingPipeline:
+    def __init__(self, filter_workers: int, summarize_workers: int, queue_size: int,
+                 scraper=None, ai_filter=None, summarizer=None, stop_event: threading.Event | None = None):
+        self.filter_workers = max(filter_workers, 1)
+        self.summarize_workers = max(summarize_workers, 1)
+        self.filter_queue = queue.Queue(maxsize=queue_size)
+        self.summarize_queue = queue.Queue(maxsize=queue_size)
+        self._queue_names = {id(self.filter_queue): "filter", id(self.summarize_queue): "summarize"}
+        self.stop_event = stop_event or threading.Event()   # Stop producing, drain the queues
+        self.abort_event = threading.Event()                 # Also drop what is still queued
+        self.scraper, self.ai_filter, self.summarizer = scraper, ai_filter, summarizer
+        self.stats = {stage: StageStats() for stage in ("scrape", "filter", "summarize")}
+
+        self._lock = threading.Lock()
+        # Links queued per stage this run: the scraper and the DB backlog can both yield an article
+        self._queued = {"filter": set(), "summarize": set()}
+        # Summaries per run are capped at TOP_N_SUMMARIES, as in batch mode
+        self._summary_budget = get_settings().top_n_summaries
+        # With LLM_DAILY_TOKEN_BUDGET set, summaries also have to fit today's token budget
+        self.scheduler = budget_utils.SummaryScheduler() if get_settings().llm_daily_token_budget else None
+
+    def _claim(self, stage: str, link: str, article=None) -> bool:
+        with self._lock:
+            if link in self._queued[stage]:
+                return False
+            if stage == "summarize":
+                if self._summary_budget <= 0:
+                    return False
+                if self.scheduler is not None and article is not None and not self.scheduler.admit(article):
+                    return False # Stays unsummarized in the DB for a later run
+                self._summary_budget -= 1
+            self._queued[stage].add(link)
+            return True
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Blocking put that gives up on abort. Returns False if the item was not queued."""
+        while not self.abort_event.is_set():
+            try:
+                target.put(item, timeout=_PUT_POLL_SECONDS)
+                metrics_utils.QUEUE_DEPTH.set(target.qsize(), queue=self._queue_names[id(target)])
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # --- Producers ---
+    def _offer_for_filtering(self, article: dict):
+        if self._claim("filter", article["link"]):
+            self._put(self.filter_queue, article)
+
+    def _scrape(self):
+        def on_article(article_data):
+            article = dict(article_data, content_hash=db_utils.compute_content_hash(
+                article_data["title"], article_data["original_summary"]))
+            self._offer_for_filtering(article)
+
+        total_feed_items, new_articles = self.scraper.fetch(on_article=on_article, stop_event=self.stop_event)
+        self.stats["scrape"].add(items_in=total_feed_items, items_out=new_articles)
+
+    def _feed_filter_backlog(self):
+        for row in db_utils.iter_articles_for_filtering():
+            if self.stop_event.is_set():
+                return
+            self._offer_for_filtering(dict(row))
+
+    def _feed_summarize_backlog(self):
+        top_n = get_settings().top_n_summaries
+        if self.scheduler is not None: # Highest priority first, within today's token budget (already reserved by plan)
+            rows = self.scheduler.plan(list(db_utils.iter_articles_for_summarization(
+                limit=max(budget_utils.CANDIDATE_POOL, top_n))), top_n)
+        else:
+            rows = db_utils.iter_articles_for_summarization(limit=top_n)
+        for row in rows:
+            if self.stop_event.is_set():
+                return
+            if self._claim("summarize", row["link"]):
+                self._put(self.summarize_queue, dict(row))
+            elif self.scheduler is not None:
+                self.scheduler.release(row) # Already queued (and charged) via the filter stage, or over TOP_N_SUMMARIES
+
+    # --- Consumers ---
+    def _filter_worker(self):
+        settings = get_settings()
+        while (article := self.filter_queue.get()) is not _END:
+            metrics_utils.QUEUE_DEPTH.set(self.filter_queue.qsize(), queue="filter")
+            if self.abort_event.is_set():
+                continue  # Still unfiltered in the DB
+            try:
+                is_relevant, cached = stages.filter_article(article, self.ai_filter)
+            except Exception as e:
+                log.error("Filtering '%s' failed: %s", article['link'], e, extra={"link": article['link']})
+                self.stats["filter"].add(items_in=1, errors=1)
+                continue
+            self.stats["filter"].add(items_in=1, items_out=int(is_relevant))
+            article_log.info("  %s Filtered: %s", '✅' if is_relevant else '➖', (article['title'] or 'No Title')[:70])
+            if is_relevant and self._claim("summarize", article["link"], article):
+                self._put(self.summarize_queue, article)
+            if not cached:
+                stages._pause(settings.filter_delay_seconds, self.abort_event)
+
+    def _summarize_worker(self):
+        settings = get_settings()
+        while (article := self.summarize_queue.get()) is not _END:
+            metrics_utils.QUEUE_DEPTH.set(self.summarize_queue.qsize(), queue="summarize")
+            if self.abort_event.is_set():
+                continue  # Still unsummarized in the DB
+            try:
+                generated_summary, cached = stages.summarize_article(article, self.summarizer)
+            except Exception as e:
+                log.error("Summarizing '%s' failed: %s", article['link'], e, extra={"link": article['link']})
+                self.stats["summarize"].add(items_in=1, errors=1)
+                continue
+            failed = generated_summary.startswith("[Summary") # SummarizerAgent's N/A / LLM error placeholders
+            self.stats["summarize"].add(items_in=1, items_out=int(not failed), errors=int(failed))
+            article_log.info("📄 Summarized: %s\n   Summary by LLM: %s", (article['title'] or 'No Title')[:70], generated_summary)
+            if not cached:
+                stages._pause(settings.summary_delay_seconds, self.abort_event)
+
+    def _start(self, target, name: str, count: int = 1) -> list[threading.Thread]:
+        def guarded():
+            try:
+                target()
+            except Exception as e:
+                # A crashed producer must not leave its consumers waiting for the end marker forever
+                log.error("%s failed: %s", name, e, exc_info=True)
+
+        threads = [threading.Thread(target=guarded, name=f"{name}-{i}", daemon=True) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def run(self, run_id: str | None = None) -> dict:
+        """
+        Runs one pass: every due feed is scraped and everything new is filtered and summarized.
+        Returns {stage: {"in", "out", "errors"}}; each stage is also recorded in pipeline_runs.
+        """
+        run_id = run_id or db_utils.new_run_id()
+        if self.scraper is None:
+            from agents.scraper.scraper_agent import ScraperAgent
+            self.scraper = ScraperAgent()
+        if self.ai_filter is None:
+            from agents.aifiltering.ai_filter_agent import AIFilterAgent
+            self.ai_filter = AIFilterAgent()
+        if self.summarizer is None:
+            from agents.summarizer.summarizer_agent import SummarizerAgent
+            self.summarizer = SummarizerAgent()
+
+        log.info("\n🔀 Streaming pipeline: %d filter / %d summarize worker(s), queues of %d.",
+                 self.filter_workers, self.summarize_workers, self.filter_queue.maxsize)
+        filter_producers = self._start(self._scrape, "scrape") + self._start(self._feed_filter_backlog, "filter-backlog")
+        summarize_producers = self._start(self._feed_summarize_backlog, "summarize-backlog")
+        filter_workers = self._start(self._filter_worker, "filter", self.filter_workers)
+        summarize_workers = self._start(self._summarize_worker, "summarize", self.summarize_workers)
+
+        # End markers flow downstream once everything upstream of a queue has finished
+        for thread in filter_producers:
+            thread.join()
+        for _ in filter_workers:
+            self.filter_queue.put(_END)
+        for thread in filter_workers + summarize_producers:
+            thread.join()
+        for _ in summarize_workers:
+            self.summarize_queue.put(_END)
+        for thread in summarize_workers:
+            thread.join()
+
+        results = {}
+        for stage, stats in self.stats.items():
+            db_utils.record_stage_run(run_id, stage, stats.started, items_in=stats.items_in,
+                                      items_out=stats.items_out, errors=stats.errors)
+            results[stage] = {"in": stats.items_in, "out": stats.items_out, "errors": stats.errors}
+        return results
+
+
+def run_pipeline(filter_workers: int | None = None, summarize_workers: int | None = None) -> dict:
+    stages.load_environment_and_debug()
+    db_utils.create_tables_if_not_exist()
+    settings = get_settings()
+    pipeline = StreamingPipeline(filter_workers or settings.pipeline_filter_workers,
+                                 summarize_workers or settings.pipeline_summarize_workers, settings.pipeline_queue_size)
+
+    def request_stop(signum, _frame):
+        if pipeline.stop_event.is_set():
+            log.info("\n🛑 Received %s again; dropping queued articles (they stay pending).", signal.Signals(signum).name)
+            pipeline.abort_event.set()
+        else:
+            log.info("\n🛑 Received %s; no new articles, draining the queues...", signal.Signals(signum).name)
+            pipeline.stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    started = datetime.now()
+    results = pipeline.run()
+    metrics_utils.write_textfile() # METRICS_TEXTFILE, if set
+    log.info("\n🎉 Pipeline run complete in %.1fs: %d new, %d AI-relevant, %d summarized.",
+             (datetime.now() - started).total_seconds(), results['scrape']['out'], results['filter']['out'], results['summarize']['out'])
+    return results
+
+
+if __name__ == "__main__":
+    run_pipeline()
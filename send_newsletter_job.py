@@ -1,17 +1,16 @@
 # BittyNews/send_newsletter_job.py
 
 import os
+import time
 from datetime import datetime, timezone
-from dotenv import load_dotenv
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 # Assuming utils are in a 'utils' subdirectory from where this script is run (project root)
 # If you run this script from project root, these imports should work directly.
 # If your project structure or run location is different, adjust sys.path if necessary.
+# Only the light modules are imported here: ranking/rendering (numpy, Jinja2) and delivery
+# (Brevo SDK) are imported by the steps that use them, so the job starts fast.
 try:
-    from utils import db_utils
-    from utils import email_utils # Contains send_email_via_brevo
-    from utils.llm_utils import loaded_env # To check if .env was loaded by llm_utils (optional check)
+    from utils.settings import ENV_FILE, get_settings
 except ImportError as e:
     print(f"ERROR: Could not import utility modules. Make sure they are in the 'utils' directory and PYTHONPATH is set if needed. Details: {e}")
     # For direct execution when utils is in a subdirectory from project root:
@@ -21,142 +20,143 @@ except ImportError as e:
          sys.path.insert(0, PROJECT_ROOT_FOR_DIRECT_RUN) # Add BittyNews/ to path
     
     # Retry imports
-    from utils import db_utils
-    from utils import email_utils
-    from utils.llm_utils import loaded_env # Check if llm_utils loaded .env (it should have)
+    from utils.settings import ENV_FILE, get_settings
+get_settings() # Load .env before the modules below read their import-time configuration (DATABASE_NAME, ...)
 
+from utils import db_utils
+from utils import profile_utils
+from utils import cassette_utils
 
-def format_published_date(date_str):
-    """Helper to format published_at date string for display."""
-    if not date_str:
-        return "N/A"
-    try:
-        # Attempt to parse common datetime formats that might come from RSS or DB
-        # This might need adjustment based on how you store/retrieve published_at
-        dt_obj = None
-        possible_formats = [
-            '%Y-%m-%d %H:%M:%S',             # Common SQLite format from strftime
-            '%a, %d %b %Y %H:%M:%S %z',     # Common RSS format with timezone
-            '%a, %d %b %Y %H:%M:%S %Z',     # Another RSS format
-            '%Y-%m-%dT%H:%M:%SZ',           # ISO 8601 UTC
-            '%Y-%m-%dT%H:%M:%S%z',          # ISO 8601 with offset
-        ]
-        for fmt in possible_formats:
-            try:
-                dt_obj = datetime.strptime(date_str, fmt)
-                # If it has timezone info, convert to local or just format.
-                # For simplicity, just format as is if parsed.
-                break 
-            except ValueError:
-                continue
-        
-        if dt_obj:
-            return dt_obj.strftime('%B %d, %Y') # e.g., June 10, 2025
-        return date_str # Return original if no format matched
-    except Exception:
-        return date_str # Fallback to original string on any error
 
 def generate_and_send_newsletter():
     print(f"\n--- Starting BittyNews Newsletter Job at {datetime.now()} ---")
 
-    # 1. Load .env (db_utils and email_utils might also do this, but good to ensure here)
-    #    If llm_utils already loaded it, this will just confirm.
-    if not loaded_env: # Check flag from llm_utils (or just call load_dotenv here)
-        print("DEBUG send_newsletter_job: .env not yet loaded by llm_utils, loading now.")
-        dotenv_path = os.path.join(os.getcwd(), '.env') # Assumes script run from project root
-        load_dotenv(dotenv_path)
-        if not os.getenv("BREVO_API_KEY"): # Check crucial var after attempting load
-            print("ERROR send_newsletter_job: BREVO_API_KEY not found after .env load. Exiting.")
+    # 1. Load .env once into the settings snapshot
+    settings = get_settings()
+    if not settings.env_loaded:
+        print(f"DEBUG send_newsletter_job: No .env loaded from {ENV_FILE}; using the process environment.")
+        if not settings.brevo_api_key: # Check crucial var
+            print("ERROR send_newsletter_job: BREVO_API_KEY not set. Exiting.")
             return
-    else:
-        print("DEBUG send_newsletter_job: .env likely already loaded by another module.")
 
 
     # 2. Ensure database tables exist
     print("Ensuring database tables exist...")
     db_utils.create_tables_if_not_exist() # Safe to call; does nothing if tables exist
+    run_id, stage_started = db_utils.new_run_id(), time.time()
 
-    # 3. Fetch articles for the newsletter
-    num_articles_in_newsletter = int(os.getenv("NEWSLETTER_ARTICLE_COUNT", 5)) # Default to 5 articles
-    print(f"Fetching up to {num_articles_in_newsletter} AI-relevant, summarized articles for the newsletter...")
-    articles_for_newsletter = db_utils.get_articles_for_newsletter(limit=num_articles_in_newsletter)
+    # 3. Fetch the candidate pool once; every subscriber's digest is picked from it
+    from utils import digest_utils
+    num_articles_in_newsletter = digest_utils.NEWSLETTER_ARTICLE_COUNT # Articles per digest (default 5)
+    print(f"Fetching up to {digest_utils.NEWSLETTER_CANDIDATE_POOL} AI-relevant, summarized candidate articles for the newsletter...")
+    with profile_utils.stage("candidates"):
+        articles_for_newsletter = db_utils.get_articles_for_newsletter(limit=digest_utils.NEWSLETTER_CANDIDATE_POOL)
 
     if not articles_for_newsletter:
         print("No new articles to include in this newsletter run. Exiting.")
         print("--- BittyNews Newsletter Job Complete (No email sent) ---")
         return
 
-    print(f"Found {len(articles_for_newsletter)} articles to include.")
-
-    # 4. Prepare data for the template (e.g., format dates)
-    template_data = []
-    for article in articles_for_newsletter:
-        template_data.append({
-            "title": article["title"],
-            "link": article["link"],
-            "source_name": article["source_name"],
-            "published_at_formatted": format_published_date(article["published_at"]),
-            "llm_summary": article["llm_summary"]
-        })
-
-    # 5. Render the HTML email template
-    print("Rendering HTML template...")
-    try:
-        # Assuming 'templates' directory is in the same directory as this script (project root)
-        template_dir = os.path.join(os.path.dirname(__file__), 'templates')
-        if not os.path.isdir(template_dir): # Basic check
-             template_dir = 'templates' # Fallback if __file__ is not reliable (e.g. interactive)
-        
-        env = Environment(
-            loader=FileSystemLoader(template_dir),
-            autoescape=select_autoescape(['html', 'xml'])
-        )
-        template = env.get_template('newsletter.html') # Your template file name
-        
-        current_date_str = datetime.now().strftime('%B %d, %Y')
-        html_content = template.render(
-            date=current_date_str,
-            articles=template_data
-        )
-        # print(f"\n--- Rendered HTML (Snippet) ---\n{html_content[:500]}...\n----------------------------") # For debugging template
-    except Exception as e:
-        print(f"❌ ERROR: Failed to render email template: {e}")
-        import traceback
-        traceback.print_exc()
-        return
+    print(f"Found {len(articles_for_newsletter)} candidate articles.")
 
-    # 6. Send the email
-    recipient_email = os.getenv("NEWSLETTER_RECIPIENT_EMAIL")
-    sender_email = os.getenv("NEWSLETTER_SENDER_EMAIL") # Should be verified with Brevo
-    
-    if not recipient_email:
-        print("❌ ERROR: NEWSLETTER_RECIPIENT_EMAIL not set in .env. Cannot send newsletter.")
-        return
-    if not sender_email:
+    # 4. Rank the candidates, index them by tag/source and pick each subscriber's top articles
+    if not settings.newsletter_sender_email: # Should be verified with Brevo
         print("❌ ERROR: NEWSLETTER_SENDER_EMAIL not set in .env. Cannot send newsletter.")
         return
+    from utils import ranking_utils
+
+    current_date_str = datetime.now().strftime('%B %d, %Y')
+    with profile_utils.stage("select"):
+        builder = digest_utils.DigestBuilder(
+            articles_for_newsletter,
+            k=num_articles_in_newsletter,
+            date_str=current_date_str,
+            sent_titles=db_utils.get_recently_sent_titles(ranking_utils.NOVELTY_WINDOW_DAYS) # Novelty vs. past digests
+        )
+        recipient_count = db_utils.count_active_subscribers()
+        if recipient_count:
+            # Subscribers are streamed page by page; those with the same selection share one rendered digest
+            digests = builder.group_subscribers(db_utils.iter_active_subscribers())
+    if not recipient_count:
+        # No subscribers yet: the default digest to NEWSLETTER_RECIPIENT_EMAIL
+        recipient_email = settings.newsletter_recipient_email
+        if not recipient_email:
+            print("❌ ERROR: No active subscribers and NEWSLETTER_RECIPIENT_EMAIL not set in .env. Cannot send newsletter.")
+            return
+        digests, recipient_count = {builder.default_selection: [{"email": recipient_email}]}, 1
+    print(f"Built {len(digests)} distinct digest(s) for {recipient_count} recipient(s).")
 
+    # 5. Render each distinct digest as HTML + plaintext from cached per-article fragments
     email_subject = f"BittyNews AI Digest - {current_date_str}"
-    
-    print(f"Sending newsletter to {recipient_email}...")
-    email_sent_successfully = email_utils.send_email_via_brevo(
-        recipient_email=recipient_email,
-        subject=email_subject,
-        html_content=html_content
-    )
-
-    # 7. Update database if email was sent successfully
-    if email_sent_successfully:
-        print("Newsletter email reported as sent successfully by Brevo.")
-        article_ids_sent = [article["id"] for article in articles_for_newsletter]
-        db_utils.mark_articles_as_sent(article_ids_sent)
-        print(f"Marked {len(article_ids_sent)} articles as sent in the database.")
-    else:
-        print("⚠️ Newsletter email sending failed. Articles will not be marked as sent.")
+    messages = []
+    with profile_utils.stage("render"): # All digests: one cProfile / tracemalloc dump
+        for selection, recipients in digests.items():
+            try:
+                html_content = builder.render(selection)
+                text_content = builder.render(selection, "text")
+            except Exception as e:
+                print(f"❌ ERROR: Failed to render email template: {e}")
+                import traceback
+                traceback.print_exc()
+                return
+            messages.append({
+                "subject": email_subject,
+                "html_content": html_content,
+                "text_content": text_content,
+                "recipients": recipients,
+                "article_ids": builder.article_ids(selection),
+            })
+
+    # 6. Queue the rendered digests and mark their articles as sent, in one transaction.
+    #    From here on delivery (and any retries) works off the outbox; nothing is re-rendered or re-queried.
+    from utils import outbox_utils
+    with profile_utils.stage("enqueue"):
+        queued = outbox_utils.enqueue_newsletter(messages, run_id=run_id)
+    if queued is None:
+        print("⚠️ Newsletter could not be queued. Articles will not be marked as sent.")
+        db_utils.record_stage_run(run_id, "newsletter", stage_started, items_in=recipient_count, items_out=0, errors=recipient_count)
+        return
+    print(f"Queued {queued['recipients']} recipient(s) in {queued['messages']} outbox message(s); "
+          f"marked {queued['articles']} articles as sent.")
+    db_utils.record_stage_run(run_id, "newsletter", stage_started, items_in=recipient_count,
+                              items_out=queued["recipients"], errors=0)
+
+    # 7. Refresh the JSON Feed / RSS output feeds (same cached fragments)
+    try:
+        from utils import render_utils
+        with profile_utils.stage("feeds"):
+            render_utils.write_feeds()
+    except Exception as e:
+        print(f"⚠️ Could not update output feeds: {e}")
+
+    # 8. Deliver what is due now. Failed batches stay queued with backoff for `python bittynews.py outbox deliver`
+    if settings.newsletter_deliver_inline:
+        delivery_started = time.time()
+        with profile_utils.stage("send"):
+            delivery = outbox_utils.deliver_outbox()
+        db_utils.record_stage_run(run_id, "delivery", delivery_started, items_in=queued["messages"],
+                                  items_out=delivery["sent"], errors=delivery["retrying"] + delivery["failed"])
 
     print(f"--- BittyNews Newsletter Job Complete at {datetime.now()} ---")
 
 
 if __name__ == "__main__":
     # This allows you to run `python send_newsletter_job.py` directly
+    import argparse
+    parser = argparse.ArgumentParser(description="Build, queue and deliver today's newsletter.")
+    parser.add_argument("--profile", nargs="?", const=profile_utils.DEFAULT_PROFILE_MODES, default=None, metavar="MODES",
+                        help="Time each step; MODES is a comma list of spans, cprofile, tracemalloc "
+                             f"(bare --profile: {profile_utils.DEFAULT_PROFILE_MODES}; defaults to $PROFILE).")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Capture every HTTP exchange into this cassette (.jsonl.gz).")
+    cassette.add_argument("--replay", metavar="CASSETTE", help="Serve HTTP from this cassette instead of the network "
+                                                               "(defaults to $HTTP_CASSETTE_MODE / $HTTP_CASSETTE).")
+    args = parser.parse_args()
+    get_settings() # .env may set PROFILE / PROFILE_DIR / HTTP_CASSETTE*
+    profile_utils.enable(args.profile)
+    cassette_utils.enable("record" if args.record else "replay" if args.replay else None, args.record or args.replay)
     generate_and_send_newsletter()
+    from utils import metrics_utils
+    metrics_utils.write_textfile() # METRICS_TEXTFILE, if set
+    profile_utils.report()
+    cassette_utils.report()
@@ -0,0 +1,251 @@
+# BittyNews/utils/archive_utils.py
+import itertools
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    from utils import db_utils
+except ImportError:
+    import db_utils
+
+# --- Archive Configuration ---
+# Cold articles live in one SQLite file per month of fetched_at, e.g. archive/bittynews-2025-03.db
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(db_utils.PROJECT_ROOT, "archive"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_FILE_PREFIX = "bittynews-"
+
+# Only rows the pipeline is done with are archived: sent in a newsletter, or rejected by the filter.
+# Relevant-but-unsent rows stay hot so they can still make it into a digest.
+_ARCHIVABLE_WHERE = """
+    fetched_at < ?
+    AND (sent_in_newsletter_at IS NOT NULL OR is_ai_relevant = FALSE)
+"""
+
+def archive_path_for_month(month: str) -> str:
+    """Path of the archive DB for a 'YYYY-MM' month."""
+    return os.path.join(ARCHIVE_DIR, f"{ARCHIVE_FILE_PREFIX}{month}.db")
+
+def list_archive_months() -> list[str]:
+    """All months ('YYYY-MM') that have an archive DB, oldest first."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    months = []
+    for file_name in os.listdir(ARCHIVE_DIR):
+        if file_name.startswith(ARCHIVE_FILE_PREFIX) and file_name.endswith(".db"):
+            months.append(file_name[len(ARCHIVE_FILE_PREFIX):-len(".db")])
+    return sorted(months)
+
+def _next_month(month: str) -> str:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12}-{mon % 12 + 1:02d}"
+
+def archive_months_between(since: str | None = None, until: str | None = None) -> list[str]:
+    """
+    Archive months that can hold articles published within [since, until].
+    Archives are keyed by fetch month, which can trail the publish date, so one extra
+    month is included after `until`.
+    """
+    months = list_archive_months()
+    if since:
+        months = [m for m in months if m >= since[:7]]
+    if until:
+        last_month = _next_month(until[:7])
+        months = [m for m in months if m <= last_month]
+    return months
+
+def _ensure_archive_db(month: str):
+    """Creates the archive DB for `month` with the same articles schema (and FTS index) as the hot DB."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    conn = sqlite3.connect(archive_path_for_month(month))
+    try:
+        db_utils._create_articles_schema(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+def _common_columns(conn: sqlite3.Connection, schema: str) -> list[str]:
+    """Columns present in both main.articles and <schema>.articles (older archives may lack newer columns)."""
+    hot = [row[1] for row in conn.execute("PRAGMA main.table_info(articles)")]
+    cold = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(articles)")}
+    return [column for column in hot if column in cold]
+
+def archive_old_articles(older_than_days: int | None = None, dry_run: bool = False) -> dict:
+    """
+    Moves finished articles older than `older_than_days` from the hot DB into monthly archive DBs,
+    then reclaims the freed pages with an incremental VACUUM.
+
+    Each month is moved in one transaction (insert into the ATTACHed archive, record the link in
+    archived_links, drop cached render fragments, delete from hot), so a crash leaves every row
+    in exactly one place.
+
+    Returns:
+        dict: {'YYYY-MM': rows_moved, ...}
+    """
+    older_than_days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    moved_per_month = {}
+
+    conn = db_utils.get_db_connection()
+    conn.isolation_level = None  # Explicit BEGIN/COMMIT; ATTACH/DETACH can't run inside a transaction
+    try:
+        # Fixed once, so the copy and the delete below always select exactly the same rows
+        cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{int(older_than_days)} days",)).fetchone()[0]
+        months = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT strftime('%Y-%m', fetched_at) FROM articles WHERE {_ARCHIVABLE_WHERE} ORDER BY 1",
+            (cutoff,))]
+        if not months:
+            print(f"DEBUG archive_utils: Nothing to archive (older than {older_than_days} days).")
+            return moved_per_month
+
+        for month in months:
+            month_filter = f"{_ARCHIVABLE_WHERE} AND strftime('%Y-%m', fetched_at) = ?"
+            if dry_run:
+                moved_per_month[month] = conn.execute(
+                    f"SELECT COUNT(*) FROM articles WHERE {month_filter}", (cutoff, month)).fetchone()[0]
+                continue
+
+            _ensure_archive_db(month)
+            conn.execute("ATTACH DATABASE ? AS cold", (archive_path_for_month(month),))
+            try:
+                column_list = ", ".join(_common_columns(conn, "cold"))
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        f"INSERT INTO cold.articles ({column_list}) SELECT {column_list} FROM main.articles WHERE {month_filter}",
+                        (cutoff, month))
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO archived_links (link, archive_month) SELECT link, ? FROM main.articles WHERE {month_filter}",
+                        (month, cutoff, month))
+                    conn.execute(
+                        f"DELETE FROM render_cache WHERE article_id IN (SELECT id FROM main.articles WHERE {month_filter})",
+                        (cutoff, month))
+                    moved_per_month[month] = conn.execute(
+                        f"DELETE FROM main.articles WHERE {month_filter}", (cutoff, month)).rowcount
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute("DETACH DATABASE cold")
+            print(f"DEBUG archive_utils: Archived {moved_per_month[month]} articles into {archive_path_for_month(month)}")
+    except Exception as e:
+        print(f"❌ ERROR archive_utils: Archival failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        conn.close()
+
+    if moved_per_month and not dry_run:
+        reclaim_free_pages()
+    return moved_per_month
+
+def reclaim_free_pages(max_pages: int | None = None):
+    """
+    Runs an incremental VACUUM on the hot DB, returning free pages to the filesystem.
+    The first call on a DB created without auto_vacuum switches it to INCREMENTAL mode,
+    which needs one full VACUUM; afterwards this only touches the freelist.
+    """
+    conn = db_utils.get_db_connection()
+    conn.isolation_level = None
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:  # 2 == INCREMENTAL
+            print("DEBUG archive_utils: Enabling incremental auto_vacuum on the hot DB (one-time full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if max_pages:
+            conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+        else:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        print(f"DEBUG archive_utils: Incremental VACUUM released {free_before - free_after} pages.")
+    except Exception as e:
+        print(f"❌ ERROR archive_utils: Incremental VACUUM failed: {e}")
+    finally:
+        conn.close()
+
+@contextmanager
+def attached_archive(conn: sqlite3.Connection, month: str, alias: str = "cold"):
+    """ATTACHes the archive DB for `month` to `conn` (read-only) for the duration of the block."""
+    uri = Path(archive_path_for_month(month)).as_uri() + "?mode=ro"
+    conn.execute("ATTACH DATABASE ? AS " + alias, (uri,))
+    try:
+        yield alias
+    finally:
+        conn.execute("DETACH DATABASE " + alias)
+
+def _connect_for_archives() -> sqlite3.Connection:
+    """Hot DB connection that can ATTACH archives read-only (ATTACH only honours URIs if the main connection does)."""
+    conn = sqlite3.connect(Path(db_utils.DB_PATH).as_uri(), uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def search_all_tiers(query: str, source=None, since=None, until=None,
+                     relevant_only=None, limit: int = 20, raw: bool = False) -> list[dict]:
+    """
+    search_articles() across the hot DB and every archive month overlapping [since, until].
+    Archives are ATTACHed one at a time (so SQLite's attached-database limit never applies)
+    and each tier contributes at most `limit` hits. BM25 scores depend on each index's own
+    document counts and lengths, so they aren't compared across tiers: the tiers' ranked lists
+    are interleaved, hot first, then the archives newest month first.
+    Archive hits carry an 'archive_month' key; hot hits have it set to None.
+    """
+    try:
+        from utils.search_utils import search_articles
+    except ImportError:
+        from search_utils import search_articles
+
+    options = dict(source=source, since=since, until=until, relevant_only=relevant_only, limit=limit, raw=raw)
+    conn = _connect_for_archives()
+    try:
+        tiers = [[dict(hit, archive_month=None) for hit in search_articles(query, conn=conn, **options)]]
+        for month in reversed(archive_months_between(since, until)):
+            with attached_archive(conn, month) as schema:
+                tiers.append([dict(hit, archive_month=month)
+                              for hit in search_articles(query, conn=conn, schema=schema, **options)])
+    finally:
+        conn.close()
+    interleaved = (hit for round_hits in itertools.zip_longest(*tiers) for hit in round_hits if hit is not None)
+    return list(itertools.islice(interleaved, limit))
+
+def iter_article_history(since: str | None = None, until: str | None = None,
+                         source: str | None = None, columns: str = "id, link, title, source_name, published_at, fetched_at, is_ai_relevant, llm_summary, sent_in_newsletter_at"):
+    """
+    Streams articles from the archives (oldest month first) and then the hot DB, for history
+    and reporting queries that need the full corpus. Filters are applied inside SQLite.
+    """
+    where, params = ["1 = 1"], []
+    if since:
+        where.append("COALESCE(published_at, fetched_at) >= ?")
+        params.append(since)
+    if until:
+        where.append("COALESCE(published_at, fetched_at) <= ?")
+        params.append(until + " 23:59:59" if len(until) == 10 else until)
+    if source:
+        where.append("source_name = ?")
+        params.append(source)
+    where_sql = " AND ".join(where)
+
+    conn = _connect_for_archives()
+    try:
+        for month in archive_months_between(since, until):
+            with attached_archive(conn, month) as schema:
+                cursor = conn.execute(f"SELECT {columns} FROM {schema}.articles WHERE {where_sql} ORDER BY id", params)
+                try:
+                    yield from cursor
+                finally:
+                    cursor.close()  # An open statement would block the DETACH
+        yield from conn.execute(f"SELECT {columns} FROM main.articles WHERE {where_sql} ORDER BY id", params)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("--- Testing archive_utils.py (dry run) ---")
+    print(f"Hot DB: {db_utils.DB_PATH}")
+    print(f"Archive dir: {ARCHIVE_DIR} (existing months: {list_archive_months() or 'none'})")
+    would_move = archive_old_articles(dry_run=True)
+    for month, count in would_move.items():
+        print(f"  {month}: {count} articles would be archived")
+    print("--- Test complete ---")
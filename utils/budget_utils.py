@@ -0,0 +1,194 @@
+# BittyNews/utils/budget_utils.py
+"""
+Daily LLM token budget and the summarization scheduler that spends it.
+
+Every LLM call adds its tokens to llm_token_usage (per UTC day and provider). It uses the
+response's `usage` block, or an estimate from the characters sent and received when a provider
+leaves that out. With LLM_DAILY_TOKEN_BUDGET set, the summarize stage no longer takes the newest
+TOP_N_SUMMARIES articles. Instead, SummaryScheduler ranks a wider pool by priority (source
+`weight` x recency decay) and estimates each article's cost from its body length. It admits
+articles in priority order while the estimate fits in what is left of today's budget. When less
+than LLM_BUDGET_TIGHT_FRACTION of the budget is left, articles whose priority is below
+LLM_LOW_PRIORITY_BELOW wait for the off-peak hours (LLM_OFFPEAK_HOURS, UTC). Deferred articles
+simply stay unsummarized in the DB for a later run.
+"""
+import calendar
+import threading
+import time
+from datetime import datetime
+
+try:
+    from utils import db_utils
+    from utils import metrics_utils
+    from utils.log_utils import get_logger
+    from utils.rules_utils import published_timestamp
+    from utils.settings import get_settings
+except ImportError:
+    import db_utils
+    import metrics_utils
+    from rules_utils import published_timestamp
+    from log_utils import get_logger
+    from settings import get_settings
+
+log = get_logger("budget")
+
+# --- Token Budget Configuration ---
+CHARS_PER_TOKEN = 4              # Rough average for English text with Llama/GPT-style tokenizers
+SUMMARY_OUTPUT_TOKENS = 120      # A 1-2 sentence summary, with some slack
+SUMMARY_PROMPT_OVERHEAD_CHARS = 350  # System prompt and instructions around the article
+SUMMARY_MAX_INPUT_CHARS = 7000   # SummarizerAgent.max_input_chars: longer bodies are truncated
+RECENCY_HALF_LIFE_HOURS = 24     # Priority halves for every day an article has aged (as in ranking_utils)
+CANDIDATE_POOL = 200             # Unsummarized articles considered per run when a budget is set
+
+
+def _today() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def record_usage(provider: str, response_data: dict, payload: dict):
+    """Adds one successful LLM call to today's usage; estimates from characters if `usage` is missing."""
+    usage = response_data.get("usage") if isinstance(response_data, dict) else None
+    if usage and usage.get("prompt_tokens") is not None:
+        prompt_tokens, completion_tokens, estimated = usage["prompt_tokens"], usage.get("completion_tokens") or 0, False
+    else:
+        prompt_chars = sum(len(message.get("content") or "") for message in payload.get("messages", []))
+        completion_chars = sum(len((choice.get("message") or {}).get("content") or "")
+                               for choice in (response_data or {}).get("choices", []))
+        prompt_tokens, completion_tokens, estimated = prompt_chars // CHARS_PER_TOKEN, completion_chars // CHARS_PER_TOKEN, True
+    metrics_utils.LLM_TOKENS.inc(prompt_tokens, provider=provider, kind="prompt")
+    metrics_utils.LLM_TOKENS.inc(completion_tokens, provider=provider, kind="completion")
+    db_utils.add_llm_token_usage(provider, prompt_tokens, completion_tokens, estimated=estimated)
+
+
+def tokens_spent_today() -> int:
+    return sum(row["total_tokens"] for row in db_utils.get_llm_token_usage(_today()))
+
+
+def estimate_summary_tokens(article) -> int:
+    """Tokens one summarization of `article` is expected to cost (prompt + output)."""
+    input_chars = min(len(article.get("title") or "") + len(article.get("original_summary") or ""), SUMMARY_MAX_INPUT_CHARS)
+    return (input_chars + SUMMARY_PROMPT_OVERHEAD_CHARS) // CHARS_PER_TOKEN + SUMMARY_OUTPUT_TOKENS
+
+
+def _article_timestamp(article) -> float | None:
+    published = published_timestamp(article)
+    if published is not None:
+        return published
+    fetched_at = article.get("fetched_at")
+    try:
+        return calendar.timegm(time.strptime(str(fetched_at)[:19], "%Y-%m-%d %H:%M:%S")) if fetched_at else None
+    except ValueError:
+        return None
+
+
+def parse_hours(spec: str) -> set[int]:
+    """'0-6' -> {0, ..., 5}; '22-4' wraps past midnight; '1,3,5' lists hours; '' -> no off-peak hours."""
+    hours = set()
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = (int(value) % 24 for value in part.split("-", 1))
+            hour = start
+            while hour != end:
+                hours.add(hour)
+                hour = (hour + 1) % 24
+        elif part:
+            hours.add(int(part) % 24)
+    return hours
+
+
+class SummaryScheduler:
+    """
+    Decides which summaries to run today. Thread-safe: the streaming pipeline's workers share one.
+    Without a budget (LLM_DAILY_TOKEN_BUDGET=0) it still orders by priority but defers nothing.
+    """
+    def __init__(self, sources: list[dict] | None = None, now: float | None = None):
+        settings = get_settings()
+        if sources is None:
+            from utils.source_loader import load_sources
+            sources = load_sources()
+        self.weights = {source["name"]: 1.0 if source.get("weight") is None else float(source["weight"]) for source in sources}
+        self.now = time.time() if now is None else now
+        self.budget = settings.llm_daily_token_budget
+        self.spent = tokens_spent_today() if self.budget else 0
+        self.reserved = 0
+        self.tight_fraction = settings.llm_budget_tight_fraction
+        self.low_priority_below = settings.llm_low_priority_below
+        self.offpeak = time.gmtime(self.now).tm_hour in parse_hours(settings.llm_offpeak_hours)
+        self.deferred = {}  # reason -> count
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> float:
+        return float("inf") if not self.budget else self.budget - self.spent - self.reserved
+
+    @property
+    def tight(self) -> bool:
+        return bool(self.budget) and self.remaining < self.tight_fraction * self.budget
+
+    def priority(self, article) -> float:
+        """Source weight x recency: a weight-2.0 source's day-old article ranks with a fresh weight-1.0 one."""
+        weight = self.weights.get(article.get("source_name"), 1.0)
+        timestamp = _article_timestamp(article)
+        age_hours = max((self.now - timestamp) / 3600, 0.0) if timestamp is not None else 0.0
+        return weight * 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+
+    def _decide(self, article, priority: float) -> str | None:
+        """None if admitted (its estimate is reserved), else the reason it waits."""
+        cost = estimate_summary_tokens(article)
+        if cost > self.remaining:
+            return "over_budget"
+        if self.tight and not self.offpeak and priority < self.low_priority_below:
+            return "off_peak"
+        self.reserved += cost
+        return None
+
+    def _defer(self, reason: str):
+        self.deferred[reason] = self.deferred.get(reason, 0) + 1
+        metrics_utils.SUMMARY_DEFERRALS.inc(reason=reason)
+
+    def admit(self, article) -> bool:
+        """One article, as it arrives (streaming pipeline). True if it may be summarized now."""
+        priority = self.priority(article)
+        with self._lock:
+            reason = self._decide(article, priority)
+            if reason:
+                self._defer(reason)
+        return reason is None
+
+    def release(self, article):
+        """Gives back the estimate reserved for an admitted or planned article that won't be summarized after all."""
+        with self._lock:
+            self.reserved = max(self.reserved - estimate_summary_tokens(article), 0)
+
+    def plan(self, candidates: list, limit: int) -> list:
+        """Up to `limit` of `candidates`, highest priority first, that fit today's budget."""
+        ranked = sorted(((self.priority(article), article) for article in candidates), key=lambda pair: pair[0], reverse=True)
+        chosen = []
+        with self._lock:
+            for priority, article in ranked:
+                if len(chosen) >= limit:
+                    break
+                reason = self._decide(article, priority)
+                if reason:
+                    self._defer(reason)
+                else:
+                    chosen.append(article)
+        if self.deferred:
+            log.info("⏳ Token budget: %s left of %d today; deferred %s.", f"{max(self.remaining, 0):.0f}", self.budget,
+                     ", ".join(f"{count} {reason}" for reason, count in self.deferred.items()))
+        return chosen
+
+
+if __name__ == "__main__":
+    print("--- Testing budget_utils.py ---")
+    now = time.time()
+    scheduler = SummaryScheduler(sources=[{"name": "Heavy", "weight": 2.0}, {"name": "Light", "weight": 0.5}], now=now)
+    scheduler.budget, scheduler.spent = 3000, 2000  # 1000 tokens left: tight
+    articles = [{"title": f"{name} {age}h", "source_name": name, "original_summary": "x" * 2000,
+                 "published_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - age * 3600))}
+                for name in ("Heavy", "Light") for age in (1, 30)]
+    for article in scheduler.plan(articles, limit=5):
+        print(f"  run   {article['title']:<10} priority {scheduler.priority(article):.2f}, ~{estimate_summary_tokens(article)} tokens")
+    print(f"  deferred: {scheduler.deferred}; off-peak now: {scheduler.offpeak}")
+    print("--- Test complete ---")
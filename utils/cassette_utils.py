@@ -0,0 +1,277 @@
+# BittyNews/utils/cassette_utils.py
+"""
+Record-and-replay for the HTTP traffic of a run: feed downloads, newspaper3k article pages,
+LLM calls and Brevo sends.
+
+    python main.py --record cassettes/2025-06-08.jsonl.gz   # Live run, every exchange captured
+    python main.py --replay cassettes/2025-06-08.jsonl.gz   # Same run served from the cassette
+    HTTP_CASSETTE_MODE=replay HTTP_CASSETTE=cassettes/x.jsonl.gz python bittynews.py pipeline
+
+requests (feeds, LLM calls), newspaper3k (which uses requests) and the Brevo SDK (plain urllib3)
+all end in urllib3's HTTPConnectionPool.urlopen, so that one method is wrapped. While recording,
+each response body is read and stored raw (still gzip/brotli encoded if it came that way),
+then handed back to the caller as a fresh response. Reading stops one chunk past
+ARTICLE_MAX_BYTES, so recording a huge page costs no more memory than fetching it would; the
+exchange keeps that truncated body (its Content-Length dropped, "truncated" set), which is still
+over the bound, so http_utils.fetch_bounded gives up on it the same way in replay. Slow bodies
+are recorded as they finally arrived, and replay serves them at once. While replaying, no connection is
+opened at all. A request is matched on (method, URL, sha256 of the body), and repeats are
+served in recorded order. A request whose body changed (a prompt edit, a newsletter with
+today's date) falls back to the next recording for the same method and URL, with a warning.
+A request with no recording at all fails like a dead connection.
+
+The cassette is gzip-compressed JSON lines: one header line, then one line per exchange.
+Request headers are not stored, so API keys never end up in a cassette. Rate-limit pauses are
+skipped in replay mode (see replaying()), so a replayed run goes at full speed.
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+try:
+    from utils.log_utils import get_logger
+    from utils.settings import get_settings
+except ImportError:
+    from log_utils import get_logger
+    from settings import get_settings
+
+log = get_logger("cassette_utils")
+
+# --- Cassette Configuration ---
+CASSETTE_MODES = ("record", "replay")
+CASSETTE_VERSION = 1
+DROPPED_RESPONSE_HEADERS = {"transfer-encoding"}  # The stored body is already de-chunked
+RECORD_CHUNK_BYTES = 64 * 1024
+
+_active: "Cassette | None" = None
+_original_urlopen = None
+
+
+def _full_url(pool, url: str) -> str:
+    if "://" in url:
+        return url
+    default_port = 443 if pool.scheme == "https" else 80
+    netloc = pool.host if pool.port in (None, default_port) else f"{pool.host}:{pool.port}"
+    return f"{pool.scheme}://{netloc}{url}"
+
+
+def _body_digest(body) -> str:
+    if body is None:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray, memoryview)):
+        return "stream"  # File-like or generator bodies are not hashed (nothing here sends one)
+    return hashlib.sha256(body).hexdigest()
+
+
+class Cassette:
+    def __init__(self, mode: str, path: str):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'; choose from {', '.join(CASSETTE_MODES)}")
+        self.mode = mode
+        self.path = path
+        self.exchanges = []
+        self.hits = self.loose_hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._exact = defaultdict(deque)   # (method, url, body digest) -> exchanges not yet served
+        self._by_url = defaultdict(deque)  # (method, url) -> exchanges not yet served
+        self._last = {}                    # Key -> last exchange served, for requests repeated past the recording
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+            header = json.loads(handle.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"{self.path}: unsupported cassette version {header.get('version')}")
+            for line in handle:
+                exchange = json.loads(line)
+                exchange["served"] = False
+                self.exchanges.append(exchange)
+                self._exact[(exchange["method"], exchange["url"], exchange["body_sha256"])].append(exchange)
+                self._by_url[(exchange["method"], exchange["url"])].append(exchange)
+        log.info("Replaying %d HTTP exchanges from %s (recorded %s)", len(self.exchanges), self.path,
+                 header.get("recorded_at", "?"))
+
+    def record(self, method: str, url: str, body_digest: str, status: int, reason: str | None,
+               headers: list, content: bytes, elapsed: float, truncated: bool = False):
+        exchange = {"method": method, "url": url, "body_sha256": body_digest, "status": status,
+                    "reason": reason, "headers": headers, "elapsed": round(elapsed, 4),
+                    "body": base64.b64encode(content).decode("ascii")}
+        if truncated:
+            exchange["truncated"] = True
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def _take(self, queue: deque):
+        while queue and queue[0]["served"]:
+            queue.popleft()
+        if not queue:
+            return None
+        exchange = queue.popleft()
+        exchange["served"] = True
+        return exchange
+
+    def lookup(self, method: str, url: str, body_digest: str) -> dict | None:
+        """The next recorded exchange for this request, or None if there is none."""
+        exact, loose = (method, url, body_digest), (method, url)
+        with self._lock:
+            exchange = self._take(self._exact[exact])
+            if exchange is not None:
+                self.hits += 1
+                self._last[exact] = self._last[loose] = exchange
+                return exchange
+            exchange = self._take(self._by_url[loose])
+            if exchange is not None:
+                self.loose_hits += 1
+                self._last[loose] = exchange
+                log.warning("Replay: request body for %s %s differs from the recording; serving the next recording for that URL",
+                            method, url)
+                return exchange
+            exchange = self._last.get(exact) or self._last.get(loose)
+            if exchange is not None:  # Asked more often than recorded (e.g. an extra retry): repeat the last answer
+                self.hits += 1
+                return exchange
+            self.misses += 1
+        return None
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            exchanges = list(self.exchanges)
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as handle:
+            header = {"version": CASSETTE_VERSION, "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            handle.write(json.dumps(header) + "\n")
+            for exchange in exchanges:
+                handle.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        log.info("Recorded %d HTTP exchanges to %s", len(exchanges), self.path)
+
+    def summary(self) -> str:
+        if self.mode == "record":
+            return f"{len(self.exchanges)} exchanges recorded to {self.path}"
+        return (f"{self.hits} replayed, {self.loose_hits} matched on URL only, {self.misses} missing "
+                f"(of {len(self.exchanges)} in {self.path})")
+
+
+def _response(status: int, reason: str | None, header_pairs: list, content: bytes, method: str, url: str,
+              preload_content: bool, decode_content: bool):
+    import io
+    from urllib3._collections import HTTPHeaderDict
+    from urllib3.response import HTTPResponse
+    headers = HTTPHeaderDict()
+    for name, value in header_pairs:
+        headers.add(name, value)
+    return HTTPResponse(body=io.BytesIO(content), headers=headers, status=status, reason=reason,
+                        preload_content=preload_content, decode_content=decode_content,
+                        request_method=method, request_url=url)
+
+
+def _urlopen(pool, method, url, body=None, headers=None, **kwargs):
+    cassette = _active
+    if cassette is None:
+        return _original_urlopen(pool, method, url, body=body, headers=headers, **kwargs)
+    full_url, digest = _full_url(pool, url), _body_digest(body)
+    preload_content, decode_content = kwargs.get("preload_content", True), kwargs.get("decode_content", True)
+
+    if cassette.mode == "replay":
+        exchange = cassette.lookup(method, full_url, digest)
+        if exchange is None:
+            from urllib3.exceptions import ProtocolError
+            log.warning("Replay: no recording for %s %s", method, full_url)
+            raise ProtocolError(f"No recorded response for {method} {full_url} in {cassette.path}")
+        return _response(exchange["status"], exchange.get("reason"), exchange["headers"],
+                         base64.b64decode(exchange["body"]), method, full_url, preload_content, decode_content)
+
+    started = time.perf_counter()
+    kwargs["preload_content"] = False
+    response = _original_urlopen(pool, method, url, body=body, headers=headers, **kwargs)
+    max_bytes = get_settings().article_max_bytes
+    chunks, size, truncated = [], 0, False
+    try:
+        for chunk in response.stream(RECORD_CHUNK_BYTES, decode_content=False):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                truncated = True
+                response.close()  # Unread body left on the connection: don't hand it back to the pool
+                break
+    finally:
+        response.release_conn()
+    content = b"".join(chunks)
+    dropped = DROPPED_RESPONSE_HEADERS | ({"content-length"} if truncated else set())
+    response_headers = [[name, value] for name, value in response.headers.items() if name.lower() not in dropped]
+    if truncated:
+        log.warning("Record: kept the first %d bytes of %s %s (over ARTICLE_MAX_BYTES)", size, method, full_url)
+    cassette.record(method, full_url, digest, response.status, response.reason, response_headers, content,
+                    time.perf_counter() - started, truncated=truncated)
+    return _response(response.status, response.reason, response_headers, content, method, full_url,
+                     preload_content, decode_content)
+
+
+def enable(mode: str | None = None, path: str | None = None) -> "Cassette | None":
+    """
+    Starts recording to / replaying from a cassette for the rest of the process. `mode` defaults
+    to $HTTP_CASSETTE_MODE and `path` to $HTTP_CASSETTE. Returns None if no mode is set.
+    A recording is written when the process exits (or on save()).
+    """
+    global _active, _original_urlopen
+    mode = (mode or os.getenv("HTTP_CASSETTE_MODE", "")).strip().lower()
+    if mode in ("", "off", "0", "false", "no"):
+        return None
+    path = path or os.getenv("HTTP_CASSETTE")
+    if not path:
+        raise ValueError("A cassette path is required (HTTP_CASSETTE, or --record/--replay PATH)")
+    import urllib3.connectionpool
+    if _original_urlopen is None:
+        _original_urlopen = urllib3.connectionpool.HTTPConnectionPool.urlopen
+        urllib3.connectionpool.HTTPConnectionPool.urlopen = _urlopen
+    _active = Cassette(mode, path)
+    if mode == "record":
+        atexit.register(_active.save)
+    return _active
+
+
+def replaying() -> bool:
+    """True while responses come from a cassette; callers skip politeness delays then."""
+    return _active is not None and _active.mode == "replay"
+
+
+def report() -> str | None:
+    """Prints what the cassette did this run. None if record/replay is off."""
+    if _active is None:
+        return None
+    summary = _active.summary()
+    print(f"HTTP cassette: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    print("--- Testing cassette_utils.py ---")
+    if len(sys.argv) > 1:  # python utils/cassette_utils.py <cassette>: list what it holds
+        cassette = Cassette("replay", sys.argv[1])
+        for exchange in cassette.exchanges:
+            print(f"{exchange['status']} {exchange['method']:<6} {exchange['elapsed'] * 1000:>7.0f} ms "
+                  f"{len(base64.b64decode(exchange['body'])):>9} B  {exchange['url']}")
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "test.jsonl.gz")
+        recorder = Cassette("record", path)
+        recorder.record("GET", "http://example.test/feed.xml", "", 200, "OK",
+                        [["Content-Type", "application/rss+xml"]], b"<rss/>", 0.05)
+        recorder.save()
+        player = Cassette("replay", path)
+        print(player.lookup("GET", "http://example.test/feed.xml", "")["status"], player.summary())
+    print("--- Test complete ---")
@@ -0,0 +1,333 @@
+# BittyNews/utils/cluster_utils.py
+"""
+Story clustering and trend detection (planning/filtering.md, "Trend Detection": group similar
+stories, show trending topics over time). Runs locally on the CPU with NumPy / SciPy sparse
+matrices. No model or external service is involved.
+
+Vectors: each article (title counted TITLE_WEIGHT times, plus the start of its body) becomes a
+hashed TF-IDF vector. Words are hashed (crc32, stable across runs) into N_FEATURES columns, so
+no vocabulary has to be stored. IDF comes from the articles in the clustering window
+(CLUSTER_WINDOW_DAYS). Terms found in only one article, or in more than MAX_DF_FRACTION of
+them, can't tell stories apart and are dropped. Each vector keeps its MAX_TERMS heaviest terms
+and is L2-normalized, so a sparse product gives cosine similarities directly.
+
+Clustering is incremental. Articles that already have a cluster_id keep it. They only define
+the centroids: the mean of each cluster's vectors, cut to CENTROID_TERMS terms. New articles
+are taken oldest first in batches of BATCH_SIZE. Each batch is compared with every centroid in
+one sparse product, and an article joins the closest cluster if the cosine reaches
+CLUSTER_SIMILARITY. The rest of the batch are compared with each other, and each one either
+joins an earlier article from this batch that opened a cluster or opens a new cluster itself
+(leader clustering). Centroids are rebuilt before the next batch.
+
+Trends: for every cluster, the number of articles in the last TREND_RECENT_HOURS is compared
+with its rate over the TREND_BASELINE_HOURS before that. Clusters whose rate went up the most
+("accelerating") come first.
+"""
+import string
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy import sparse
+
+try:
+    from utils import db_utils
+    from utils.log_utils import get_logger
+    from utils.settings import get_settings
+except ImportError:
+    import db_utils
+    from log_utils import get_logger
+    from settings import get_settings
+
+log = get_logger("cluster")
+
+# --- Clustering Configuration ---
+N_FEATURES = 2 ** 18         # Hashed term columns; collisions between real terms are rare at this size
+TITLE_WEIGHT = 2             # A title word counts as much as two body words
+BODY_CHARS = 1500            # Only the start of the body is read; the lede says what the story is
+MAX_TERMS = 32               # Heaviest terms kept per article vector
+CENTROID_TERMS = 64          # Heaviest terms kept per cluster centroid
+MAX_DF_FRACTION = 0.25       # Terms in more than this share of the window's articles are dropped...
+MIN_MAX_DF = 20              # ...but never below this many articles (small windows)
+BATCH_SIZE = 4096            # New articles assigned per sparse product
+LABEL_TERMS = 3              # Centroid terms in a cluster's label
+TREND_MIN_ARTICLES = 3       # A cluster needs this many recent articles to count as trending
+
+# Punctuation becomes spaces, so str.split() tokenizes (several times faster than a regex); hyphens stay
+_PUNCTUATION = str.maketrans(dict.fromkeys(string.punctuation.replace("-", "") + "“”‘’«»—–…•·", " "))
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have he her his how i if in into "
+    "is it its just more most not of on one or our out over she so than that the their them then there these "
+    "they this to up was we were what when which who why will with would you your after about also new says "
+    "said year years first just like now get make way two use using via amid".split()
+)
+
+
+class _ColumnTable(dict):
+    """word -> hashed column, -1 for stopwords and single characters. crc32 runs once per distinct word."""
+    def __init__(self):
+        super().__init__(dict.fromkeys(_STOPWORDS, -1))
+        self.words = {}  # column -> first word seen there
+
+    def __missing__(self, word: str) -> int:
+        column = zlib.crc32(word.encode("utf-8")) & (N_FEATURES - 1) if len(word) > 1 else -1
+        self[word] = column
+        if column >= 0:
+            self.words.setdefault(column, word)
+        return column
+
+
+class Vectorizer:
+    """Hashes article text into TF-IDF rows; remembers one word per column for labels."""
+    def __init__(self):
+        self._columns = _ColumnTable()
+        self.words = self._columns.words
+
+    def _hash(self, text: str) -> list[int]:
+        """Columns of the words in `text`: one C-level map over the table once a word has been seen."""
+        return list(map(self._columns.__getitem__, text.lower().translate(_PUNCTUATION).split()))
+
+    def transform(self, documents: list[tuple[str, str]]) -> sparse.csr_matrix:
+        """(title, body) pairs -> L2-normalized CSR matrix, one row per document."""
+        title_columns, title_lengths, body_columns, body_lengths = [], [], [], []
+        for title, body in documents:
+            columns = self._hash(title or "")
+            title_columns += columns
+            title_lengths.append(len(columns))
+            columns = self._hash((body or "")[:BODY_CHARS])
+            body_columns += columns
+            body_lengths.append(len(columns))
+        positions = np.arange(len(documents))
+        rows = np.concatenate([np.repeat(positions, title_lengths), np.repeat(positions, body_lengths)])
+        columns = np.array(title_columns + body_columns, dtype=np.int64)
+        weights = np.ones(len(columns), dtype=np.float32)
+        weights[:len(title_columns)] = TITLE_WEIGHT
+        kept = columns >= 0  # Stopwords out
+        # The COO -> CSR conversion sums duplicates: term counts per article
+        counts = sparse.csr_matrix((weights[kept], (rows[kept], columns[kept])), shape=(len(documents), N_FEATURES))
+        document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+        max_df = max(MAX_DF_FRACTION * len(documents), MIN_MAX_DF)
+        idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+        idf[(document_frequency < 2) | (document_frequency > max_df)] = 0
+        counts.data = (1 + np.log(counts.data)) * idf[counts.indices]  # Sublinear TF x IDF
+        return _normalize(_top_terms(counts, MAX_TERMS))
+
+
+def _top_terms(matrix: sparse.csr_matrix, keep: int) -> sparse.csr_matrix:
+    """Keeps the `keep` largest entries of every row (and drops zeros), without a Python loop over rows."""
+    matrix.eliminate_zeros()
+    row_lengths = np.diff(matrix.indptr)
+    if not (row_lengths > keep).any():
+        return matrix
+    row_of_entry = np.repeat(np.arange(matrix.shape[0]), row_lengths)
+    # One sort key: row number, then heaviest first within the row (data scaled into [0, 0.5])
+    order = np.argsort(row_of_entry - matrix.data / (2 * matrix.data.max()))
+    rank = np.arange(len(order)) - matrix.indptr[row_of_entry[order]]
+    kept = np.zeros(len(order), dtype=bool)
+    kept[order[rank < keep]] = True
+    return sparse.csr_matrix((matrix.data[kept], matrix.indices[kept], np.concatenate(([0], np.cumsum(np.minimum(row_lengths, keep))))),
+                             shape=matrix.shape)
+
+
+def _normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+
+def centroids(vectors: sparse.csr_matrix, labels: np.ndarray, n_clusters: int) -> sparse.csr_matrix:
+    """Mean vector of each cluster (rows of `vectors` with label k), cut to CENTROID_TERMS and normalized."""
+    membership = sparse.csr_matrix((np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                                   shape=(n_clusters, vectors.shape[0]))
+    return _normalize(_top_terms(sparse.csr_matrix(membership @ vectors), CENTROID_TERMS))
+
+
+def _best_match(similarity: sparse.csr_matrix, threshold: float) -> np.ndarray:
+    """Per row of a sparse similarity matrix, the column of its highest value if that reaches `threshold`, else -1."""
+    best = np.full(similarity.shape[0], -1)
+    similarity.data[similarity.data < threshold] = 0
+    similarity.eliminate_zeros()
+    if similarity.nnz:
+        row_lengths = np.diff(similarity.indptr)
+        rows = np.flatnonzero(row_lengths)
+        row_of_entry = np.repeat(np.arange(similarity.shape[0]), row_lengths)
+        row_max = np.maximum.reduceat(similarity.data, similarity.indptr[rows])
+        is_max = similarity.data == np.repeat(row_max, row_lengths[rows])
+        first_rows, first_entries = np.unique(row_of_entry[is_max], return_index=True)
+        best[first_rows] = similarity.indices[np.flatnonzero(is_max)[first_entries]]
+    return best
+
+
+def _leaders(vectors: sparse.csr_matrix, threshold: float) -> np.ndarray:
+    """
+    Leader clustering of rows in order: a row joins the first earlier leader it is at least
+    `threshold` similar to, or becomes a leader itself. Returns each row's leader position.
+    """
+    similarity = sparse.csr_matrix(vectors @ vectors.T)
+    similarity.data[similarity.data < threshold] = 0
+    similarity.eliminate_zeros()
+    leader_of = np.arange(vectors.shape[0])
+    indptr, indices = similarity.indptr, similarity.indices
+    for row in range(vectors.shape[0]):
+        for other in indices[indptr[row]:indptr[row + 1]]:
+            if other < row and leader_of[other] == other:
+                leader_of[row] = other
+                break
+    return leader_of
+
+
+def label(centroid: sparse.csr_matrix, words: dict) -> str:
+    """'term / term / term' from a centroid row's heaviest terms."""
+    top = centroid.indices[np.argsort(-centroid.data)[:LABEL_TERMS]]
+    return " / ".join(words.get(column, "?") for column in top)
+
+
+def assign_clusters(articles: list[tuple], similarity: float) -> tuple[list, list, dict]:
+    """
+    Clusters the unassigned articles among `articles` (db_utils.get_articles_for_clustering rows,
+    oldest first). Returns what save_story_clusters() takes: new clusters as (label, article ids),
+    (article id, cluster id) for articles joining an existing cluster, and new labels for the
+    existing clusters that grew.
+    """
+    vectorizer = Vectorizer()
+    vectors = vectorizer.transform([(title, body) for _, title, body, _, _ in articles])
+    existing_ids = sorted({cluster_id for *_, cluster_id in articles if cluster_id is not None})
+    # Clusters are numbered 0..k-1 while working: existing ones first, then the ones opened here
+    number_of = {cluster_id: k for k, cluster_id in enumerate(existing_ids)}
+    labels = np.array([number_of.get(cluster_id, -1) for *_, cluster_id in articles])
+    pending = np.flatnonzero(labels < 0)
+    empty = np.diff(vectors.indptr) == 0
+    labels[pending[empty[pending]]] = -2  # No usable terms: left unclustered (and retried next run)
+    pending = pending[~empty[pending]]
+    if not len(pending):
+        return [], [], {}
+    n_clusters = len(existing_ids)
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start:start + BATCH_SIZE]
+        assigned = labels >= 0
+        if n_clusters:
+            centroid_matrix = centroids(vectors[assigned], labels[assigned], n_clusters)
+            best = _best_match(sparse.csr_matrix(vectors[batch] @ centroid_matrix.T), similarity)
+            joins = best >= 0
+            labels[batch[joins]] = best[joins]
+            batch = batch[~joins]
+        if len(batch):
+            leader_of = _leaders(vectors[batch], similarity)
+            leaders = np.unique(leader_of)
+            labels[batch] = n_clusters + np.searchsorted(leaders, leader_of)
+            n_clusters += len(leaders)
+
+    assigned = labels >= 0
+    if not assigned.any():
+        return [], [], {}
+    centroid_matrix = centroids(vectors[assigned], labels[assigned], n_clusters)
+    article_ids = np.array([article[0] for article in articles])
+    grown = set(labels[pending])
+    new_clusters = [(label(centroid_matrix[k], vectorizer.words), article_ids[labels == k].tolist())
+                    for k in range(len(existing_ids), n_clusters)]
+    joined = [(int(article_ids[position]), existing_ids[labels[position]])
+              for position in pending if labels[position] < len(existing_ids)]
+    relabeled = {existing_ids[k]: label(centroid_matrix[k], vectorizer.words) for k in grown if k < len(existing_ids)}
+    return new_clusters, joined, relabeled
+
+
+def cluster_recent_articles(window_days: int | None = None, similarity: float | None = None) -> dict:
+    """
+    The cluster stage: assigns every unclustered article of the last `window_days` to a story
+    cluster and stores the result. Returns counts: articles, assigned, joined, new_clusters, seconds.
+    """
+    settings = get_settings()
+    window_days = settings.cluster_window_days if window_days is None else window_days
+    similarity = settings.cluster_similarity if similarity is None else similarity
+    started = time.perf_counter()
+    since = (datetime.utcnow() - timedelta(days=window_days)).strftime('%Y-%m-%d %H:%M:%S')
+    articles = db_utils.get_articles_for_clustering(since, BODY_CHARS)
+    new_clusters, joined, relabeled = [], [], {}
+    if any(article[4] is None for article in articles):  # Nothing new: no need to vectorize the window
+        new_clusters, joined, relabeled = assign_clusters(articles, similarity)
+    db_utils.save_story_clusters(new_clusters, joined, relabeled)
+    assigned = len(joined) + sum(len(article_ids) for _, article_ids in new_clusters)
+    result = {"articles": len(articles), "assigned": assigned, "joined": len(joined),
+              "new_clusters": len(new_clusters), "seconds": time.perf_counter() - started}
+    log.info("🧩 Clustered %d new articles (%d into existing stories, %d new stories) out of %d in the last %d days in %.2fs.",
+             assigned, len(joined), len(new_clusters), len(articles), window_days, result["seconds"])
+    return result
+
+
+def _timestamps(values: list[str]) -> np.ndarray:
+    """'YYYY-MM-DD HH:MM:SS...' strings -> Unix seconds (float), NaN where unparseable."""
+    parsed = np.array([value[:19].replace("T", " ") if value else "NaT" for value in values])
+    try:
+        moments = parsed.astype("datetime64[s]")
+    except ValueError:  # One bad value fails the whole cast; fall back to one at a time
+        moments = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[s]")
+        for i, value in enumerate(parsed):
+            try:
+                moments[i] = np.datetime64(value, "s")
+            except ValueError:
+                pass
+    result = moments.astype(np.int64).astype(float)
+    result[np.isnat(moments)] = np.nan
+    return result
+
+
+def trending(recent_hours: float | None = None, baseline_hours: float | None = None, limit: int = 10,
+             now: float | None = None) -> list[dict]:
+    """
+    Clusters whose article rate is accelerating, fastest first. Each entry has cluster_id, label,
+    recent (articles in the last `recent_hours`), baseline (articles in the `baseline_hours`
+    before that), acceleration (recent rate / baseline rate, both +1 smoothed), sources (distinct
+    sources in the recent window) and titles (the most recent few).
+    """
+    settings = get_settings()
+    recent_hours = settings.trend_recent_hours if recent_hours is None else recent_hours
+    baseline_hours = settings.trend_baseline_hours if baseline_hours is None else baseline_hours
+    now = time.time() if now is None else now
+    recent_start = now - recent_hours * 3600
+    baseline_start = recent_start - baseline_hours * 3600
+    # fetched_at bounds the read; an article published long before it was fetched just falls outside both windows
+    rows = db_utils.get_clustered_articles(datetime.utcfromtimestamp(baseline_start).strftime('%Y-%m-%d %H:%M:%S'))
+    if not rows:
+        return []
+    cluster_ids = np.array([row[0] for row in rows])
+    seen = _timestamps([row[4] for row in rows])
+    recent, baseline = seen >= recent_start, (seen >= baseline_start) & (seen < recent_start)
+    ids, position = np.unique(cluster_ids, return_inverse=True)
+    recent_counts = np.bincount(position[recent], minlength=len(ids))
+    baseline_counts = np.bincount(position[baseline], minlength=len(ids))
+    # Baseline articles expected in a window as long as the recent one
+    expected = baseline_counts * (recent_hours / baseline_hours) if baseline_hours else np.zeros(len(ids))
+    acceleration = (recent_counts + 1) / (expected + 1)
+    candidates = np.flatnonzero((recent_counts >= TREND_MIN_ARTICLES) & (acceleration > 1))
+    ranked = candidates[np.lexsort((-recent_counts[candidates], -acceleration[candidates]))][:limit]
+    trends = []
+    for k in ranked:
+        members = np.flatnonzero((position == k) & recent)
+        trends.append({
+            "cluster_id": int(ids[k]),
+            "label": rows[members[0]][1],
+            "recent": int(recent_counts[k]),
+            "baseline": int(baseline_counts[k]),
+            "acceleration": float(acceleration[k]),
+            "sources": len({rows[i][2] for i in members}),
+            "titles": [rows[i][3] for i in members[::-1][:3]],
+        })
+    return trends
+
+
+if __name__ == "__main__":
+    print("--- Testing cluster_utils.py ---")
+    stories = [
+        ("Nvidia unveils Blackwell Ultra GPU for AI datacenters", "Nvidia announced the Blackwell Ultra chip at GTC, promising faster inference for datacenters."),
+        ("Blackwell Ultra: Nvidia's next datacenter GPU arrives", "The Blackwell Ultra GPU from Nvidia targets AI datacenters and inference workloads."),
+        ("Mistral releases open-weight reasoning model", "Paris-based Mistral released an open-weight reasoning model under Apache license."),
+        ("Mistral's new reasoning model is open-weight", "Mistral has published weights for its reasoning model, licensed Apache 2.0."),
+        ("EU fines Meta over data transfers", "Regulators in the EU fined Meta for transferring user data to the United States."),
+    ]
+    rows = [(i + 1, title, body, "2025-06-08 07:00:00", None) for i, (title, body) in enumerate(stories)]
+    new_clusters, _, _ = assign_clusters(rows, similarity=0.3)
+    for cluster_label, article_ids in new_clusters:
+        print(f"  {cluster_label:<40} articles {article_ids}")
+    print("--- Test complete ---")
@@ -1,27 +1,240 @@
 # BittyNews/utils/db_utils.py
 import sqlite3
 import os
+import re
+import hashlib
+import threading
+import unicodedata
 import time # For time.strftime if used with published_parsed
 from datetime import datetime # For sent_in_newsletter_at if you implement it
 
+try:
+    from utils import metrics_utils
+    from utils import profile_utils
+    from utils.log_utils import get_article_logger
+except ImportError:
+    import metrics_utils
+    import profile_utils
+    from log_utils import get_article_logger
+
+article_log = get_article_logger("db_utils")
+
 # --- Database Configuration ---
 # Assumes utils/db_utils.py and BittyNews/.env & bittynews.db are in BittyNews/ (project root)
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DB_NAME = os.getenv("DATABASE_NAME", "bittynews.db") # Allow DB name to be configurable
 DB_PATH = os.path.join(PROJECT_ROOT, DB_NAME)
+# Rows per page for the streaming (keyset-paginated) readers below
+ARTICLE_PAGE_SIZE = int(os.getenv("ARTICLE_PAGE_SIZE", 200))
+
+class ArticleRow(sqlite3.Row):
+    """
+    Lightweight row object returned by the streaming readers.
+    Behaves like sqlite3.Row (row['title'], dict(row)) and adds dict-style .get()
+    so agents that expect an article dict can consume it unchanged.
+    """
+    def get(self, key, default=None):
+        return self[key] if key in self.keys() else default
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def compute_content_hash(title: str | None, body: str | None) -> str:
+    """
+    SHA-256 of the article's LLM-relevant inputs (title + body), normalized so that
+    re-extractions differing only in whitespace or Unicode composition hash the same.
+    """
+    normalized = []
+    for part in (title or "", body or ""):
+        part = unicodedata.normalize("NFC", part)
+        normalized.append(_WHITESPACE_RE.sub(" ", part).strip())
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()
+
+class _MeteredConnection(sqlite3.Connection):
+    """Counts and times explicit commits (bittynews_db_commits_total / _db_commit_seconds)."""
+    def commit(self):
+        started = time.perf_counter()
+        with profile_utils.span("sqlite_commit"):
+            super().commit()
+        metrics_utils.DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+        metrics_utils.DB_COMMITS.inc()
 
 def get_db_connection():
     """Establishes and returns a database connection."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=_MeteredConnection)
     conn.row_factory = sqlite3.Row # Access columns by name (e.g., row['title'])
     return conn
 
+def _fetch_page(query: str, params: tuple) -> list[ArticleRow]:
+    """
+    Runs a single page query on a short-lived connection.
+    The connection is closed before the caller processes the page, so no read
+    lock is held while the pipeline writes results back between pages.
+    """
+    conn = get_db_connection()
+    conn.row_factory = ArticleRow
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
 def create_tables_if_not_exist():
     """Creates the articles table with necessary columns and indexes if it doesn't exist."""
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        _create_articles_schema(cursor)
+        # Links moved to a monthly archive DB (see utils/archive_utils.py), so the scraper
+        # doesn't re-insert them once they're no longer in the hot `articles` table
         cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_links (
+                link TEXT PRIMARY KEY,
+                archive_month TEXT NOT NULL
+            ) WITHOUT ROWID;
+        ''')
+        # LLM outputs keyed by the hash of their inputs: a row whose content is byte-identical to
+        # something already filtered/summarized (manual reset, syndicated copy) reuses the result
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_result_cache (
+                content_hash TEXT NOT NULL,
+                stage TEXT NOT NULL,           -- 'filter' ('1'/'0') or 'summarize' (summary text)
+                result TEXT NOT NULL,
+                model_used TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (content_hash, stage)
+            ) WITHOUT ROWID;
+        ''')
+        _backfill_content_hashes(conn)
+        # LLM tokens spent per UTC day and provider, for the daily budget (see utils/budget_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_token_usage (
+                day TEXT NOT NULL,             -- YYYY-MM-DD (UTC)
+                provider TEXT NOT NULL,        -- groq | openrouter
+                calls INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                estimated_calls INTEGER NOT NULL DEFAULT 0, -- Calls whose response had no usage block (counted from chars)
+                PRIMARY KEY (day, provider)
+            ) WITHOUT ROWID;
+        ''')
+        # Story clusters: groups of articles about the same topic (see utils/cluster_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS story_clusters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                label TEXT,                    -- Top centroid terms, e.g. 'nvidia / blackwell / chips'
+                size INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        ''')
+        # Newsletter recipients (see send_newsletter_job.py / outbox_utils.enqueue_newsletter)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS subscribers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE NOT NULL COLLATE NOCASE,
+                name TEXT,
+                is_active BOOLEAN NOT NULL DEFAULT TRUE,
+                subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                unsubscribed_at TIMESTAMP,
+                preferred_tags TEXT,           -- Comma-separated source tags (sources.yaml), NULL = no preference
+                preferred_sources TEXT         -- Comma-separated source names, NULL = no preference
+            );
+        ''')
+        _ensure_column(cursor, "subscribers", "preferred_tags", "TEXT")
+        _ensure_column(cursor, "subscribers", "preferred_sources", "TEXT")
+        # Rendered per-article digest fragments per output format (see utils/render_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS render_cache (
+                article_id INTEGER NOT NULL,
+                format TEXT NOT NULL,          -- 'html', 'text', 'json', 'rss'
+                input_hash TEXT NOT NULL,      -- Template version + display fields; a mismatch means re-render
+                fragment TEXT NOT NULL,
+                PRIMARY KEY (article_id, format)
+            ) WITHOUT ROWID;
+        ''')
+        # Rendered newsletter batches waiting for delivery (see utils/outbox_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT UNIQUE NOT NULL, -- Also sent to Brevo, so a retried request is delivered once
+                run_id TEXT,
+                subject TEXT NOT NULL,
+                html_content TEXT NOT NULL,
+                text_content TEXT,
+                recipients TEXT NOT NULL,      -- JSON list of {"email", "name"}
+                status TEXT NOT NULL DEFAULT 'pending', -- pending -> sending -> sent | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                locked_at TIMESTAMP,           -- When a worker claimed it; stale claims are retried
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            );
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at);')
+        # One row per pipeline stage per run (scrape, filter, summarize, newsletter), for analytics
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pipeline_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,          -- Groups the stages of one main.py / newsletter run
+                stage TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                duration_seconds REAL,
+                items_in INTEGER,              -- e.g. feed items seen, articles queued for filtering
+                items_out INTEGER,             -- e.g. new articles stored, articles marked relevant
+                errors INTEGER DEFAULT 0
+            );
+        ''')
+        # Adaptive feed polling state, one row per source (see utils/poll_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS source_polls (
+                source_name TEXT PRIMARY KEY,
+                poll_interval_seconds REAL NOT NULL,
+                new_items_per_hour REAL NOT NULL DEFAULT 0, -- Smoothed rate of new articles seen
+                polls INTEGER NOT NULL DEFAULT 0,
+                polls_with_new INTEGER NOT NULL DEFAULT 0,
+                last_new_items INTEGER,
+                last_polled_at TIMESTAMP,
+                last_new_at TIMESTAMP,
+                next_poll_at TIMESTAMP,
+                etag TEXT,                     -- Validators of the last feed download, sent back as
+                last_modified TEXT             -- If-None-Match / If-Modified-Since on the next poll
+            ) WITHOUT ROWID;
+        ''')
+        _ensure_column(cursor, "source_polls", "etag", "TEXT")
+        _ensure_column(cursor, "source_polls", "last_modified", "TEXT")
+        # Feed reliability per source; failing sources are quarantined (see utils/health_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS source_health (
+                source_name TEXT PRIMARY KEY,
+                polls INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                last_latency_seconds REAL,     -- Feed download time of the last poll
+                avg_latency_seconds REAL,      -- Smoothed over recent polls
+                bozo_rate REAL,                -- Smoothed share of polls with a malformed feed
+                fulltext_attempts INTEGER NOT NULL DEFAULT 0,
+                fulltext_success_rate REAL,    -- Smoothed share of newspaper3k extractions that succeeded
+                fulltext_aborts INTEGER NOT NULL DEFAULT 0, -- Article downloads abandoned (not HTML, too large, too slow)
+                last_polled_at TIMESTAMP,
+                last_success_at TIMESTAMP,
+                quarantined_until TIMESTAMP    -- Not polled before this time
+            ) WITHOUT ROWID;
+        ''')
+        _ensure_column(cursor, "source_health", "fulltext_aborts", "INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+        print(f"DEBUG db_utils: Database tables ensured in '{DB_PATH}'!")
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error creating tables: {e}")
+    finally:
+        conn.close()
+
+def _create_articles_schema(cursor):
+    """
+    Creates the `articles` table, its indexes and the full-text index on the given cursor.
+    Shared by the hot database and the monthly archive databases so both have the same layout.
+    """
+    cursor.execute('''
             CREATE TABLE IF NOT EXISTS articles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 link TEXT UNIQUE NOT NULL,
@@ -36,28 +249,122 @@ def create_tables_if_not_exist():
                 summarizer_model_used TEXT,-- Updated by SummarizerAgent
                 sent_in_newsletter_at TIMESTAMP, -- For future newsletter feature
                 user_saved BOOLEAN DEFAULT FALSE,            -- For future web app
-                user_marked_interesting BOOLEAN DEFAULT FALSE -- For future web app
+                user_marked_interesting BOOLEAN DEFAULT FALSE, -- For future web app
+                content_hash TEXT,         -- compute_content_hash(title, original_summary)
+                rule_decision TEXT,        -- Rule gate before the LLM filter: 'pass' or 'reject:<reason>' (utils/rules_utils.py)
+                rule_score INTEGER,        -- Keyword score from the rule gate
+                cluster_id INTEGER,        -- story_clusters.id, set by the cluster stage (utils/cluster_utils.py)
+                content_source TEXT        -- Where original_summary came from: 'fulltext' (newspaper3k) or 'feed' (RSS fallback)
             );
         ''')
-        # Indexes for performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_link ON articles (link);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_needs_filtering ON articles (is_ai_relevant);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_needs_summarization ON articles (is_ai_relevant, llm_summary);')
-        # For newsletter (Phase 2)
-        # cursor.execute('CREATE INDEX IF NOT EXISTS idx_newsletter_candidates ON articles (is_ai_relevant, sent_in_newsletter_at, published_at);')
-        conn.commit()
-        print(f"DEBUG db_utils: Database tables ensured in '{DB_PATH}'!")
-    except Exception as e:
-        print(f"❌ ERROR db_utils: Error creating tables: {e}")
-    finally:
-        conn.close()
+    _ensure_column(cursor, "articles", "content_hash", "TEXT")
+    _ensure_column(cursor, "articles", "rule_decision", "TEXT")
+    _ensure_column(cursor, "articles", "rule_score", "INTEGER")
+    _ensure_column(cursor, "articles", "cluster_id", "INTEGER")
+    _ensure_column(cursor, "articles", "content_source", "TEXT")
+    # Indexes for performance
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_link ON articles (link);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_needs_filtering ON articles (is_ai_relevant);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_needs_summarization ON articles (is_ai_relevant, llm_summary);')
+    # Keyset pagination for the filtering queue walks (fetched_at, id) within is_ai_relevant IS NULL
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_filter_queue ON articles (is_ai_relevant, fetched_at, id);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_cluster ON articles (cluster_id);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_fetched_at ON articles (fetched_at);') # Clustering window
+    # For newsletter (Phase 2)
+    # cursor.execute('CREATE INDEX IF NOT EXISTS idx_newsletter_candidates ON articles (is_ai_relevant, sent_in_newsletter_at, published_at);')
+    _create_search_index(cursor)
 
-def add_article(article_data: dict) -> bool: # Changed return to bool: True if added, False if exists/error
+def _ensure_column(cursor, table: str, column: str, declaration: str):
+    """Adds `column` to `table` on databases created before the column existed."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        print(f"DEBUG db_utils: Added column {table}.{column}.")
+
+def _backfill_content_hashes(conn):
+    """
+    Hashes rows stored before content_hash existed and seeds llm_result_cache with their
+    existing filter/summary results, so upgrading doesn't make every old article look changed.
+    """
+    missing = conn.execute("SELECT COUNT(*) FROM articles WHERE content_hash IS NULL").fetchone()[0]
+    if not missing:
+        return
+    conn.create_function("bittynews_content_hash", 2, compute_content_hash, deterministic=True)
+    conn.execute("UPDATE articles SET content_hash = bittynews_content_hash(title, original_summary) WHERE content_hash IS NULL")
+    conn.execute('''
+        INSERT OR IGNORE INTO llm_result_cache (content_hash, stage, result, model_used)
+        SELECT content_hash, 'filter', CASE WHEN is_ai_relevant THEN '1' ELSE '0' END, ai_filter_model_used
+        FROM articles WHERE is_ai_relevant IS NOT NULL
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO llm_result_cache (content_hash, stage, result, model_used)
+        SELECT content_hash, 'summarize', llm_summary, summarizer_model_used
+        FROM articles WHERE llm_summary IS NOT NULL AND llm_summary NOT LIKE '[Summary%'
+    ''')
+    print(f"DEBUG db_utils: Backfilled content hashes for {missing} existing articles.")
+
+def _create_search_index(cursor):
+    """
+    Creates the FTS5 full-text index over title, body and LLM summary, plus the triggers
+    that keep it in sync with `articles`. The index is external-content (it stores no copy
+    of the text), so it only costs the inverted index itself. Backfills on first creation.
     """
-    Adds a new article to the database if its link doesn't already exist.
+    try:
+        already_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+        ).fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, original_summary, llm_summary,
+                content='articles', content_rowid='id',
+                tokenize='porter unicode61'
+            );
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS articles_fts_after_insert AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, original_summary, llm_summary)
+                VALUES (new.id, new.title, new.original_summary, new.llm_summary);
+            END;
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS articles_fts_after_delete AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, original_summary, llm_summary)
+                VALUES ('delete', old.id, old.title, old.original_summary, old.llm_summary);
+            END;
+        ''')
+        # Only re-index when indexed text changes, not on every flag update (is_ai_relevant, sent_..., etc.)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS articles_fts_after_update
+            AFTER UPDATE OF title, original_summary, llm_summary ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, original_summary, llm_summary)
+                VALUES ('delete', old.id, old.title, old.original_summary, old.llm_summary);
+                INSERT INTO articles_fts (rowid, title, original_summary, llm_summary)
+                VALUES (new.id, new.title, new.original_summary, new.llm_summary);
+            END;
+        ''')
+        if not already_exists:
+            cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild');")
+            print("DEBUG db_utils: Built full-text search index for existing articles.")
+    except sqlite3.OperationalError as e:
+        # SQLite builds without FTS5 still get a working pipeline, just no search
+        print(f"WARNING db_utils: Full-text search index unavailable (FTS5 not supported?): {e}")
+
+def upsert_article(article_data: dict) -> str:
+    """
+    Inserts a new article, or refreshes an existing one whose content changed.
     Expects 'link', 'title', 'source_name', 'original_summary', 
-    'published' (string), and 'published_parsed' (time.struct_time) in article_data.
-    Returns True if the article was newly inserted, False otherwise (already exists or error).
+    'published' (string), and 'published_parsed' (time.struct_time) in article_data, plus
+    'content_source': 'fulltext' if original_summary was extracted from the page, 'feed' (the
+    default) if it is the RSS fallback.
+
+    Existing rows are compared by content hash (normalized title + body). Only when it differs
+    are the title/body replaced and the filter/summary results cleared, so the filter and
+    summarizer stages redo exactly the articles whose inputs changed. Feed content only replaces
+    feed content: a poll whose extraction failed (or was skipped) must not swap a stored full
+    text for the RSS teaser. Rows stored before content_source existed count as full text.
+
+    Returns:
+        str: 'inserted', 'updated', 'unchanged' (also for archived links) or 'error'.
     """
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -78,47 +385,110 @@ def add_article(article_data: dict) -> bool: # Changed return to bool: True if a
     title_val = article_data.get("title", "No Title Provided")
     source_name_val = article_data.get("source_name", "Unknown Source") # Key from ScraperAgent
     original_summary_val = article_data.get("original_summary", "")    # Key from ScraperAgent
+    content_source_val = article_data.get("content_source") or "feed"
+    content_hash_val = compute_content_hash(title_val, original_summary_val)
 
     if not link_val: # Should have been caught by scraper, but good to check
         print("DEBUG db_utils: Attempted to add article with no link. Skipping.")
-        return False
+        return "error"
 
     try:
         cursor.execute('''
-            INSERT INTO articles (link, title, source_name, original_summary, published_at, fetched_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            INSERT INTO articles (link, title, source_name, original_summary, published_at, fetched_at, content_hash, content_source)
+            SELECT ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM archived_links WHERE link = ?) -- Already archived
+            ON CONFLICT (link) DO NOTHING
         ''', (
             link_val,
             title_val,
             source_name_val,
             original_summary_val,
-            published_iso_str
+            published_iso_str,
+            content_hash_val,
+            content_source_val,
+            link_val
         ))
+        if cursor.rowcount == 1:
+            conn.commit()
+            # print(f"DEBUG db_utils: Inserted article ID {cursor.lastrowid}: {title_val[:50]}...")
+            return "inserted"
+
+        # Link already stored: refresh only if the publisher actually changed the content
+        # (full text replaces anything; feed content only replaces feed content)
+        cursor.execute('''
+            UPDATE articles
+            SET title = ?, original_summary = ?, content_hash = ?, content_source = ?,
+                is_ai_relevant = NULL, ai_filter_model_used = NULL, rule_decision = NULL, rule_score = NULL,
+                llm_summary = NULL, summarizer_model_used = NULL
+            WHERE link = ? AND content_hash IS NOT ? AND (? = 'fulltext' OR content_source = 'feed')
+        ''', (title_val, original_summary_val, content_hash_val, content_source_val, link_val, content_hash_val,
+              content_source_val))
         conn.commit()
-        # print(f"DEBUG db_utils: Inserted article ID {cursor.lastrowid}: {title_val[:50]}...")
-        return True # Indicates a new article was added
-    except sqlite3.IntegrityError: # This means UNIQUE constraint on 'link' failed (already exists)
-        # print(f"DEBUG db_utils: Article already exists (link: {link_val}). Skipping insert.")
-        return False
+        if cursor.rowcount == 1:
+            article_log.info("  Content changed, refreshed article: %s...", title_val[:50])
+            return "updated"
+        return "unchanged"
     except Exception as e:
         print(f"❌ ERROR db_utils: Error inserting article '{link_val}': {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return "error"
+    finally:
+        conn.close()
+
+def add_article(article_data: dict) -> bool: # Changed return to bool: True if added, False if exists/error
+    """
+    Adds a new article to the database if its link doesn't already exist (see upsert_article).
+    Returns True if the article was newly inserted, False otherwise (already exists or error).
+    """
+    return upsert_article(article_data) == "inserted"
+
+def get_cached_llm_result(content_hash: str | None, stage: str) -> tuple[str, str | None] | None:
+    """
+    Returns (result, model_used) stored for these exact inputs by a previous filter/summarize
+    call, or None if the content has never been processed by `stage`.
+    """
+    if not content_hash:
+        return None
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT result, model_used FROM llm_result_cache WHERE content_hash = ? AND stage = ?",
+            (content_hash, stage)).fetchone()
+        return (row["result"], row["model_used"]) if row else None
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error reading LLM result cache: {e}")
+        return None
     finally:
         conn.close()
 
-def update_article_ai_relevance(link: str, is_relevant: bool, model_used: str | None):
-    """Updates the AI relevance status and model used for an article."""
+FILTER_ERROR_PREFIX = "error:" # ai_filter_model_used of articles whose LLM relevance check failed
+
+def update_article_ai_relevance(link: str, is_relevant: bool | None, model_used: str | None,
+                                rule_decision: str | None = None, rule_score: int | None = None):
+    """
+    Updates the AI relevance status and model used for an article (and the rule gate's verdict, if given).
+    is_relevant=None means the LLM call failed: is_ai_relevant stays NULL, so the article is
+    neither archived as rejected nor cached, and the next run asks the LLM again.
+    ai_filter_model_used records the failure as 'error:<model>'.
+    """
     if not link: return
+    if is_relevant is None:
+        model_used = f"{FILTER_ERROR_PREFIX}{model_used or ''}"
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute('''
             UPDATE articles 
-            SET is_ai_relevant = ?, ai_filter_model_used = ?
+            SET is_ai_relevant = ?, ai_filter_model_used = ?,
+                rule_decision = COALESCE(?, rule_decision), rule_score = COALESCE(?, rule_score)
             WHERE link = ?
-        ''', (is_relevant, model_used, link))
+        ''', (is_relevant, model_used, rule_decision, rule_score, link))
+        if is_relevant is not None: # Remember a real yes/no for these exact inputs (see get_cached_llm_result)
+            cursor.execute('''
+                INSERT OR REPLACE INTO llm_result_cache (content_hash, stage, result, model_used)
+                SELECT content_hash, 'filter', ?, ? FROM articles WHERE link = ? AND content_hash IS NOT NULL
+            ''', ('1' if is_relevant else '0', model_used, link))
         conn.commit()
         # print(f"DEBUG db_utils: Updated AI relevance for '{link}': {is_relevant}")
     except Exception as e:
@@ -126,6 +496,25 @@ def update_article_ai_relevance(link: str, is_relevant: bool, model_used: str |
     finally:
         conn.close()
 
+def update_article_rule_rejection(link: str, rule_decision: str, rule_score: int, model_used: str = "rules"):
+    """
+    Marks an article not relevant on the rule gate's word alone. Unlike update_article_ai_relevance
+    this leaves llm_result_cache alone, so changing the rules re-decides the article.
+    """
+    if not link: return
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            UPDATE articles
+            SET is_ai_relevant = 0, ai_filter_model_used = ?, rule_decision = ?, rule_score = ?
+            WHERE link = ?
+        ''', (model_used, rule_decision, rule_score, link))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error storing rule decision for '{link}': {e}")
+    finally:
+        conn.close()
+
 def update_article_llm_summary(link: str, summary_text: str, model_used: str | None):
     """Updates the LLM-generated summary and model used for an article."""
     if not link: return
@@ -137,6 +526,11 @@ def update_article_llm_summary(link: str, summary_text: str, model_used: str | N
             SET llm_summary = ?, summarizer_model_used = ?
             WHERE link = ?
         ''', (summary_text, model_used, link))
+        if summary_text and not summary_text.startswith("[Summary"): # Don't cache N/A / LLM error placeholders
+            cursor.execute('''
+                INSERT OR REPLACE INTO llm_result_cache (content_hash, stage, result, model_used)
+                SELECT content_hash, 'summarize', ?, ? FROM articles WHERE link = ? AND content_hash IS NOT NULL
+            ''', (summary_text, model_used, link))
         conn.commit()
         # print(f"DEBUG db_utils: Updated LLM summary for '{link}'.")
     except Exception as e:
@@ -160,6 +554,124 @@ def get_articles_for_filtering() -> list[dict]:
         conn.close()
     return articles
 
+def count_articles_for_filtering() -> int:
+    """Returns how many articles are waiting for AI filtering, without loading them."""
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM articles WHERE is_ai_relevant IS NULL").fetchone()[0]
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error counting articles for filtering: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def iter_articles_for_filtering(page_size: int | None = None):
+    """
+    Streams articles that have not yet been AI-filtered, newest first, one page at a time.
+    Uses keyset pagination on (fetched_at, id) instead of OFFSET, so each page is an
+    index seek and rows updated by the caller between pages are never skipped or repeated.
+    Yields ArticleRow objects (id, link, title, source_name, original_summary, published_at, fetched_at, content_hash).
+    """
+    page_size = page_size or ARTICLE_PAGE_SIZE
+    last_fetched_at, last_id = None, None
+    while True:
+        try:
+            if last_id is None:
+                page = _fetch_page("""
+                    SELECT id, link, title, source_name, original_summary, published_at, fetched_at, content_hash FROM articles
+                    WHERE is_ai_relevant IS NULL
+                    ORDER BY fetched_at DESC, id DESC
+                    LIMIT ?
+                """, (page_size,))
+            else:
+                page = _fetch_page("""
+                    SELECT id, link, title, source_name, original_summary, published_at, fetched_at, content_hash FROM articles
+                    WHERE is_ai_relevant IS NULL
+                      AND (fetched_at < ? OR (fetched_at = ? AND id < ?))
+                    ORDER BY fetched_at DESC, id DESC
+                    LIMIT ?
+                """, (last_fetched_at, last_fetched_at, last_id, page_size))
+        except Exception as e:
+            print(f"❌ ERROR db_utils: Error streaming articles for filtering: {e}")
+            return
+        if not page:
+            return
+        yield from page
+        last_fetched_at, last_id = page[-1]["fetched_at"], page[-1]["id"]
+        if len(page) < page_size:
+            return
+
+def iter_articles_for_summarization(limit: int = 5, page_size: int | None = None):
+    """
+    Streaming counterpart of get_articles_for_summarization(): yields at most `limit`
+    AI-relevant, unsummarized articles as ArticleRow objects, paging by keyset on
+    (published_at, fetched_at, id) so only one page of bodies is resident at a time.
+    """
+    page_size = min(page_size or ARTICLE_PAGE_SIZE, limit) if limit else 0
+    remaining = limit
+    cursor_key = None
+    while remaining > 0:
+        size = min(page_size, remaining)
+        try:
+            if cursor_key is None:
+                page = _fetch_page("""
+                    SELECT id, link, title, source_name, original_summary, published_at, fetched_at, content_hash FROM articles
+                    WHERE is_ai_relevant = TRUE AND llm_summary IS NULL
+                    ORDER BY IFNULL(published_at, '') DESC, fetched_at DESC, id DESC
+                    LIMIT ?
+                """, (size,))
+            else:
+                pub, fetched, art_id = cursor_key
+                page = _fetch_page("""
+                    SELECT id, link, title, source_name, original_summary, published_at, fetched_at, content_hash FROM articles
+                    WHERE is_ai_relevant = TRUE AND llm_summary IS NULL
+                      AND (IFNULL(published_at, '') < ?
+                           OR (IFNULL(published_at, '') = ? AND fetched_at < ?)
+                           OR (IFNULL(published_at, '') = ? AND fetched_at = ? AND id < ?))
+                    ORDER BY IFNULL(published_at, '') DESC, fetched_at DESC, id DESC
+                    LIMIT ?
+                """, (pub, pub, fetched, pub, fetched, art_id, size))
+        except Exception as e:
+            print(f"❌ ERROR db_utils: Error streaming articles for summarization: {e}")
+            return
+        if not page:
+            return
+        yield from page
+        remaining -= len(page)
+        last = page[-1]
+        cursor_key = (last["published_at"] or "", last["fetched_at"], last["id"])
+        if len(page) < size:
+            return
+
+def iter_recent_articles(limit: int, page_size: int | None = None):
+    """
+    Streams the `limit` most recently fetched articles, newest first, as ArticleRow objects
+    (id, link, title, original_summary, published_at, fetched_at, is_ai_relevant, ai_filter_model_used).
+    Pages by keyset on (fetched_at, id), like iter_articles_for_filtering.
+    """
+    page_size = page_size or ARTICLE_PAGE_SIZE
+    remaining, cursor_key = limit, None
+    while remaining > 0:
+        columns = "id, link, title, original_summary, published_at, fetched_at, is_ai_relevant, ai_filter_model_used"
+        try:
+            if cursor_key is None:
+                page = _fetch_page(f"SELECT {columns} FROM articles ORDER BY fetched_at DESC, id DESC LIMIT ?",
+                                   (min(page_size, remaining),))
+            else:
+                page = _fetch_page(f"""
+                    SELECT {columns} FROM articles
+                    WHERE fetched_at < ? OR (fetched_at = ? AND id < ?)
+                    ORDER BY fetched_at DESC, id DESC LIMIT ?
+                """, (cursor_key[0], cursor_key[0], cursor_key[1], min(page_size, remaining)))
+        except Exception as e:
+            print(f"❌ ERROR db_utils: Error streaming recent articles: {e}")
+            return
+        if not page:
+            return
+        yield from page
+        remaining -= len(page)
+        cursor_key = (page[-1]["fetched_at"], page[-1]["id"])
+
 def get_articles_for_summarization(limit: int = 5) -> list[dict]:
     """
     Retrieves AI-relevant articles (is_ai_relevant = TRUE) 
@@ -185,6 +697,455 @@ def get_articles_for_summarization(limit: int = 5) -> list[dict]:
         conn.close()
     return articles
 
+def record_stage_run(run_id: str, stage: str, started_at: float, items_in: int | None = None,
+                     items_out: int | None = None, errors: int = 0):
+    """
+    Records one pipeline stage execution in pipeline_runs.
+    `started_at` is a time.time() timestamp; the duration is measured up to now.
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO pipeline_runs (run_id, stage, started_at, duration_seconds, items_in, items_out, errors)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            run_id,
+            stage,
+            datetime.utcfromtimestamp(started_at).strftime('%Y-%m-%d %H:%M:%S'),
+            round(time.time() - started_at, 3),
+            items_in,
+            items_out,
+            errors,
+        ))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error recording pipeline stage '{stage}': {e}")
+    finally:
+        conn.close()
+    # Every stage reports here, so this is also where the per-stage metrics are kept
+    finished_at = time.time()
+    metrics_utils.STAGE_RUNS.inc(stage=stage)
+    metrics_utils.STAGE_SECONDS.observe(finished_at - started_at, stage=stage)
+    metrics_utils.STAGE_LAST_RUN.set(finished_at, stage=stage)
+    for kind, count in (("in", items_in), ("out", items_out), ("errors", errors)):
+        if count:
+            metrics_utils.STAGE_ITEMS.inc(count, stage=stage, kind=kind)
+
+def get_last_stage_start(stage: str) -> float | None:
+    """Unix time at which `stage` last started (from pipeline_runs), or None if it never ran."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT CAST(strftime('%s', MAX(started_at)) AS INTEGER) FROM pipeline_runs WHERE stage = ?", (stage,)).fetchone()
+        return float(row[0]) if row and row[0] is not None else None
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error reading last '{stage}' run: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_source_poll_states() -> dict[str, dict]:
+    """{source_name: poll state}, with last_polled_ts / next_poll_ts as Unix times (None if unknown)."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT source_name, poll_interval_seconds, new_items_per_hour, polls, polls_with_new,
+                   last_new_items, last_polled_at, last_new_at, next_poll_at, etag, last_modified,
+                   CAST(strftime('%s', last_polled_at) AS REAL) AS last_polled_ts,
+                   CAST(strftime('%s', next_poll_at) AS REAL) AS next_poll_ts
+            FROM source_polls
+        ''').fetchall()
+        return {row["source_name"]: dict(row) for row in rows}
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error reading source poll states: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def save_source_poll(source_name: str, polled_at: float, new_items: int, poll_interval_seconds: float,
+                     new_items_per_hour: float):
+    """Records one poll of `source_name` (Unix time `polled_at`) and schedules the next one."""
+    def to_timestamp(ts: float) -> str:
+        return datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO source_polls (source_name, poll_interval_seconds, new_items_per_hour, polls, polls_with_new,
+                                      last_new_items, last_polled_at, last_new_at, next_poll_at)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (source_name) DO UPDATE SET
+                poll_interval_seconds = excluded.poll_interval_seconds,
+                new_items_per_hour = excluded.new_items_per_hour,
+                polls = polls + 1,
+                polls_with_new = polls_with_new + excluded.polls_with_new,
+                last_new_items = excluded.last_new_items,
+                last_polled_at = excluded.last_polled_at,
+                last_new_at = COALESCE(excluded.last_new_at, last_new_at),
+                next_poll_at = excluded.next_poll_at
+        ''', (
+            source_name,
+            round(poll_interval_seconds, 1),
+            round(new_items_per_hour, 4),
+            1 if new_items else 0,
+            new_items,
+            to_timestamp(polled_at),
+            to_timestamp(polled_at) if new_items else None,
+            to_timestamp(polled_at + poll_interval_seconds),
+        ))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error saving poll state for '{source_name}': {e}")
+    finally:
+        conn.close()
+
+def save_feed_validators(source_name: str, etag: str | None, last_modified: str | None):
+    """Stores the ETag / Last-Modified of a polled source's last feed download for its next conditional request."""
+    conn = get_db_connection()
+    try:
+        conn.execute("UPDATE source_polls SET etag = ?, last_modified = ? WHERE source_name = ?",
+                     (etag, last_modified, source_name))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error saving feed validators for '{source_name}': {e}")
+    finally:
+        conn.close()
+
+_SOURCE_HEALTH_COLUMNS = (
+    "polls", "failures", "consecutive_failures", "last_error", "last_latency_seconds", "avg_latency_seconds",
+    "bozo_rate", "fulltext_attempts", "fulltext_success_rate", "fulltext_aborts", "last_polled_at", "last_success_at",
+    "quarantined_until",
+)
+
+def get_source_health_states() -> dict[str, dict]:
+    """{source_name: source_health row}, with quarantined_until_ts as a Unix time (None if not quarantined)."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT *, CAST(strftime('%s', quarantined_until) AS REAL) AS quarantined_until_ts FROM source_health
+        ''').fetchall()
+        return {row["source_name"]: dict(row) for row in rows}
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error reading source health: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def save_source_health(source_name: str, health: dict):
+    """Upserts a source's source_health row (all columns in `health`, see _SOURCE_HEALTH_COLUMNS)."""
+    conn = get_db_connection()
+    try:
+        conn.execute(f'''
+            INSERT OR REPLACE INTO source_health (source_name, {", ".join(_SOURCE_HEALTH_COLUMNS)})
+            VALUES (?, {", ".join("?" * len(_SOURCE_HEALTH_COLUMNS))})
+        ''', (source_name, *(health.get(column) for column in _SOURCE_HEALTH_COLUMNS)))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error saving health for '{source_name}': {e}")
+    finally:
+        conn.close()
+
+def clear_source_quarantine(source_name: str) -> bool:
+    """Lets a quarantined source be polled again on the next scrape. Returns True if it was known."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE source_health SET quarantined_until = NULL, consecutive_failures = 0 WHERE source_name = ?
+        ''', (source_name,))
+        conn.commit()
+        return cursor.rowcount > 0
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error clearing quarantine for '{source_name}': {e}")
+        return False
+    finally:
+        conn.close()
+
+def add_llm_token_usage(provider: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False,
+                        day: str | None = None):
+    """Adds one LLM call's tokens to today's (UTC) row for `provider`."""
+    day = day or datetime.utcnow().strftime('%Y-%m-%d')
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO llm_token_usage (day, provider, calls, prompt_tokens, completion_tokens, estimated_calls)
+            VALUES (?, ?, 1, ?, ?, ?)
+            ON CONFLICT (day, provider) DO UPDATE SET
+                calls = calls + 1,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                estimated_calls = estimated_calls + excluded.estimated_calls
+        ''', (day, provider, int(prompt_tokens), int(completion_tokens), int(estimated)))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error recording LLM token usage: {e}")
+    finally:
+        conn.close()
+
+def get_llm_token_usage(since_day: str) -> list[dict]:
+    """llm_token_usage rows from `since_day` (YYYY-MM-DD) on, newest day first."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT *, prompt_tokens + completion_tokens AS total_tokens FROM llm_token_usage
+            WHERE day >= ? ORDER BY day DESC, provider
+        ''', (since_day,)).fetchall()
+        return [dict(row) for row in rows]
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error reading LLM token usage: {e}")
+        return []
+    finally:
+        conn.close()
+
+# --- Story Clusters ---
+# When an article happened: published_at if it parsed to a timestamp, else when it was fetched
+_SEEN_AT_SQL = "CASE WHEN published_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN published_at ELSE fetched_at END"
+
+def get_articles_for_clustering(since: str, body_chars: int = 1500) -> list[tuple]:
+    """
+    Articles fetched at or after `since` that the filter has not rejected, oldest first, as
+    (id, title, first `body_chars` of original_summary, seen_at, cluster_id) tuples.
+    """
+    conn = get_db_connection()
+    conn.row_factory = None # Plain tuples: tens of thousands of rows go straight into arrays
+    try:
+        return conn.execute(f"""
+            SELECT id, title, substr(original_summary, 1, ?), {_SEEN_AT_SQL} AS seen_at, cluster_id FROM articles
+            WHERE fetched_at >= ? AND (is_ai_relevant IS NULL OR is_ai_relevant != 0)
+            ORDER BY seen_at, id
+        """, (body_chars, since)).fetchall()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching articles for clustering: {e}")
+        return []
+    finally:
+        conn.close()
+
+def save_story_clusters(new_clusters: list[tuple[str, list[int]]], joined: list[tuple[int, int]],
+                        labels: dict[int, str]) -> list[int]:
+    """
+    Stores one clustering pass in a single transaction:
+        new_clusters: (label, article ids) for each cluster created in this pass
+        joined: (article id, story_clusters.id) for articles added to an existing cluster
+        labels: story_clusters.id -> refreshed label for existing clusters that grew
+    Sizes of every touched cluster are recounted. Returns the ids of the new clusters, in order.
+    """
+    conn = get_db_connection()
+    new_ids = []
+    try:
+        cursor = conn.cursor()
+        for label, article_ids in new_clusters:
+            cursor.execute("INSERT INTO story_clusters (label) VALUES (?)", (label,))
+            cluster_id = cursor.lastrowid
+            new_ids.append(cluster_id)
+            cursor.executemany("UPDATE articles SET cluster_id = ? WHERE id = ?",
+                               [(cluster_id, article_id) for article_id in article_ids])
+        cursor.executemany("UPDATE articles SET cluster_id = ? WHERE id = ?",
+                           [(cluster_id, article_id) for article_id, cluster_id in joined])
+        cursor.executemany("UPDATE story_clusters SET label = ? WHERE id = ?",
+                           [(label, cluster_id) for cluster_id, label in labels.items()])
+        touched = new_ids + sorted({cluster_id for _, cluster_id in joined})
+        cursor.executemany('''
+            UPDATE story_clusters SET size = (SELECT COUNT(*) FROM articles WHERE cluster_id = story_clusters.id),
+                                      updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(cluster_id,) for cluster_id in touched])
+        conn.commit()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error saving story clusters: {e}")
+        conn.rollback()
+        return []
+    finally:
+        conn.close()
+    return new_ids
+
+def get_clustered_articles(since: str) -> list[tuple]:
+    """
+    Clustered, not filter-rejected articles fetched at or after `since`, oldest first, as
+    (cluster_id, label, source_name, title, seen_at) tuples. Feeds the trend report.
+    """
+    conn = get_db_connection()
+    conn.row_factory = None
+    try:
+        return conn.execute(f"""
+            SELECT a.cluster_id, c.label, a.source_name, a.title, {_SEEN_AT_SQL} AS seen_at
+            FROM articles a JOIN story_clusters c ON c.id = a.cluster_id
+            WHERE a.fetched_at >= ? AND (a.is_ai_relevant IS NULL OR a.is_ai_relevant != 0)
+            ORDER BY seen_at, a.id
+        """, (since,)).fetchall()
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching clustered articles: {e}")
+        return []
+    finally:
+        conn.close()
+
+def new_run_id() -> str:
+    """Identifier shared by all stages of one run, e.g. '20250608T070001'."""
+    return datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+
+# --- Subscribers ---
+def _join_preferences(values) -> str | None:
+    """['AI', ' Startups '] -> 'AI,Startups'; empty/None -> None."""
+    cleaned = [value.strip() for value in (values or []) if value and value.strip()]
+    return ",".join(cleaned) or None
+
+def split_preferences(value: str | None) -> list[str]:
+    """Inverse of the comma-separated storage used for preferred_tags / preferred_sources."""
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+def add_subscriber(email: str, name: str | None = None, tags: list[str] | None = None,
+                   sources: list[str] | None = None) -> bool:
+    """
+    Adds a subscriber, or re-activates one who had unsubscribed. Returns True on success.
+    `tags` / `sources` set the digest preferences; passing None keeps the existing ones.
+    """
+    email = (email or "").strip()
+    if "@" not in email:
+        print(f"DEBUG db_utils: Not a valid email address: '{email}'. Skipping.")
+        return False
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO subscribers (email, name, preferred_tags, preferred_sources) VALUES (?, ?, ?, ?)
+            ON CONFLICT (email) DO UPDATE SET
+                is_active = TRUE, unsubscribed_at = NULL, name = COALESCE(excluded.name, subscribers.name),
+                preferred_tags = COALESCE(excluded.preferred_tags, subscribers.preferred_tags),
+                preferred_sources = COALESCE(excluded.preferred_sources, subscribers.preferred_sources)
+        ''', (email, name, _join_preferences(tags), _join_preferences(sources)))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error adding subscriber '{email}': {e}")
+        return False
+    finally:
+        conn.close()
+
+def unsubscribe(email: str) -> bool:
+    """Deactivates a subscriber (kept for history). Returns True if an active subscriber was found."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE subscribers SET is_active = FALSE, unsubscribed_at = CURRENT_TIMESTAMP
+            WHERE email = ? AND is_active
+        ''', ((email or "").strip(),))
+        conn.commit()
+        return cursor.rowcount == 1
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error unsubscribing '{email}': {e}")
+        return False
+    finally:
+        conn.close()
+
+def count_active_subscribers() -> int:
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM subscribers WHERE is_active").fetchone()[0]
+    finally:
+        conn.close()
+
+def iter_active_subscribers(page_size: int | None = None):
+    """
+    Streams active subscribers as {'id', 'email', 'name', 'preferred_tags', 'preferred_sources'} rows,
+    keyset-paginated on id.
+    """
+    page_size = page_size or ARTICLE_PAGE_SIZE
+    last_id = 0
+    while True:
+        page = _fetch_page(
+            "SELECT id, email, name, preferred_tags, preferred_sources FROM subscribers "
+            "WHERE is_active AND id > ? ORDER BY id LIMIT ?",
+            (last_id, page_size))
+        yield from page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+# --- Reader API (api.py) ---
+# Columns in an article listing; the body (original_summary) only comes with a single article
+API_LIST_COLUMNS = ("id, link, title, source_name, published_at, fetched_at, is_ai_relevant, llm_summary, "
+                    "sent_in_newsletter_at, user_saved, user_marked_interesting, cluster_id")
+
+def get_articles_page(limit: int, after: tuple[str, int] | None = None, source: str | None = None,
+                      relevant: bool | None = None, saved: bool | None = None,
+                      interesting: bool | None = None) -> list[ArticleRow]:
+    """
+    One page of articles, newest fetched first, for the reader API. `after` is the
+    (fetched_at, id) of the last article of the previous page (keyset pagination, so a deep page
+    costs the same as the first). The other arguments filter; None means any (and unfiltered
+    articles match neither relevant=True nor relevant=False).
+    """
+    where, params = [], []
+    if after is not None:
+        where.append("(fetched_at < ? OR (fetched_at = ? AND id < ?))")
+        params += [after[0], after[0], after[1]]
+    if source is not None:
+        where.append("source_name = ?")
+        params.append(source)
+    for column, wanted in (("is_ai_relevant", relevant), ("user_saved", saved), ("user_marked_interesting", interesting)):
+        if wanted is not None:
+            where.append(f"{column} = ?")
+            params.append(int(wanted))
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    try:
+        return _fetch_page(f"SELECT {API_LIST_COLUMNS} FROM articles {where_sql} ORDER BY fetched_at DESC, id DESC LIMIT ?",
+                           (*params, limit))
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching a page of articles: {e}")
+        return []
+
+def get_article(article_id: int) -> dict | None:
+    """One article with every column (body included), or None if there is no such id."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return dict(row) if row else None
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching article {article_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def set_article_flags(updates: list[tuple[int, bool | None, bool | None]]) -> list[bool] | None:
+    """
+    Applies (article id, user_saved, user_marked_interesting) updates in one transaction; None
+    leaves that flag as it is. Returns, per update, whether the article exists (None on error).
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        found = []
+        for article_id, saved, interesting in updates:
+            cursor.execute('''
+                UPDATE articles SET user_saved = COALESCE(?, user_saved),
+                                    user_marked_interesting = COALESCE(?, user_marked_interesting)
+                WHERE id = ?
+            ''', (None if saved is None else int(saved), None if interesting is None else int(interesting), article_id))
+            found.append(cursor.rowcount > 0)
+        conn.commit()
+        return found
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error updating article flags: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+class DataVersion:
+    """
+    Tells whether anything was committed to the database since the last check, by any connection
+    in any process (the pipeline, the daemon, another API thread), via PRAGMA data_version on
+    one long-lived connection. A check costs microseconds, so callers can use it per request.
+    """
+    def __init__(self):
+        self._conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
 # --- Functions for Phase 2: Newsletter (Keep for now, or comment out if not needed immediately) ---
 def get_articles_for_newsletter(limit: int = 10) -> list[dict]:
     """Retrieves AI-relevant, summarized articles not yet sent in a newsletter."""
@@ -194,7 +1155,10 @@ def get_articles_for_newsletter(limit: int = 10) -> list[dict]:
     try:
         # Ensure you select all necessary fields for the newsletter template
         cursor.execute("""
-            SELECT id, link, title, llm_summary, source_name, published_at FROM articles
+            SELECT id, link, title, llm_summary, source_name, published_at,
+                   length(original_summary) AS body_chars,
+                   (julianday('now') - COALESCE(julianday(published_at), julianday(fetched_at))) * 24 AS age_hours
+            FROM articles
             WHERE is_ai_relevant = TRUE AND llm_summary IS NOT NULL AND sent_in_newsletter_at IS NULL
             ORDER BY published_at DESC, fetched_at DESC
             LIMIT ?
@@ -207,6 +1171,37 @@ def get_articles_for_newsletter(limit: int = 10) -> list[dict]:
         conn.close()
     return articles
 
+def get_recently_sent_titles(days: int = 14) -> list[str]:
+    """Titles of articles sent in a newsletter during the last `days` days (for novelty scoring)."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT title FROM articles WHERE sent_in_newsletter_at >= datetime('now', ?) AND title IS NOT NULL",
+            (f"-{int(days)} days",)).fetchall()
+        return [row["title"] for row in rows]
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching recently sent titles: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_recently_sent_articles(limit: int = 50) -> list[dict]:
+    """The last `limit` articles sent in a newsletter, newest first (for the output feeds)."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT id, link, title, llm_summary, source_name, published_at, sent_in_newsletter_at FROM articles
+            WHERE sent_in_newsletter_at IS NOT NULL AND llm_summary IS NOT NULL
+            ORDER BY sent_in_newsletter_at DESC, published_at DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    except Exception as e:
+        print(f"❌ ERROR db_utils: Error fetching recently sent articles: {e}")
+        return []
+    finally:
+        conn.close()
+
 def mark_articles_as_sent(article_ids: list[int]):
     """Marks a list of articles (by their database IDs) as sent in the newsletter."""
     if not article_ids:
@@ -0,0 +1,127 @@
+# BittyNews/utils/digest_utils.py
+import itertools
+import os
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+
+try:
+    from utils import db_utils
+    from utils import ranking_utils
+    from utils import render_utils
+    from utils.source_loader import load_sources
+except ImportError:
+    import db_utils
+    import ranking_utils
+    import render_utils
+    from source_loader import load_sources
+
+# --- Digest Configuration ---
+NEWSLETTER_ARTICLE_COUNT = int(os.getenv("NEWSLETTER_ARTICLE_COUNT", 5))
+# Unsent articles loaded once per run; every subscriber's digest is picked from this pool
+NEWSLETTER_CANDIDATE_POOL = int(os.getenv("NEWSLETTER_CANDIDATE_POOL", 200))
+# A subscriber's score for an article is its ranking score × (1 + boosts); one boost per
+# matching tag, one for a preferred source
+TAG_MATCH_BOOST = float(os.getenv("DIGEST_TAG_MATCH_BOOST", 1.0))
+SOURCE_MATCH_BOOST = float(os.getenv("DIGEST_SOURCE_MATCH_BOOST", 2.0))
+
+class DigestBuilder:
+    """
+    Builds personalized digests for many subscribers from one pool of candidate articles.
+
+    Everything shared is computed once per run: the ranking scores (ranking_utils), the
+    tag -> articles and source -> articles inverted indexes (tags come from the article's
+    source in sources.yaml). Rendering goes through render_utils, which renders each article's
+    fragment once per format and caches it across runs. Per distinct preference set, the index postings for those preferences add
+    their boosts to the score vector and a top-k shortlist is taken with a partial sort — no
+    DB queries, no template rendering.
+    Subscribers without preferences get the default digest: the top-ranked articles.
+    Every digest goes through ranking_utils.select_diverse (source cap, one per story).
+
+    Selections are tuples of pool positions, so subscribers with the same selection can be
+    grouped and sent one rendered digest.
+    """
+    def __init__(self, articles: list[dict], k: int | None = None, sources: list[dict] | None = None,
+                 date_str: str | None = None, sent_titles: list[str] | None = None,
+                 fragment_cache: "render_utils.FragmentCache | None" = None):
+        self.articles = articles
+        self.k = k or NEWSLETTER_ARTICLE_COUNT
+        sources = load_sources() if sources is None else sources
+        source_tags = {src["name"]: {tag.lower() for tag in src.get("tags") or []} for src in sources}
+
+        self._title_tokens = [ranking_utils.title_tokens(article["title"]) for article in articles]
+        self.scores = ranking_utils.score_candidates(articles, sources, sent_titles, token_sets=self._title_tokens)
+        self.ranked = ranking_utils.rank_order(self.scores)
+        self.tag_index = defaultdict(list)
+        self.source_index = defaultdict(list)
+        for position, article in enumerate(articles):
+            self.source_index[(article["source_name"] or "").lower()].append(position)
+            for tag in source_tags.get(article["source_name"], ()):
+                self.tag_index[tag].append(position)
+        # Postings as index arrays, so applying a preference is one vectorized add
+        self.tag_index = {tag: np.array(postings) for tag, postings in self.tag_index.items()}
+        self.source_index = {source: np.array(postings) for source, postings in self.source_index.items()}
+        self.default_selection = self._diverse(self.ranked)
+
+        self._date_str = date_str or datetime.now().strftime('%B %d, %Y')
+        self._fragment_cache = fragment_cache
+        self._selections = {}
+
+    def _diverse(self, order) -> tuple[int, ...]:
+        return tuple(ranking_utils.select_diverse(self.articles, order, self.k, token_sets=self._title_tokens))
+
+    def select(self, tags=None, sources=None) -> tuple[int, ...]:
+        """
+        Top-k pool positions for one subscriber's preferences (lists of tags / source names).
+        Memoized per distinct preference set, which is far smaller than the subscriber count.
+        """
+        key = (frozenset(tag.lower() for tag in tags or ()), frozenset(source.lower() for source in sources or ()))
+        selection = self._selections.get(key)
+        if selection is None:
+            selection = self._selections[key] = self._select(*key)
+        return selection
+
+    def _select(self, tags, sources) -> tuple[int, ...]:
+        boosts = np.zeros(len(self.articles))
+        for tag in tags:
+            if tag in self.tag_index:
+                boosts[self.tag_index[tag]] += TAG_MATCH_BOOST
+        for source in sources:
+            if source in self.source_index:
+                boosts[self.source_index[source]] += SOURCE_MATCH_BOOST
+        if not boosts.any():
+            return self.default_selection
+
+        # Shortlist with headroom for the diversity filter; the global ranking fills any gap
+        shortlist = ranking_utils.top_positions(self.scores * (1.0 + boosts), self.k * 4)
+        return self._diverse(itertools.chain(shortlist, self.ranked))
+
+    def group_subscribers(self, subscribers) -> dict:
+        """
+        Groups subscriber rows (as from db_utils.iter_active_subscribers) by their selection.
+        Returns {selection: [{"email": ..., "name": ...}, ...]}.
+        """
+        groups = defaultdict(list)
+        for subscriber in subscribers:
+            selection = self.select(db_utils.split_preferences(subscriber.get("preferred_tags")),
+                                    db_utils.split_preferences(subscriber.get("preferred_sources")))
+            groups[selection].append({"email": subscriber["email"], "name": subscriber.get("name")})
+        return dict(groups)
+
+    def article_ids(self, selection: tuple[int, ...]) -> list[int]:
+        return [self.articles[position]["id"] for position in selection]
+
+    def render(self, selection: tuple[int, ...], fmt: str = "html") -> str:
+        """One digest in `fmt` (see render_utils.FORMATS) from the cached per-article fragments."""
+        return render_utils.render_digest([self.articles[position] for position in selection], fmt,
+                                          self._date_str, cache=self._fragment_cache)
+
+if __name__ == "__main__":
+    print("--- Testing digest_utils.py ---")
+    candidates = db_utils.get_articles_for_newsletter(limit=NEWSLETTER_CANDIDATE_POOL)
+    builder = DigestBuilder(candidates)
+    print(f"{len(candidates)} candidates, tags indexed: {sorted(builder.tag_index)}")
+    for tag in sorted(builder.tag_index):
+        selection = builder.select(tags=[tag])
+        print(f"  {tag}: {[candidates[position]['title'][:40] for position in selection]}")
+    print("--- Test complete ---")
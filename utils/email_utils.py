@@ -1,8 +1,62 @@
 # BittyNews/utils/email_utils.py
 import os
+import json
+import time
+import threading
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 
+try:
+    from utils import cassette_utils
+except ImportError:
+    import cassette_utils
+
+# --- Fan-out Configuration ---
+# Batching (BREVO_BATCH_SIZE recipients per request) and retries live in utils/outbox_utils.py
+BREVO_MAX_CONCURRENCY = int(os.getenv("BREVO_MAX_CONCURRENCY", 4))      # Parallel HTTP requests
+BREVO_MAX_REQUESTS_PER_SECOND = float(os.getenv("BREVO_MAX_REQUESTS_PER_SECOND", 5))
+BREVO_REQUEST_TIMEOUT = float(os.getenv("BREVO_REQUEST_TIMEOUT", 30))  # Seconds per HTTP request
+
+_api_instance = None
+_api_lock = threading.Lock()
+
+def _get_transactional_api():
+    """
+    Returns the process-wide TransactionalEmailsApi, creating it on first use.
+    One Configuration/ApiClient means one urllib3 connection pool, so every send after the
+    first reuses an open TLS connection to Brevo instead of opening a new one.
+    """
+    global _api_instance
+    if _api_instance is None:
+        with _api_lock:
+            if _api_instance is None:
+                configuration = sib_api_v3_sdk.Configuration()
+                configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
+                # Enough pooled connections for the concurrent batch senders
+                configuration.connection_pool_maxsize = max(BREVO_MAX_CONCURRENCY, 1)
+                _api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+    return _api_instance
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at least 1/rate seconds apart."""
+    def __init__(self, max_per_second: float):
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval or cassette_utils.replaying(): # A replayed Brevo answer needs no pacing
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def _sender():
+    return {"email": os.getenv("NEWSLETTER_SENDER_EMAIL"), "name": os.getenv("NEWSLETTER_SENDER_NAME", "BittyNews Digest")}
+
 def send_email_via_brevo(recipient_email: str, subject: str, html_content: str) -> bool:
     """
     Sends an email using the Brevo (Sendinblue) API.
@@ -28,12 +82,8 @@ def send_email_via_brevo(recipient_email: str, subject: str, html_content: str)
         print("ERROR email_utils: Recipient email not provided.")
         return False
 
-    # Configure API key authorization: api-key
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = api_key
-
-    # Create an instance of the API class
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+    # Shared, pooled API client (see _get_transactional_api)
+    api_instance = _get_transactional_api()
     
     sender_name = os.getenv("NEWSLETTER_SENDER_NAME", "BittyNews Digest") # Optional sender name
 
@@ -65,6 +115,44 @@ def send_email_via_brevo(recipient_email: str, subject: str, html_content: str)
         print(f"❌ ERROR email_utils: Unexpected error sending email via Brevo: {e_gen}")
         return False
 
+def _recipient_entry(recipient) -> dict:
+    """'a@b.c' or {"email", "name", ...} -> Brevo recipient object (empty names dropped)."""
+    if isinstance(recipient, str):
+        return {"email": recipient}
+    return {k: v for k, v in recipient.items() if k in ("email", "name") and v}
+
+def send_batch_once(batch: list[dict], subject: str, html_content: str, text_content: str | None = None,
+                    idempotency_key: str | None = None, limiter: RateLimiter | None = None) -> tuple[bool, bool, str | None]:
+    """
+    One Brevo request for `batch` recipients (one messageVersion each), without retrying;
+    the outbox worker (utils/outbox_utils.py) decides when to try again.
+    `idempotency_key` is passed to Brevo so a request repeated after a lost response is not
+    delivered twice.
+
+    Returns:
+        tuple: (sent, retryable, error) — retryable is True for timeouts, 429 and 5xx.
+    """
+    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+        sender=_sender(),
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content,
+        # One version per recipient, so nobody sees the other subscribers' addresses
+        message_versions=[{"to": [_recipient_entry(recipient)]} for recipient in batch],
+        headers={"idempotencyKey": idempotency_key} if idempotency_key else None,
+    )
+    if limiter:
+        limiter.wait()
+    try:
+        _get_transactional_api().send_transac_email(send_smtp_email, _request_timeout=BREVO_REQUEST_TIMEOUT)
+        return True, False, None
+    except ApiException as e:
+        retryable = e.status in (None, 0, 429) or e.status >= 500
+        return False, retryable, f"HTTP {e.status}: {e.body}"
+    except Exception as e_gen:
+        # Timeouts and connection errors: the request may or may not have arrived, the key covers both
+        return False, True, f"{type(e_gen).__name__}: {e_gen}"
+
 if __name__ == '__main__':
     print("--- Testing email_utils.py (Brevo Sender) ---")
     # Ensure .env is loaded for this direct test if you haven't loaded it globally
@@ -95,4 +183,7 @@ if __name__ == '__main__':
             print("Test email function reported success. Please check your inbox (and spam folder).")
         else:
             print("Test email function reported failure. Check error messages above.")
+        # The path the newsletter outbox uses: one messageVersion per recipient
+        sent, retryable, error = send_batch_once([{"email": recipient}], test_subject + " (batch)", test_html_body)
+        print(f"Batch send: sent={sent}, retryable={retryable}, error={error}")
     print("--- Test Complete ---")
@@ -0,0 +1,172 @@
+# BittyNews/utils/export_utils.py
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+try:
+    from utils import db_utils
+except ImportError:
+    import db_utils
+
+# --- Export Configuration ---
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(db_utils.PROJECT_ROOT, "exports"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+# Articles keep changing for a while after they're scraped (filtered, summarized, sent).
+# Only rows fetched at least this long ago are exported, so each row is written once in its final state.
+EXPORT_SETTLE_HOURS = int(os.getenv("EXPORT_SETTLE_HOURS", 24))
+WATERMARK_FILE = "_watermarks.json"
+
+# Per table: SELECT list (bodies are reduced to their length, which is what the analytics need),
+# the timestamp used for the settle cut-off and for the fetch_date partition, and column types.
+EXPORTS = {
+    "articles": {
+        "select": """
+            id, link, title, source_name, published_at, fetched_at,
+            is_ai_relevant, ai_filter_model_used, llm_summary, summarizer_model_used,
+            sent_in_newsletter_at, user_saved, user_marked_interesting,
+            length(original_summary) AS body_chars, length(llm_summary) AS summary_chars
+        """,
+        "time_column": "fetched_at",
+        "settle": True,
+        "types": {
+            "id": "int", "link": "str", "title": "str", "source_name": "str", "published_at": "str",
+            "fetched_at": "ts", "is_ai_relevant": "bool", "ai_filter_model_used": "str",
+            "llm_summary": "str", "summarizer_model_used": "str", "sent_in_newsletter_at": "ts",
+            "user_saved": "bool", "user_marked_interesting": "bool",
+            "body_chars": "int", "summary_chars": "int",
+        },
+    },
+    "pipeline_runs": {
+        "select": "id, run_id, stage, started_at, duration_seconds, items_in, items_out, errors",
+        "time_column": "started_at",
+        "settle": False,  # Rows are final when written
+        "types": {
+            "id": "int", "run_id": "str", "stage": "str", "started_at": "ts",
+            "duration_seconds": "float", "items_in": "int", "items_out": "int", "errors": "int",
+        },
+    },
+}
+
+def _to_timestamp(value):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+_CONVERTERS = {
+    "int": lambda v: None if v is None else int(v),
+    "float": lambda v: None if v is None else float(v),
+    "str": lambda v: None if v is None else str(v),
+    "bool": lambda v: None if v is None else bool(v),
+    "ts": _to_timestamp,
+}
+
+def _arrow_schema(types: dict):
+    import pyarrow as pa
+    arrow_types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "bool": pa.bool_(), "ts": pa.timestamp("s")}
+    fields = [pa.field(name, arrow_types[kind]) for name, kind in types.items()]
+    fields.append(pa.field("fetch_date", pa.string()))  # Partition key (YYYY-MM-DD)
+    return pa.schema(fields)
+
+def load_watermarks(export_dir: str) -> dict:
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _save_watermarks(export_dir: str, watermarks: dict):
+    """Atomic replace, so an interrupted export never leaves a half-written watermark file."""
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _read_chunk(table: str, spec: dict, after_id: int, cutoff: str | None, chunk_rows: int) -> list:
+    """One keyset page (id > after_id) on a short-lived connection, so the live pipeline isn't blocked."""
+    where, params = ["id > ?"], [after_id]
+    if cutoff:
+        where.append(f"{spec['time_column']} < ?")
+        params.append(cutoff)
+    params.append(chunk_rows)
+    conn = db_utils.get_db_connection()
+    try:
+        return conn.execute(
+            f"SELECT {spec['select']}, substr({spec['time_column']}, 1, 10) AS fetch_date FROM {table} "
+            f"WHERE {' AND '.join(where)} ORDER BY id LIMIT ?", params).fetchall()
+    finally:
+        conn.close()
+
+def export_table(table: str, export_dir: str | None = None, chunk_rows: int | None = None, full: bool = False) -> int:
+    """
+    Appends rows of `table` added since the last export to a Parquet dataset partitioned by fetch date:
+    <export_dir>/<table>/fetch_date=YYYY-MM-DD/part-<first_id>-<last_id>-0.parquet
+
+    Reads in keyset chunks of `chunk_rows`, so memory stays flat regardless of table size.
+    The watermark (last exported id) is saved after every chunk; part files are named after their
+    id range, so a rerun after a crash overwrites rather than duplicates.
+
+    Returns:
+        int: number of rows exported.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spec = EXPORTS[table]
+    export_dir = export_dir or EXPORT_DIR
+    chunk_rows = chunk_rows or EXPORT_CHUNK_ROWS
+    dataset_dir = os.path.join(export_dir, table)
+    if full and os.path.isdir(dataset_dir):
+        shutil.rmtree(dataset_dir)  # A full re-export replaces the dataset instead of duplicating it
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    last_id = 0 if full else load_watermarks(export_dir).get(table, 0)
+    cutoff = None
+    if spec["settle"] and EXPORT_SETTLE_HOURS > 0:
+        cutoff = datetime.utcfromtimestamp(time.time() - EXPORT_SETTLE_HOURS * 3600).strftime('%Y-%m-%d %H:%M:%S')
+
+    schema = _arrow_schema(spec["types"])
+    exported = 0
+    while True:
+        rows = _read_chunk(table, spec, last_id, cutoff, chunk_rows)
+        if not rows:
+            break
+        columns = {name: [_CONVERTERS[kind](row[name]) for row in rows] for name, kind in spec["types"].items()}
+        columns["fetch_date"] = [row["fetch_date"] or "unknown" for row in rows]
+        arrow_table = pa.Table.from_pydict(columns, schema=schema)
+
+        first_id, chunk_last_id = rows[0]["id"], rows[-1]["id"]
+        pq.write_to_dataset(
+            arrow_table,
+            root_path=dataset_dir,
+            partition_cols=["fetch_date"],
+            basename_template=f"part-{first_id:010d}-{chunk_last_id:010d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        exported += len(rows)
+        last_id = chunk_last_id
+        watermarks = load_watermarks(export_dir)
+        watermarks[table] = last_id
+        _save_watermarks(export_dir, watermarks)
+        if len(rows) < chunk_rows:
+            break
+
+    print(f"DEBUG export_utils: Exported {exported} new '{table}' rows to {dataset_dir} (watermark id={last_id}).")
+    return exported
+
+def export_all(export_dir: str | None = None, chunk_rows: int | None = None, full: bool = False) -> dict:
+    """Runs export_table() for articles and pipeline telemetry. Returns {table: rows_exported}."""
+    return {table: export_table(table, export_dir=export_dir, chunk_rows=chunk_rows, full=full) for table in EXPORTS}
+
+
+if __name__ == "__main__":
+    print("--- Testing export_utils.py ---")
+    print(f"Exporting from {db_utils.DB_PATH} to {EXPORT_DIR}")
+    for table_name, count in export_all().items():
+        print(f"  {table_name}: {count} rows")
+    print("--- Test complete ---")
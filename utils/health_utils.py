@@ -0,0 +1,98 @@
+# BittyNews/utils/health_utils.py
+import time
+from datetime import datetime
+
+try:
+    from utils import db_utils
+    from utils.settings import get_settings
+except ImportError:
+    import db_utils
+    from settings import get_settings
+
+# --- Source Health Configuration ---
+# See utils/settings.py. After n consecutive failed polls a source is skipped for
+# HEALTH_QUARANTINE_BASE_SECONDS * 2**(n-1), capped at HEALTH_QUARANTINE_MAX_SECONDS. Below
+# HEALTH_FULLTEXT_MIN_RATE full-text success (after HEALTH_FULLTEXT_MIN_ATTEMPTS tries) only the
+# first article per poll is downloaded with newspaper3k; the rest use the feed's own content.
+
+def quarantine_seconds(consecutive_failures: int) -> int:
+    if consecutive_failures <= 0:
+        return 0
+    settings = get_settings()
+    return min(settings.health_quarantine_base_seconds * 2 ** (consecutive_failures - 1), settings.health_quarantine_max_seconds)
+
+def _smooth(previous: float | None, observed: float) -> float:
+    smoothing = get_settings().health_smoothing
+    return observed if previous is None else smoothing * observed + (1 - smoothing) * previous
+
+def _timestamp(ts: float) -> str:
+    return datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+def is_quarantined(state: dict | None, now: float | None = None) -> bool:
+    now = time.time() if now is None else now
+    return bool(state and state.get("quarantined_until_ts") and state["quarantined_until_ts"] > now)
+
+def fulltext_worthwhile(state: dict | None) -> bool:
+    """False for sources whose article pages have mostly failed to extract lately."""
+    settings = get_settings()
+    if not state or state["fulltext_success_rate"] is None or state["fulltext_attempts"] < settings.health_fulltext_min_attempts:
+        return True
+    return state["fulltext_success_rate"] >= settings.health_fulltext_min_rate
+
+def record_feed_result(source_name: str, state: dict | None, latency_seconds: float | None, error: str | None = None,
+                       bozo: bool = False, fulltext_attempts: int = 0, fulltext_successes: int = 0,
+                       fulltext_aborts: int = 0, polled_at: float | None = None) -> dict:
+    """
+    Folds one poll of `source_name` into its source_health row and returns the new row.
+    `error` marks the poll as failed (unreachable, HTTP error, timeout, unusable feed), which
+    quarantines the source for quarantine_seconds(consecutive failures); a success lifts it.
+    `fulltext_aborts` counts article downloads given up on (wrong type, too large, too slow);
+    they are also among the failed `fulltext_attempts`.
+    """
+    polled_at = time.time() if polled_at is None else polled_at
+    state = state or {}
+    health = {
+        "polls": (state.get("polls") or 0) + 1,
+        "failures": (state.get("failures") or 0) + (1 if error else 0),
+        "consecutive_failures": (state.get("consecutive_failures") or 0) + 1 if error else 0,
+        "last_error": error or state.get("last_error"),
+        "last_latency_seconds": latency_seconds,
+        "avg_latency_seconds": state.get("avg_latency_seconds"),
+        "bozo_rate": _smooth(state.get("bozo_rate"), 1.0 if bozo else 0.0),
+        "fulltext_attempts": (state.get("fulltext_attempts") or 0) + fulltext_attempts,
+        "fulltext_success_rate": state.get("fulltext_success_rate"),
+        "fulltext_aborts": (state.get("fulltext_aborts") or 0) + fulltext_aborts,
+        "last_polled_at": _timestamp(polled_at),
+        "last_success_at": state.get("last_success_at") if error else _timestamp(polled_at),
+        "quarantined_until": None,
+    }
+    if latency_seconds is not None:
+        health["avg_latency_seconds"] = _smooth(state.get("avg_latency_seconds"), latency_seconds)
+    if fulltext_attempts:
+        health["fulltext_success_rate"] = _smooth(state.get("fulltext_success_rate"), fulltext_successes / fulltext_attempts)
+    if error:
+        delay = quarantine_seconds(health["consecutive_failures"])
+        health["quarantined_until"] = _timestamp(polled_at + delay)
+        print(f"WARNING health_utils: {source_name} failed {health['consecutive_failures']} time(s) in a row "
+              f"({error}); quarantined for {delay / 60:.0f} min.")
+    db_utils.save_source_health(source_name, health)
+    return health
+
+def health_report(sort: str = "errors") -> list[dict]:
+    """
+    source_health rows for the CLI, worst first: sort='errors' (consecutive failures, failure
+    share, bozo rate) or sort='latency' (smoothed feed latency).
+    """
+    rows = list(db_utils.get_source_health_states().values())
+    if sort == "latency":
+        return sorted(rows, key=lambda row: row["avg_latency_seconds"] or 0.0, reverse=True)
+    return sorted(rows, key=lambda row: (row["consecutive_failures"], row["failures"] / max(row["polls"], 1),
+                                         row["bozo_rate"] or 0.0), reverse=True)
+
+
+if __name__ == "__main__":
+    print("--- Testing health_utils.py ---")
+    for row in health_report():
+        print(f"  {row['source_name']}: {row['failures']}/{row['polls']} failed, "
+              f"latency {row['avg_latency_seconds'] or 0:.2f}s, quarantined until {row['quarantined_until']}")
+    print("--- Test complete ---")
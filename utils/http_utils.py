@@ -0,0 +1,135 @@
+# BittyNews/utils/http_utils.py
+"""
+The process-wide HTTP session: feed downloads, article pages (handed to newspaper3k as HTML)
+and LLM calls all go through one pooled requests.Session, so a keep-alive connection to each
+publisher and to Groq/OpenRouter is opened once per process, not once per request.
+
+urllib3 keeps one connection pool per host and, by default, only 10 host pools, so a scrape over
+dozens of publishers would keep closing its idle connections. HTTP_POOL_HOSTS raises that, and
+HTTP_POOL_MAXSIZE sets the connections kept per host (the pipeline's filter and summarize
+workers call the same LLM host concurrently). Responses are negotiated as gzip/deflate, plus
+brotli/zstd when the `brotli` / `zstandard` packages are installed.
+
+Article pages are fetched with fetch_bounded(), which streams the body and gives up on
+non-HTML responses (PDFs, video), bodies over a byte cap and servers slow to answer, so one bad
+link can't hold the scrape or its memory.
+"""
+import threading
+import time
+
+try:
+    from utils.settings import get_settings
+except ImportError:
+    from settings import get_settings
+
+# --- Bounded Download Configuration ---
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# requests is imported on first use, so importing this module (from llm_utils) stays cheap
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """The shared requests.Session, created on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util import make_headers
+                settings = get_settings()
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=settings.http_pool_hosts, pool_maxsize=settings.http_pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(make_headers(accept_encoding=True)) # gzip,deflate (+br, zstd when installed)
+                _session = session
+    return _session
+
+
+class DownloadAborted(Exception):
+    """A bounded download gave up early; `reason` is content_type, too_large, ttfb, stalled or http_<status>."""
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+def _content_type(response) -> str:
+    return response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+def fetch_bounded(url: str, headers: dict | None = None, timeout: float = 15, max_bytes: int = 5_000_000,
+                  ttfb_seconds: float = 5.0, allowed_types: tuple = HTML_CONTENT_TYPES):
+    """
+    GETs `url` as a stream, giving up before a large or slow body is in memory. Raises
+    DownloadAborted if the status isn't 2xx, the Content-Type isn't one of `allowed_types`
+    (a missing one is allowed), Content-Length or the bytes read (after gzip/brotli decoding)
+    pass `max_bytes`, no response headers arrive within `ttfb_seconds`, or the body takes longer
+    than `timeout` overall. Returns (response, body bytes); network errors propagate as usual.
+    """
+    import requests
+    started = time.monotonic()
+    try:
+        # The read timeout bounds every wait for data: first the headers (TTFB), then each chunk
+        response = get_session().get(url, headers=headers, stream=True, timeout=(timeout, ttfb_seconds))
+    except requests.exceptions.ReadTimeout as e:
+        raise DownloadAborted("ttfb", f"no response within {ttfb_seconds:g}s") from e
+    with response:
+        if not response.ok:
+            raise DownloadAborted(f"http_{response.status_code}")
+        content_type = _content_type(response)
+        if content_type and content_type not in allowed_types:
+            raise DownloadAborted("content_type", content_type)
+        declared = response.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise DownloadAborted("too_large", f"Content-Length {declared}")
+        chunks, size = [], 0
+        try:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadAborted("too_large", f"over {max_bytes} bytes")
+                if time.monotonic() - started > timeout:
+                    raise DownloadAborted("stalled", f"body not complete after {timeout:g}s")
+                chunks.append(chunk)
+        except requests.exceptions.ConnectionError as e: # A read timeout mid-body surfaces as a ConnectionError
+            if "timed out" not in str(e).lower():
+                raise
+            raise DownloadAborted("stalled", f"no data for {ttfb_seconds:g}s") from e
+    return response, b"".join(chunks)
+
+
+def decoded_html(response, content: bytes):
+    """
+    A response body for an HTML parser, decoded the way newspaper3k does it. If the server named
+    a charset, the body is decoded to text. Otherwise it stays as bytes, so lxml can read the
+    page's <meta charset> instead of trusting requests' ISO-8859-1 default.
+    """
+    if response.encoding and response.encoding.lower() != "iso-8859-1":
+        try:
+            return content.decode(response.encoding, errors="replace")
+        except LookupError: # A charset Python doesn't know
+            pass
+    return content
+
+
+def close():
+    """Closes the pooled connections (the next get_session() opens a new session)."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+if __name__ == "__main__":
+    print("--- Testing http_utils.py ---")
+    session = get_session()
+    print(f"Accept-Encoding: {session.headers['Accept-Encoding']}")
+    adapter = session.get_adapter("https://example.com")
+    print(f"Host pools: {adapter._pool_connections}, connections per host: {adapter._pool_maxsize}")
+    close()
+    print("--- Test complete ---")
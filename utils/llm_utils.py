@@ -1,25 +1,28 @@
 # BittyNews/utils/llm_utils.py
-import os
-import requests
 import json
 import time # For sleep/backoff
-from dotenv import load_dotenv
 
-# --- Environment Variable Loading ---
-dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-loaded_env = load_dotenv(dotenv_path=dotenv_path, verbose=False, override=False) # Set verbose=True for .env loading debug
-
-if not loaded_env:
-    print(f"DEBUG llm_utils: WARNING - .env file not found or not loaded from {dotenv_path}")
-else:
-    print(f"DEBUG llm_utils: Successfully loaded .env from {dotenv_path}")
-
-# --- API Configurations ---
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_BASE_URL = os.getenv("GROQ_API_BASE_URL", "https://api.groq.com/openai/v1") # Groq uses an OpenAI-compatible endpoint
-
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+try:
+    from utils.settings import get_settings
+    from utils import metrics_utils
+    from utils import profile_utils
+    from utils import http_utils
+    from utils import budget_utils
+    from utils.log_utils import get_logger
+except ImportError:
+    from settings import get_settings
+    import metrics_utils
+    import profile_utils
+    import http_utils
+    import budget_utils
+    from log_utils import get_logger
+
+log = get_logger("llm_utils")
+
+def _get_session():
+    """The shared pooled session (utils/http_utils.py), so keep-alive connections to Groq/OpenRouter
+    are reused across calls (and across cycles when running as a daemon)."""
+    return http_utils.get_session()
 
 # --- Helper to make the actual HTTP POST request ---
 def _execute_llm_call(
@@ -30,10 +33,23 @@ def _execute_llm_call(
     timeout: int
 ) -> dict:
     """ Executes the HTTP POST request and returns JSON response or raises error. """
-    # print(f"DEBUG llm_utils: [{provider_name}] Sending payload to {api_url}: {json.dumps(payload, indent=2)}")
-    response = requests.post(api_url, headers=headers, json=payload, timeout=timeout)
-    response.raise_for_status() # Will raise HTTPError for 4xx/5xx responses
-    return response.json()
+    # log.debug("[%s] Sending payload to %s: %s", provider_name, api_url, json.dumps(payload, indent=2))
+    provider = provider_name.lower()
+    outcome = "error"
+    try:
+        with metrics_utils.LLM_CALL_SECONDS.time(provider=provider), profile_utils.span("llm_call"):
+            response = _get_session().post(api_url, headers=headers, json=payload, timeout=timeout)
+        outcome = f"http_{response.status_code}" if response.status_code >= 400 else "ok"
+        response.raise_for_status() # Will raise HTTPError for 4xx/5xx responses
+        data = response.json()
+        budget_utils.record_usage(provider, data, payload) # Today's tokens, for LLM_DAILY_TOKEN_BUDGET
+        return data
+    except Exception as e:
+        if type(e).__name__ in ("Timeout", "ReadTimeout", "ConnectTimeout"):
+            outcome = "timeout"
+        raise
+    finally:
+        metrics_utils.LLM_CALLS.inc(provider=provider, outcome=outcome)
 
 # --- Main LLM Call Function ---
 def call_llm(
@@ -55,26 +71,26 @@ def call_llm(
     Returns:
         str: The content returned by the LLM, or an error message string if issues occur.
     """
-    default_groq_model = os.getenv("PRIMARY_GROQ_MODEL", "llama3-8b-8192")
-    default_openrouter_fallback_model = os.getenv("FALLBACK_OPENROUTER_MODEL", "mistralai/mistral-7b-instruct") # A valid OpenRouter model
-    
-    groq_model_to_use = primary_groq_model_override or default_groq_model
-    openrouter_model_to_use = fallback_openrouter_model_override or default_openrouter_fallback_model
+    import requests
+    settings = get_settings() # Read once per process, not per call
+
+    groq_model_to_use = primary_groq_model_override or settings.primary_groq_model
+    openrouter_model_to_use = fallback_openrouter_model_override or settings.fallback_openrouter_model
     
-    temperature = float(os.getenv("LLM_TEMPERATURE", 0.7))
+    temperature = settings.llm_temperature
     messages_payload = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": prompt}
     ]
 
-    max_retries = int(os.getenv("LLM_MAX_RETRIES", 3))
-    base_backoff_time = float(os.getenv("LLM_BASE_BACKOFF_SECONDS", 1.0))
+    max_retries = settings.llm_max_retries
+    base_backoff_time = settings.llm_base_backoff_seconds
 
     # --- Attempt 1: Groq Direct ---
-    if GROQ_API_KEY and groq_model_to_use:
-        print(f"DEBUG llm_utils: Attempting Groq Direct call with model: '{groq_model_to_use}'")
+    if settings.groq_api_key and groq_model_to_use:
+        log.debug("Attempting Groq Direct call with model: '%s'", groq_model_to_use)
         groq_headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Authorization": f"Bearer {settings.groq_api_key}",
             "Content-Type": "application/json",
         }
         groq_payload = {
@@ -82,8 +98,8 @@ def call_llm(
             "messages": messages_payload,
             "temperature": temperature
         }
-        groq_api_url = f"{GROQ_BASE_URL.rstrip('/')}/chat/completions"
-        groq_timeout = int(os.getenv("GROQ_TIMEOUT_SECONDS", 15))
+        groq_api_url = f"{settings.groq_base_url.rstrip('/')}/chat/completions"
+        groq_timeout = settings.groq_timeout_seconds
 
         for attempt in range(max_retries):
             try:
@@ -93,14 +109,14 @@ def call_llm(
                    data["choices"][0]["message"].get("content") is not None:
                     return data["choices"][0]["message"]["content"].strip()
                 else:
-                    print(f"DEBUG llm_utils: [Groq] LLM response structure unexpected: {data}")
+                    log.warning("[Groq] LLM response structure unexpected: %s", data)
                     break # Don't retry on structural issues, proceed to fallback
             except requests.exceptions.HTTPError as http_err:
                 error_status = http_err.response.status_code
                 error_content = "No response body"
                 try: error_content = http_err.response.text
                 except: pass
-                print(f"DEBUG llm_utils: [Groq] HTTP error {error_status} (Attempt {attempt+1}/{max_retries}): {error_content}")
+                log.warning("[Groq] HTTP error %s (Attempt %d/%d): %s", error_status, attempt + 1, max_retries, error_content)
                 
                 if error_status == 429: # Rate limit
                     wait_time_from_header = 0
@@ -115,53 +131,58 @@ def call_llm(
 
                     if attempt < max_retries - 1:
                         wait_time = wait_time_from_header if wait_time_from_header > 0 else base_backoff_time * (2 ** attempt)
-                        print(f"DEBUG llm_utils: [Groq] Rate limit. Waiting {wait_time:.2f}s before retry {attempt+2}...")
+                        log.debug("[Groq] Rate limit. Waiting %.2fs before retry %d...", wait_time, attempt + 2)
+                        metrics_utils.LLM_RETRIES.inc(provider="groq", reason="rate_limit")
                         time.sleep(wait_time)
                         continue 
                     else: break # Max retries for rate limit
                 elif error_status in [500, 502, 503, 504]: # Server errors
                     if attempt < max_retries - 1:
                         wait_time = base_backoff_time * (2 ** attempt)
-                        print(f"DEBUG llm_utils: [Groq] Server error {error_status}. Waiting {wait_time}s before retry {attempt+2}...")
+                        log.debug("[Groq] Server error %s. Waiting %ss before retry %d...", error_status, wait_time, attempt + 2)
+                        metrics_utils.LLM_RETRIES.inc(provider="groq", reason="server_error")
                         time.sleep(wait_time)
                         continue
                     else: break # Max retries for server error
                 else: # Other HTTP errors (400, 401, 403, 404, 413) - likely persistent for this request/config
                     break # Proceed to fallback
             except requests.exceptions.Timeout:
-                print(f"DEBUG llm_utils: [Groq] Request timed out (Attempt {attempt+1}/{max_retries}).")
-                if attempt < max_retries - 1: continue
+                log.warning("[Groq] Request timed out (Attempt %d/%d).", attempt + 1, max_retries)
+                if attempt < max_retries - 1:
+                    metrics_utils.LLM_RETRIES.inc(provider="groq", reason="timeout")
+                    continue
                 else: break
             except Exception as e: # Includes requests.exceptions.RequestException
-                print(f"DEBUG llm_utils: [Groq] Unexpected error (Attempt {attempt+1}/{max_retries}): {e} (Type: {type(e).__name__})")
-                import traceback; traceback.print_exc()
+                log.warning("[Groq] Unexpected error (Attempt %d/%d): %s (Type: %s)", attempt + 1, max_retries, e,
+                            type(e).__name__, exc_info=True)
                 if attempt < max_retries - 1:
+                    metrics_utils.LLM_RETRIES.inc(provider="groq", reason="error")
                     time.sleep(base_backoff_time * (2 ** attempt))
                     continue
                 else: break
         # If Groq attempt loop finished without returning, it means it failed all retries or had a non-retryable error
-        print(f"DEBUG llm_utils: Groq direct call failed for model '{groq_model_to_use}'. Proceeding to OpenRouter fallback.")
+        log.warning("Groq direct call failed for model '%s'. Proceeding to OpenRouter fallback.", groq_model_to_use)
     else:
-        if not GROQ_API_KEY: print("DEBUG llm_utils: GROQ_API_KEY not set. Skipping Groq attempt.")
-        if not groq_model_to_use: print("DEBUG llm_utils: No Groq model specified. Skipping Groq attempt.")
+        if not settings.groq_api_key: log.debug("GROQ_API_KEY not set. Skipping Groq attempt.")
+        if not groq_model_to_use: log.debug("No Groq model specified. Skipping Groq attempt.")
 
 
     # --- Attempt 2: OpenRouter Fallback ---
-    if OPENROUTER_API_KEY and openrouter_model_to_use:
-        print(f"DEBUG llm_utils: Attempting OpenRouter fallback call with model: '{openrouter_model_to_use}'")
+    if settings.openrouter_api_key and openrouter_model_to_use:
+        log.debug("Attempting OpenRouter fallback call with model: '%s'", openrouter_model_to_use)
         openrouter_headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Authorization": f"Bearer {settings.openrouter_api_key}",
             "Content-Type": "application/json",
-            "HTTP-Referer": os.getenv("HTTP_REFERER", "http://localhost:3000"),
-            "X-Title": os.getenv("X_TITLE", "BittyNews")
+            "HTTP-Referer": settings.http_referer,
+            "X-Title": settings.x_title
         }
         openrouter_payload = {
             "model": openrouter_model_to_use,
             "messages": messages_payload,
             "temperature": temperature
         }
-        openrouter_api_url = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
-        openrouter_timeout = int(os.getenv("OPENROUTER_TIMEOUT_SECONDS", 30))
+        openrouter_api_url = f"{settings.openrouter_base_url.rstrip('/')}/chat/completions"
+        openrouter_timeout = settings.openrouter_timeout_seconds
 
         # Note: Retries for OpenRouter could also be implemented here if desired, similar to Groq.
         # For simplicity in this example, OpenRouter fallback is a single attempt.
@@ -172,21 +193,20 @@ def call_llm(
                data["choices"][0]["message"].get("content") is not None:
                 return data["choices"][0]["message"]["content"].strip()
             else:
-                print(f"DEBUG llm_utils: [OpenRouter] LLM response structure unexpected: {data}")
+                log.warning("[OpenRouter] LLM response structure unexpected: %s", data)
                 return f"Error: OpenRouter fallback response format invalid for model {openrouter_model_to_use}."
         except requests.exceptions.HTTPError as http_err:
             error_content = "No response body"
             try: error_content = http_err.response.text
             except: pass
-            print(f"DEBUG llm_utils: [OpenRouter] HTTP error {http_err.response.status_code}: {error_content}")
+            log.error("[OpenRouter] HTTP error %s: %s", http_err.response.status_code, error_content)
             return f"Error: OpenRouter fallback failed for model {openrouter_model_to_use} with HTTP error {http_err.response.status_code}."
         except Exception as e: # Includes requests.exceptions.Timeout, requests.exceptions.RequestException
-            print(f"DEBUG llm_utils: [OpenRouter] Error: {e} (Type: {type(e).__name__})")
-            import traceback; traceback.print_exc()
+            log.error("[OpenRouter] Error: %s (Type: %s)", e, type(e).__name__, exc_info=True)
             return f"Error: OpenRouter fallback failed for model {openrouter_model_to_use} with error: {e}"
     else:
-        if not OPENROUTER_API_KEY: print("DEBUG llm_utils: OPENROUTER_API_KEY not set. Skipping OpenRouter fallback.")
-        if not openrouter_model_to_use: print("DEBUG llm_utils: No OpenRouter fallback model specified. Skipping OpenRouter fallback.")
+        if not settings.openrouter_api_key: log.debug("OPENROUTER_API_KEY not set. Skipping OpenRouter fallback.")
+        if not openrouter_model_to_use: log.debug("No OpenRouter fallback model specified. Skipping OpenRouter fallback.")
 
     return "Error: All LLM attempts failed (Groq and OpenRouter)."
 
@@ -195,7 +215,7 @@ def call_llm(
 if __name__ == "__main__":
     print("\n--- Testing llm_utils.py with Groq Direct + OpenRouter Fallback ---")
     
-    if not os.getenv("GROQ_API_KEY") and not os.getenv("OPENROUTER_API_KEY"):
+    if not get_settings().groq_api_key and not get_settings().openrouter_api_key:
         print("\nERROR: Neither GROQ_API_KEY nor OPENROUTER_API_KEY found in .env. Please set at least one for testing.")
         print("--- Test complete ---")
         exit()
@@ -0,0 +1,130 @@
+# BittyNews/utils/log_utils.py
+"""
+Leveled logging for the pipeline, in place of print() on the hot paths.
+
+    from utils.log_utils import get_logger, get_article_logger
+    log = get_logger("llm_utils")               # DEBUG/INFO/WARNING/ERROR, filtered by LOG_LEVEL
+    article_log = get_article_logger("scraper") # One line per article; LOG_ARTICLES=false silences it
+
+LOG_FORMAT=text (default) keeps the familiar console output: INFO lines are the bare message, and
+other levels get the 'DEBUG llm_utils: ...' / '❌ ERROR scraper: ...' prefixes the prints used.
+LOG_FORMAT=json writes one JSON object per line (ts, level, logger, msg, and any `extra=` fields)
+for log shippers. Per-article lines go through the 'bittynews.articles' logger, so under load they
+can be switched off (LOG_ARTICLES=false) without losing stage summaries or errors.
+"""
+import json
+import logging
+import sys
+import threading
+from datetime import datetime, timezone
+
+try:
+    from utils.settings import get_settings
+except ImportError:
+    from settings import get_settings
+
+ROOT_LOGGER = "bittynews"
+ARTICLE_LOGGER = f"{ROOT_LOGGER}.articles"
+_TEXT_PREFIXES = {logging.ERROR: "❌ ERROR", logging.CRITICAL: "❌ CRITICAL"}
+# LogRecord attributes that aren't user-supplied `extra=` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _short_name(record: logging.LogRecord) -> str:
+    return record.name.rsplit(".", 1)[-1]
+
+
+class TextFormatter(logging.Formatter):
+    """INFO as the bare message; other levels as '<LEVEL> <module>: message'."""
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.levelno != logging.INFO:
+            message = f"{_TEXT_PREFIXES.get(record.levelno, record.levelname)} {_short_name(record)}: {message}"
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields (source, link, seconds, ...) become top-level keys."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.threadName != "MainThread":
+            entry["thread"] = record.threadName
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None, articles: bool | None = None, stream=None):
+    """
+    Sets up the 'bittynews' logger tree from the settings (LOG_LEVEL, LOG_FORMAT, LOG_ARTICLES);
+    arguments override them. Happens by itself on the first log record, so entry points only call
+    it to override the settings.
+    """
+    global _configured
+    settings = get_settings()
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(JsonFormatter() if (fmt or settings.log_format) == "json" else TextFormatter())
+        root.addHandler(handler)
+        root.setLevel((level or settings.log_level).upper())
+        show_articles = settings.log_articles if articles is None else articles
+        logging.getLogger(ARTICLE_LOGGER).setLevel(logging.NOTSET if show_articles else logging.WARNING)
+        _configured = True
+
+
+class _ConfigureOnFirstRecord(logging.Handler):
+    """
+    Placeholder handler until the first record: reading the settings loads .env, which importing a
+    module must not do (see utils/settings.py). Configures, then re-filters the record by the real level.
+    """
+    def emit(self, record: logging.LogRecord):
+        with _configure_lock:
+            needs_configuring = not _configured
+        if needs_configuring:
+            configure_logging()
+        if logging.getLogger(record.name).isEnabledFor(record.levelno):
+            for handler in logging.getLogger(ROOT_LOGGER).handlers:
+                handler.handle(record)
+
+
+_root = logging.getLogger(ROOT_LOGGER)
+_root.propagate = False
+if not _root.handlers:
+    _root.setLevel(logging.DEBUG)  # Let the first record through to _ConfigureOnFirstRecord
+    _root.addHandler(_ConfigureOnFirstRecord())
+
+
+def get_logger(name: str) -> logging.Logger:
+    """The logger for a module, e.g. get_logger('scraper') -> 'bittynews.scraper'."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_article_logger(name: str) -> logging.Logger:
+    """The per-article progress logger for a module (silenced by LOG_ARTICLES=false)."""
+    return logging.getLogger(f"{ARTICLE_LOGGER}.{name}")
+
+
+if __name__ == "__main__":
+    print("--- Testing log_utils.py ---")
+    for fmt in ("text", "json"):
+        configure_logging(level="DEBUG", fmt=fmt)
+        log = get_logger("log_utils")
+        log.debug("Attempting call with model: '%s'", "llama3-8b-8192")
+        log.info("🔎 Starting fetch from %d sources...", 3, extra={"sources": 3})
+        log.error("Processing feed failed", extra={"source": "Example"})
+        get_article_logger("log_utils").info("  Processing: %s...", "An article title")
+    print("--- Test complete ---")
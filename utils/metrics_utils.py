@@ -0,0 +1,259 @@
+# BittyNews/utils/metrics_utils.py
+"""
+In-process counters, gauges and latency histograms, exposed in the Prometheus text format.
+
+    from utils import metrics_utils
+    metrics_utils.LLM_CALLS.inc(provider="groq", outcome="ok")
+    with metrics_utils.LLM_CALL_SECONDS.time(provider="groq"):
+        ...
+
+The registry covers one process. One-shot runs (main.py, the newsletter job, `bittynews.py pipeline`)
+write it to METRICS_TEXTFILE when they finish, for node_exporter's textfile collector. The daemon
+rewrites the file after every stage and, if METRICS_PORT is set, also serves it on
+http://127.0.0.1:<port>/metrics. Updating a metric takes one lock and a dict lookup. Metrics are not
+persisted: pipeline_runs remains the history.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from utils.settings import get_settings
+except ImportError:
+    from settings import get_settings
+
+# --- Metrics Configuration ---
+# Latency buckets in seconds: feed downloads and LLM calls range from ~50 ms to the 30 s timeouts
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_COMMIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+STAGE_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+API_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple[str, ...], key: tuple[str, ...], extra: str = "") -> str:
+    pairs = ['{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = self._samples()
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *samples])
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. LLM calls by provider and outcome."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Current value, e.g. queue depth or the last successful run of a stage."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Latency distribution in cumulative buckets, plus _sum and _count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["buckets"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(_label_key(self.labelnames, labels))
+            return state["count"] if state else 0
+
+    def _samples(self) -> list[str]:
+        samples = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, in_bucket in zip((*self.buckets, float("inf")), state["buckets"]):
+                cumulative += in_bucket
+                le = 'le="{}"'.format(_format_value(bound))
+                samples.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            samples.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(state['sum'], 6))}")
+            samples.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return samples
+
+
+# --- Pipeline metrics ---
+STAGE_RUNS = Counter("bittynews_stage_runs_total", "Pipeline stage executions.", ("stage",))
+STAGE_ITEMS = Counter("bittynews_stage_items_total", "Items into and out of each stage, and errors.", ("stage", "kind"))
+STAGE_SECONDS = Histogram("bittynews_stage_duration_seconds", "Wall time of one stage execution.", ("stage",), STAGE_BUCKETS)
+STAGE_LAST_RUN = Gauge("bittynews_stage_last_run_timestamp_seconds", "Unix time the stage last finished.", ("stage",))
+
+FEED_FETCHES = Counter("bittynews_feed_fetches_total", "Feed downloads by HTTP status ('error' if none).", ("status",))
+FEED_FETCH_SECONDS = Histogram("bittynews_feed_fetch_seconds", "Feed download latency.")
+FEEDS_SKIPPED = Counter("bittynews_feeds_skipped_total", "Sources not polled this scrape.", ("reason",))
+ARTICLES_PARSED = Counter("bittynews_articles_parsed_total", "Feed entries processed, by storage result.", ("result",))
+FULLTEXT_FETCHES = Counter("bittynews_fulltext_fetches_total", "Article page extractions (newspaper3k).", ("outcome",))
+FULLTEXT_FETCH_SECONDS = Histogram("bittynews_fulltext_fetch_seconds", "Article page download + extraction latency.")
+
+LLM_CALLS = Counter("bittynews_llm_calls_total", "LLM requests by provider and outcome.", ("provider", "outcome"))
+LLM_RETRIES = Counter("bittynews_llm_retries_total", "LLM requests retried, by reason.", ("provider", "reason"))
+LLM_CALL_SECONDS = Histogram("bittynews_llm_call_seconds", "LLM request latency.", ("provider",))
+LLM_TOKENS = Counter("bittynews_llm_tokens_total", "LLM tokens used (from the response's usage block, else estimated).", ("provider", "kind"))
+SUMMARY_DEFERRALS = Counter("bittynews_summary_deferrals_total", "Summaries held back by the daily token budget.", ("reason",))
+RULE_DECISIONS = Counter("bittynews_rule_decisions_total", "Rule gate verdicts before the LLM filter (pass or the rejection reason).", ("decision",))
+LLM_CACHE_HITS = Counter("bittynews_llm_cache_hits_total", "Filter/summarize results reused from llm_result_cache.", ("stage",))
+
+DB_COMMITS = Counter("bittynews_db_commits_total", "SQLite commits.")
+DB_COMMIT_SECONDS = Histogram("bittynews_db_commit_seconds", "SQLite commit latency.", buckets=DB_COMMIT_BUCKETS)
+
+EMAILS = Counter("bittynews_emails_total", "Outbox messages handled, by outcome (sent/retrying/failed).", ("outcome",))
+EMAIL_RECIPIENTS = Counter("bittynews_email_recipients_total", "Recipients in outbox messages sent.")
+
+QUEUE_DEPTH = Gauge("bittynews_pipeline_queue_depth", "Articles waiting in the streaming pipeline's queues.", ("queue",))
+
+API_REQUESTS = Counter("bittynews_api_requests_total", "HTTP API requests by route and outcome (hit/miss/not_modified/write/error).", ("route", "outcome"))
+API_REQUEST_SECONDS = Histogram("bittynews_api_request_seconds", "HTTP API time to answer, by route.", ("route",), API_BUCKETS)
+API_WRITE_BATCHES = Histogram("bittynews_api_write_batch_size", "Flag updates applied per write transaction.", buckets=(1, 2, 5, 10, 50, 100, 500))
+
+
+def render_metrics() -> str:
+    """The whole registry in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def write_textfile(path: str | None = None) -> str | None:
+    """
+    Writes the registry to `path` (default METRICS_TEXTFILE) atomically, so a scrape never reads a
+    half-written file. Returns the path, or None if no path is configured.
+    """
+    path = path or get_settings().metrics_textfile
+    if not path:
+        return None
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(render_metrics())
+        os.replace(temp_path, path)
+        return path
+    except OSError as e:
+        print(f"❌ ERROR metrics_utils: Could not write metrics to '{path}': {e}")
+        return None
+
+
+def serve_metrics(port: int | None = None, host: str = "127.0.0.1"):
+    """
+    Serves GET /metrics on a background thread (default port METRICS_PORT; 0 disables it).
+    Returns the HTTP server, or None if disabled. Only binds to localhost by default.
+    """
+    port = get_settings().metrics_port if port is None else port
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args):
+            pass  # One line per Prometheus scrape is noise
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"DEBUG metrics_utils: Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+if __name__ == "__main__":
+    print("--- Testing metrics_utils.py ---")
+    LLM_CALLS.inc(provider="groq", outcome="ok")
+    LLM_CALLS.inc(provider="groq", outcome="http_429")
+    for seconds in (0.08, 0.4, 3.2):
+        LLM_CALL_SECONDS.observe(seconds, provider="groq")
+    QUEUE_DEPTH.set(7, queue="filter")
+    print(render_metrics())
+    print("--- Test complete ---")
@@ -0,0 +1,206 @@
+# BittyNews/utils/outbox_utils.py
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from utils import db_utils
+    from utils import metrics_utils
+except ImportError:
+    import db_utils
+    import metrics_utils
+
+# --- Outbox Configuration ---
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+# Retry n waits OUTBOX_RETRY_BASE_SECONDS * 2**(n-1) (±20% jitter), capped at OUTBOX_RETRY_MAX_SECONDS
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 3600))
+# A 'sending' row whose worker died is claimable again after this long
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 600))
+OUTBOX_CLAIM_SIZE = int(os.getenv("OUTBOX_CLAIM_SIZE", 20))  # Messages claimed per worker round
+# Recipients per outbox row = per Brevo request (same setting as email_utils)
+OUTBOX_BATCH_SIZE = int(os.getenv("BREVO_BATCH_SIZE", 500))
+
+def idempotency_key(run_date: str, subject: str, html_content: str, batch: list[dict]) -> str:
+    """Same day, same content, same recipients -> same key, however often the job is re-run."""
+    digest = hashlib.sha256()
+    for part in (run_date, subject, html_content, *sorted(recipient["email"].lower() for recipient in batch)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"newsletter-{run_date}-{digest.hexdigest()[:32]}"
+
+def enqueue_newsletter(messages: list[dict], run_id: str | None = None, batch_size: int | None = None) -> dict:
+    """
+    Stores rendered newsletters in the outbox and marks their articles as sent, in one transaction.
+
+    Each message is {"subject", "html_content", "text_content" (optional), "recipients", "article_ids"};
+    recipients are split into outbox rows of `batch_size` (default OUTBOX_BATCH_SIZE). A row whose
+    idempotency key already exists is skipped, so re-running the job can't queue a digest twice,
+    and articles are only marked when the queue holds their digest, so a crash can't lose them.
+
+    Returns:
+        dict | None: {"messages": rows added, "recipients": recipients queued, "articles": articles marked},
+        or None if nothing could be queued.
+    """
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    run_date = time.strftime('%Y-%m-%d', time.gmtime())
+    now_iso = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    queued = {"messages": 0, "recipients": 0, "articles": 0}
+    article_ids = set()
+
+    conn = db_utils.get_db_connection()
+    try:
+        with conn:  # One transaction: either the whole run is queued and marked, or nothing is
+            for message in messages:
+                recipients = message["recipients"]
+                for start in range(0, len(recipients), batch_size):
+                    batch = recipients[start:start + batch_size]
+                    cursor = conn.execute('''
+                        INSERT INTO email_outbox (idempotency_key, run_id, subject, html_content, text_content, recipients)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (idempotency_key) DO NOTHING
+                    ''', (idempotency_key(run_date, message["subject"], message["html_content"], batch), run_id,
+                          message["subject"], message["html_content"], message.get("text_content"), json.dumps(batch)))
+                    if cursor.rowcount:
+                        queued["messages"] += 1
+                        queued["recipients"] += len(batch)
+                article_ids.update(message["article_ids"])
+            queued["articles"] = conn.executemany('''
+                UPDATE articles SET sent_in_newsletter_at = ?
+                WHERE id = ? AND sent_in_newsletter_at IS NULL
+            ''', [(now_iso, article_id) for article_id in sorted(article_ids)]).rowcount
+        print(f"DEBUG outbox_utils: Queued {queued['messages']} message(s) for {queued['recipients']} recipient(s); "
+              f"marked {queued['articles']} articles as sent.")
+    except Exception as e:
+        print(f"❌ ERROR outbox_utils: Error queueing newsletter (nothing queued or marked): {e}")
+        return None
+    finally:
+        conn.close()
+    return queued
+
+def _claim_due(limit: int) -> list:
+    """Atomically moves up to `limit` due messages (or abandoned claims) to 'sending'."""
+    conn = db_utils.get_db_connection()
+    try:
+        with conn:
+            return conn.execute('''
+                UPDATE email_outbox
+                SET status = 'sending', locked_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                       OR (status = 'sending' AND locked_at <= datetime('now', ?))
+                    ORDER BY id
+                    LIMIT ?
+                )
+                RETURNING id, idempotency_key, subject, html_content, text_content, recipients, attempts
+            ''', (f"-{OUTBOX_LEASE_SECONDS} seconds", limit)).fetchall()
+    finally:
+        conn.close()
+
+def retry_delay_seconds(attempts: int) -> int:
+    """Exponential backoff with ±20% jitter, so a Brevo outage doesn't get a synchronized retry storm."""
+    delay = min(OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), OUTBOX_RETRY_MAX_SECONDS)
+    return int(delay * random.uniform(0.8, 1.2))
+
+def _record_outcomes(outcomes: list[tuple], totals: dict):
+    """Writes (row, sent, retryable, error) results back and counts them into `totals`; retryable failures are rescheduled."""
+    conn = db_utils.get_db_connection()
+    try:
+        with conn:
+            for row, sent, retryable, error in outcomes:
+                if sent:
+                    conn.execute('''
+                        UPDATE email_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, locked_at = NULL, last_error = NULL
+                        WHERE id = ?
+                    ''', (row["id"],))
+                    totals["sent"] += 1
+                    metrics_utils.EMAILS.inc(outcome="sent")
+                    metrics_utils.EMAIL_RECIPIENTS.inc(len(json.loads(row["recipients"])))
+                elif retryable and row["attempts"] < OUTBOX_MAX_ATTEMPTS:
+                    delay = retry_delay_seconds(row["attempts"])
+                    conn.execute('''
+                        UPDATE email_outbox SET status = 'pending', locked_at = NULL, last_error = ?,
+                            next_attempt_at = datetime('now', ?)
+                        WHERE id = ?
+                    ''', (error, f"+{delay} seconds", row["id"]))
+                    totals["retrying"] += 1
+                    metrics_utils.EMAILS.inc(outcome="retrying")
+                    print(f"DEBUG outbox_utils: Message {row['id']} attempt {row['attempts']} failed ({error}); retrying in {delay}s.")
+                else:
+                    conn.execute('''
+                        UPDATE email_outbox SET status = 'failed', locked_at = NULL, last_error = ? WHERE id = ?
+                    ''', (error, row["id"]))
+                    totals["failed"] += 1
+                    metrics_utils.EMAILS.inc(outcome="failed")
+                    print(f"❌ ERROR outbox_utils: Message {row['id']} failed permanently after {row['attempts']} attempt(s): {error}")
+    finally:
+        conn.close()
+
+def deliver_outbox(max_concurrency: int | None = None, max_messages: int | None = None) -> dict:
+    """
+    Drains due outbox messages: claims them in rounds of OUTBOX_CLAIM_SIZE, sends each with
+    email_utils.send_batch_once on up to `max_concurrency` threads (default BREVO_MAX_CONCURRENCY)
+    sharing one rate limiter, and records the outcome. Messages are sent exactly as rendered.
+    Returns when nothing is due (retries scheduled for later are left for the next call).
+
+    Returns:
+        dict: {"sent", "retrying", "failed"} counted in messages (outbox rows).
+    """
+    try:
+        from utils import email_utils
+    except ImportError:
+        import email_utils
+
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    if not os.getenv("BREVO_API_KEY") or not os.getenv("NEWSLETTER_SENDER_EMAIL"):
+        # Leave the queue untouched rather than burning attempts on a configuration error
+        print("ERROR outbox_utils: BREVO_API_KEY or NEWSLETTER_SENDER_EMAIL not set. Outbox not delivered.")
+        return totals
+
+    max_concurrency = max_concurrency or email_utils.BREVO_MAX_CONCURRENCY
+    limiter = email_utils.RateLimiter(email_utils.BREVO_MAX_REQUESTS_PER_SECOND)
+    handled = 0
+    started = time.perf_counter()
+
+    def send(row):
+        return email_utils.send_batch_once(
+            json.loads(row["recipients"]), row["subject"], row["html_content"], row["text_content"],
+            idempotency_key=row["idempotency_key"], limiter=limiter)
+
+    with ThreadPoolExecutor(max_workers=max(max_concurrency, 1)) as pool:
+        while max_messages is None or handled < max_messages:
+            claim_size = OUTBOX_CLAIM_SIZE if max_messages is None else min(OUTBOX_CLAIM_SIZE, max_messages - handled)
+            rows = _claim_due(claim_size)
+            if not rows:
+                break
+            _record_outcomes([(row, *result) for row, result in zip(rows, pool.map(send, rows))], totals)
+            handled += len(rows)
+
+    print(f"DEBUG outbox_utils: Delivery round done: {totals['sent']} sent, {totals['retrying']} to retry, "
+          f"{totals['failed']} failed in {time.perf_counter() - started:.2f}s.")
+    return totals
+
+def outbox_status() -> dict:
+    """Message and recipient counts per status, plus when the next retry is due."""
+    conn = db_utils.get_db_connection()
+    try:
+        status = {row["status"]: {"messages": row["messages"], "recipients": row["recipients"]}
+                  for row in conn.execute('''
+                      SELECT status, COUNT(*) AS messages, SUM(json_array_length(recipients)) AS recipients
+                      FROM email_outbox GROUP BY status
+                  ''')}
+        status["next_attempt_at"] = conn.execute(
+            "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status = 'pending'").fetchone()[0]
+        return status
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("--- Testing outbox_utils.py ---")
+    print(f"Outbox status: {outbox_status()}")
+    print("--- Test complete ---")
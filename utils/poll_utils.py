@@ -0,0 +1,72 @@
+# BittyNews/utils/poll_utils.py
+import time
+
+try:
+    from utils import db_utils
+    from utils.settings import get_settings
+except ImportError:
+    import db_utils
+    from settings import get_settings
+
+# --- Polling Configuration ---
+# Each source is polled every poll_interval seconds, adapted to how often it actually yields new
+# articles: aim for about POLL_TARGET_NEW_ITEMS new articles per poll, within
+# [POLL_MIN_INTERVAL_SECONDS, POLL_MAX_INTERVAL_SECONDS] (see utils/settings.py).
+# Bounds on how much one poll can change the interval (×2 slower at most, ×2 faster at most)
+POLL_MAX_BACKOFF = 2.0
+POLL_MAX_SPEEDUP = 2.0
+
+def next_poll_interval(previous_interval: float, previous_rate: float, new_items: int,
+                       elapsed_seconds: float | None) -> tuple[float, float]:
+    """
+    Updates a source's smoothed rate (new items per hour) with one poll's result and derives
+    the next interval: POLL_TARGET_NEW_ITEMS / rate, moved at most ×POLL_MAX_SPEEDUP faster or
+    ×POLL_MAX_BACKOFF slower than `previous_interval`, clamped to the min / max poll interval.
+    `elapsed_seconds` is the time since the previous poll (None on the first poll).
+
+    Returns:
+        tuple[float, float]: (next interval in seconds, updated new items per hour)
+    """
+    settings = get_settings()
+    if elapsed_seconds is None or elapsed_seconds <= 0:
+        # First poll: a full feed's worth of "new" items says nothing about its rate
+        return float(settings.poll_initial_interval_seconds), 0.0
+    observed_rate = new_items / (elapsed_seconds / 3600)
+    rate = settings.poll_rate_smoothing * observed_rate + (1 - settings.poll_rate_smoothing) * previous_rate
+    target = settings.poll_target_new_items / rate * 3600 if rate > 0 else settings.poll_max_interval_seconds
+    target = min(max(target, previous_interval / POLL_MAX_SPEEDUP), previous_interval * POLL_MAX_BACKOFF)
+    return min(max(target, settings.poll_min_interval_seconds), settings.poll_max_interval_seconds), rate
+
+def due_sources(sources: list[dict], now: float | None = None) -> tuple[list[dict], dict]:
+    """
+    Splits `sources` (from load_sources) into those due for a poll. Sources never polled are due.
+
+    Returns:
+        tuple[list[dict], dict]: (due sources in config order, {source_name: poll state} for all known sources)
+    """
+    now = time.time() if now is None else now
+    states = db_utils.get_source_poll_states()
+    due = []
+    for source in sources:
+        state = states.get(source.get("name"))
+        if state is None or state["next_poll_ts"] is None or state["next_poll_ts"] <= now:
+            due.append(source)
+    return due, states
+
+def record_poll(source_name: str, new_items: int, state: dict | None = None, polled_at: float | None = None) -> float:
+    """Feeds one poll's new-article count into the source's schedule. Returns the next interval (seconds)."""
+    polled_at = time.time() if polled_at is None else polled_at
+    previous_interval = state["poll_interval_seconds"] if state else get_settings().poll_initial_interval_seconds
+    previous_rate = state["new_items_per_hour"] if state else 0.0
+    elapsed = polled_at - state["last_polled_ts"] if state and state["last_polled_ts"] else None
+    interval, rate = next_poll_interval(previous_interval, previous_rate, new_items, elapsed)
+    db_utils.save_source_poll(source_name, polled_at, new_items, interval, rate)
+    return interval
+
+
+if __name__ == "__main__":
+    print("--- Testing poll_utils.py ---")
+    for name, state in sorted(db_utils.get_source_poll_states().items()):
+        print(f"  {name}: every {state['poll_interval_seconds'] / 60:.0f} min, "
+              f"{state['new_items_per_hour']:.2f} new/h, next poll {state['next_poll_at']} (UTC)")
+    print("--- Test complete ---")
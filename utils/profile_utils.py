@@ -0,0 +1,190 @@
+# BittyNews/utils/profile_utils.py
+"""
+Opt-in profiling for one run: timed spans around the stages and their hot spots, with optional
+cProfile and tracemalloc output per stage.
+
+    python main.py --profile                       # spans + cProfile
+    python main.py --profile spans                 # only the timing table
+    PROFILE=cprofile,tracemalloc python send_newsletter_job.py
+
+Entry points mark their stages with `with profile_utils.stage("scrape"):`, and code marks hot
+spots (feed downloads, newspaper3k, LLM calls, SQLite commits) with `profile_utils.span(...)`.
+Without profiling both return one shared no-op context manager, so they cost nothing. With
+profiling on, both record wall and CPU time, aggregated by name. When a stage's cProfile or
+tracemalloc output is enabled, that output is written to PROFILE_DIR/<timestamp>/ as
+<n>_<stage>.prof (pstats; open it with snakeviz or `python -m pstats`), <n>_<stage>.cprofile.txt
+(top functions by cumulative time) and <n>_<stage>.tracemalloc.txt (the top allocations during
+the stage). report() prints the summary table at the end of the run and also writes it to
+summary.txt.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# --- Profiling Configuration ---
+PROFILE_MODES = ("spans", "cprofile", "tracemalloc")
+DEFAULT_PROFILE_MODES = "spans,cprofile"  # Bare --profile
+PROFILE_TOP_FUNCTIONS = 30   # Lines in each <stage>.cprofile.txt
+PROFILE_TOP_ALLOCATIONS = 20 # Lines in each <stage>.tracemalloc.txt
+
+_NO_SPAN = nullcontext()
+_active: "Profiler | None" = None
+
+
+def parse_modes(value: str | None) -> set[str]:
+    """'cprofile,tracemalloc' -> {'spans', 'cprofile', 'tracemalloc'}; spans come with any mode."""
+    if not value or value.strip().lower() in ("0", "false", "no", "off"):
+        return set()
+    modes = {mode.strip().lower() for mode in value.split(",") if mode.strip()}
+    if modes & {"1", "true", "yes", "on", "all"}:
+        modes = set(PROFILE_MODES) if "all" in modes else set(DEFAULT_PROFILE_MODES.split(","))
+    unknown = modes - set(PROFILE_MODES)
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s) {sorted(unknown)}; choose from {', '.join(PROFILE_MODES)}")
+    return modes | {"spans"}
+
+
+class Profiler:
+    def __init__(self, modes: set[str], run_dir: str | None = None):
+        self.modes = modes
+        self.run_dir = run_dir
+        self.started = time.perf_counter()
+        self.spans = {}  # name -> {"count", "wall", "cpu", "max", "top"}
+        self._order = []  # Names in the order they first ran
+        self._lock = threading.Lock()
+        self._stage_seq = 0
+        if self.wants_files:
+            os.makedirs(self.run_dir, exist_ok=True)
+        if "tracemalloc" in modes:
+            import tracemalloc
+            tracemalloc.start()  # One frame per allocation: enough for per-line stats, far cheaper than full tracebacks
+
+    @property
+    def wants_files(self) -> bool:
+        return bool(self.modes & {"cprofile", "tracemalloc"})
+
+    @contextmanager
+    def span(self, name: str, top: bool = False):
+        # cProfile and tracemalloc snapshots cover the whole process; take them for stages on the main thread only
+        top = top and threading.current_thread() is threading.main_thread()
+        profiler = snapshot = None
+        if top and "cprofile" in self.modes:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        if top and "tracemalloc" in self.modes:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_started, time.process_time() - cpu_started
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                stats = self.spans.get(name)
+                if stats is None:
+                    stats = self.spans[name] = {"count": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0, "top": top}
+                    self._order.append(name)
+                stats["count"] += 1
+                stats["wall"] += wall
+                stats["cpu"] += cpu
+                stats["max"] = max(stats["max"], wall)
+                if top:
+                    self._stage_seq += 1
+                    prefix = os.path.join(self.run_dir or ".", f"{self._stage_seq:02d}_{name.replace('/', '_')}")
+            if snapshot is not None:  # Before the cProfile dump, whose own allocations would show up
+                self._dump_tracemalloc(snapshot, prefix)
+            if profiler is not None:
+                self._dump_cprofile(profiler, prefix)
+
+    def _dump_cprofile(self, profiler, prefix: str):
+        import io
+        import pstats
+        profiler.dump_stats(f"{prefix}.prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(f"{prefix}.cprofile.txt", "w", encoding="utf-8") as handle:
+            handle.write(text.getvalue())
+
+    def _dump_tracemalloc(self, before, prefix: str):
+        import tracemalloc
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        before = before.filter_traces(ignore)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory now {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB",
+                 f"Top {PROFILE_TOP_ALLOCATIONS} allocation growths during the stage:"]
+        for stat in after.compare_to(before, "lineno")[:PROFILE_TOP_ALLOCATIONS]:
+            lines.append(f"  {stat}")
+        tracemalloc.reset_peak()
+        with open(f"{prefix}.tracemalloc.txt", "w", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+    def summary(self) -> str:
+        """Stages first, then the hot-spot spans, with their share of the run's wall time."""
+        total = time.perf_counter() - self.started
+        with self._lock:
+            rows = sorted(self._order, key=lambda name: not self.spans[name]["top"])
+            lines = [f"{'span':<28} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'mean ms':>9} {'max ms':>9} {'% run':>6}"]
+            for name in rows:
+                stats = self.spans[name]
+                label = name if stats["top"] else f"  {name}"
+                lines.append(f"{label[:28]:<28} {stats['count']:>7} {stats['wall']:>9.2f} {stats['cpu']:>9.2f} "
+                             f"{stats['wall'] / stats['count'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f} "
+                             f"{stats['wall'] / total:>6.0%}")
+        lines.append(f"Run wall time {total:.2f}s. Spans (indented) are counted inside their stages too.")
+        return "\n".join(lines)
+
+
+def enable(modes: str | set[str] | None = None, run_dir: str | None = None) -> "Profiler | None":
+    """
+    Turns profiling on for this process. `modes` defaults to $PROFILE and `run_dir` to
+    $PROFILE_DIR/<timestamp> (PROFILE_DIR defaults to ./profiles). Returns None if no mode is set.
+    """
+    global _active
+    modes = parse_modes(os.getenv("PROFILE")) if modes is None else (parse_modes(modes) if isinstance(modes, str) else modes)
+    if not modes:
+        return None
+    if run_dir is None:
+        run_dir = os.path.join(os.getenv("PROFILE_DIR", "profiles"), datetime.now().strftime("%Y%m%d-%H%M%S"))
+    _active = Profiler(modes, run_dir)
+    return _active
+
+
+def stage(name: str):
+    """Context manager for one stage of an entry point: timed, plus cProfile / tracemalloc dumps if enabled."""
+    return _NO_SPAN if _active is None else _active.span(name, top=True)
+
+
+def span(name: str):
+    """Context manager timing a hot spot (`name` aggregates all its calls); a shared no-op without profiling."""
+    return _NO_SPAN if _active is None else _active.span(name)
+
+
+def report() -> str | None:
+    """Prints the span summary (and writes summary.txt to the run directory). None if profiling is off."""
+    if _active is None:
+        return None
+    summary = _active.summary()
+    print(f"\n--- Profile summary ---\n{summary}")
+    if _active.wants_files:
+        with open(os.path.join(_active.run_dir, "summary.txt"), "w", encoding="utf-8") as handle:
+            handle.write(summary + "\n")
+        print(f"Profiles written to {_active.run_dir}/")
+    return summary
+
+
+if __name__ == "__main__":
+    print("--- Testing profile_utils.py ---")
+    enable("spans")
+    for _ in range(3):
+        with stage("stage"):
+            with span("work"):
+                sum(range(200_000))
+            time.sleep(0.01)
+    report()
+    print("--- Test complete ---")
@@ -0,0 +1,135 @@
+# BittyNews/utils/ranking_utils.py
+import os
+import re
+import numpy as np
+
+# --- Ranking Configuration ---
+# Score = source weight × recency decay × content depth × novelty, all computed as arrays over the pool
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("RANK_RECENCY_HALF_LIFE_HOURS", 24))
+# Bodies this long (chars) or longer count as full depth; shorter ones are scaled down on a log curve
+DEPTH_FULL_CHARS = int(os.getenv("RANK_DEPTH_FULL_CHARS", 4000))
+DEPTH_FLOOR = 0.3                  # A feed blurb with no extracted body still keeps 30% of its score
+NOVELTY_WINDOW_DAYS = int(os.getenv("RANK_NOVELTY_WINDOW_DAYS", 14))
+# Title-token Jaccard similarity at which two articles are treated as the same story
+STORY_SIMILARITY = float(os.getenv("RANK_STORY_SIMILARITY", 0.5))
+MAX_PER_SOURCE = int(os.getenv("DIGEST_MAX_PER_SOURCE", 2))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was what "
+    "why with will new says after over into about you your we our".split()
+)
+
+def title_tokens(title: str | None) -> frozenset[str]:
+    """Lower-cased content words of a title, used for story similarity."""
+    return frozenset(token for token in _TOKEN_RE.findall((title or "").lower())
+                     if token not in _STOPWORDS and len(token) > 1)
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _max_similarity(candidate_tokens: list[frozenset], reference_tokens: list[frozenset]) -> np.ndarray:
+    """
+    For each candidate, its highest title Jaccard similarity to any reference title.
+    Built as candidate × reference overlap counts with one matrix product over the reference
+    vocabulary (tokens absent from every reference title can't contribute to an overlap).
+    """
+    if not candidate_tokens or not reference_tokens:
+        return np.zeros(len(candidate_tokens))
+    vocabulary = {token: i for i, token in enumerate(sorted(set().union(*reference_tokens)))}
+    if not vocabulary:
+        return np.zeros(len(candidate_tokens))
+
+    def incidence(token_sets):
+        matrix = np.zeros((len(token_sets), len(vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(token_sets):
+            columns = [vocabulary[token] for token in tokens if token in vocabulary]
+            matrix[row, columns] = 1.0
+        return matrix
+
+    overlap = incidence(candidate_tokens) @ incidence(reference_tokens).T
+    candidate_sizes = np.array([len(tokens) for tokens in candidate_tokens], dtype=np.float32)
+    reference_sizes = np.array([len(tokens) for tokens in reference_tokens], dtype=np.float32)
+    union = candidate_sizes[:, None] + reference_sizes[None, :] - overlap
+    similarity = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+    return similarity.max(axis=1)
+
+def score_candidates(articles: list[dict], sources: list[dict], sent_titles: list[str] | None = None,
+                     token_sets: list[frozenset] | None = None) -> np.ndarray:
+    """
+    Scores every candidate (rows from db_utils.get_articles_for_newsletter) in one pass:
+
+        weight (sources.yaml, default 1.0)
+        × 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+        × depth: log(1 + body_chars) / log(1 + DEPTH_FULL_CHARS), clipped to [DEPTH_FLOOR, 1]
+        × novelty: 1 - highest title similarity to an article sent in the last NOVELTY_WINDOW_DAYS
+
+    Returns:
+        np.ndarray: one float score per article, in input order.
+    """
+    if not articles:
+        return np.zeros(0)
+    weights_by_source = {src["name"]: 1.0 if src.get("weight") is None else float(src["weight"]) for src in sources}
+    weights = np.array([weights_by_source.get(article["source_name"], 1.0) for article in articles])
+    # Unknown ages count as one half-life old rather than brand new
+    age_hours = np.array([article.get("age_hours") for article in articles], dtype=float)
+    age_hours = np.clip(np.nan_to_num(age_hours, nan=RECENCY_HALF_LIFE_HOURS), 0.0, None)
+    recency = np.power(0.5, age_hours / RECENCY_HALF_LIFE_HOURS)
+    body_chars = np.array([article.get("body_chars") or 0 for article in articles], dtype=float)
+    depth = np.clip(np.log1p(body_chars) / np.log1p(DEPTH_FULL_CHARS), DEPTH_FLOOR, 1.0)
+    if token_sets is None:
+        token_sets = [title_tokens(article["title"]) for article in articles]
+    novelty = 1.0 - _max_similarity(token_sets, [title_tokens(title) for title in sent_titles or []])
+    return weights * recency * depth * novelty
+
+def select_diverse(articles: list[dict], order, n: int, max_per_source: int | None = None,
+                   similarity: float | None = None, token_sets: list[frozenset] | None = None) -> list[int]:
+    """
+    Walks candidate positions in `order` (best first, may repeat) and keeps the first `n` that
+    respect the diversity constraints: at most `max_per_source` per source, and one article per
+    story (titles at least `similarity` Jaccard-similar to an already picked one are skipped).
+    If the source cap leaves the digest short, it is relaxed; the one-per-story rule is not.
+    Stops as soon as the digest is full, so `order` can be a long lazy iterator.
+    """
+    max_per_source = MAX_PER_SOURCE if max_per_source is None else max_per_source
+    similarity = STORY_SIMILARITY if similarity is None else similarity
+    if token_sets is None:
+        token_sets = [title_tokens(article["title"]) for article in articles]
+    picked, seen, over_cap, per_source = [], set(), [], {}
+
+    def same_story(position):
+        return any(jaccard(token_sets[position], token_sets[other]) >= similarity for other in picked)
+
+    for position in order:
+        if position in seen:
+            continue
+        seen.add(position)
+        source = articles[position]["source_name"]
+        if max_per_source and per_source.get(source, 0) >= max_per_source:
+            over_cap.append(position)
+            continue
+        if same_story(position):
+            continue
+        picked.append(position)
+        per_source[source] = per_source.get(source, 0) + 1
+        if len(picked) >= n:
+            return picked
+    for position in over_cap:  # Short digest: relax the source cap, best first
+        if len(picked) >= n:
+            break
+        if not same_story(position):
+            picked.append(position)
+    return picked
+
+def rank_order(scores: np.ndarray) -> list[int]:
+    """Positions by descending score; ties keep input order (newest first)."""
+    return np.argsort(-scores, kind="stable").tolist()
+
+def top_positions(scores: np.ndarray, n: int) -> list[int]:
+    """The `n` best positions by descending score (ties: lower position first), without a full sort."""
+    if n >= len(scores):
+        return rank_order(scores)
+    candidates = np.argpartition(-scores, n - 1)[:n]
+    return candidates[np.lexsort((candidates, -scores[candidates]))].tolist()
@@ -0,0 +1,264 @@
+# BittyNews/utils/render_utils.py
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+try:
+    from utils import db_utils
+except ImportError:
+    import db_utils
+
+# --- Rendering Configuration ---
+TEMPLATE_DIR = os.path.join(db_utils.PROJECT_ROOT, "templates")
+# Compiled template bytecode, so a fresh process skips Jinja's parse/compile step
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(db_utils.PROJECT_ROOT, ".cache", "templates"))
+FEED_DIR = os.getenv("FEED_DIR", os.path.join(db_utils.PROJECT_ROOT, "feeds"))
+FEED_ITEM_COUNT = int(os.getenv("FEED_ITEM_COUNT", 50))
+FEED_TITLE = os.getenv("FEED_TITLE", "BittyNews AI Digest")
+FEED_HOME_PAGE_URL = os.getenv("FEED_HOME_PAGE_URL", "https://bittygpt.com/")
+
+# Per output format: the per-article fragment template and the shell the fragments are joined into.
+# JSON Feed items are plain json.dumps() output, so they need no template.
+FORMATS = {
+    "html": {"fragment": "_article.html", "shell": "newsletter.html", "separator": ""},
+    "text": {"fragment": "_article.txt", "shell": "newsletter.txt", "separator": ""},
+    "rss": {"fragment": "_article.rss.xml", "shell": "feed.rss.xml", "separator": ""},
+    "json": {"fragment": None, "shell": None, "separator": ",\n    "},
+}
+FEED_FILES = {"json": "bittynews.json", "rss": "bittynews.xml"}
+
+_SHELL_MARKER = "<!--BITTYNEWS_ARTICLES-->"
+_PUBLISHED_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',             # Common SQLite format from strftime
+    '%a, %d %b %Y %H:%M:%S %z',     # Common RSS format with timezone
+    '%a, %d %b %Y %H:%M:%S %Z',     # Another RSS format
+    '%Y-%m-%dT%H:%M:%SZ',           # ISO 8601 UTC
+    '%Y-%m-%dT%H:%M:%S%z',          # ISO 8601 with offset
+]
+
+def parse_published_date(date_str) -> datetime | None:
+    """published_at as stored (SQLite, RSS or ISO 8601 formats) -> timezone-aware datetime, or None."""
+    if not date_str:
+        return None
+    for fmt in _PUBLISHED_FORMATS:
+        try:
+            dt_obj = datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+        return dt_obj if dt_obj.tzinfo else dt_obj.replace(tzinfo=timezone.utc)  # Stored naive times are UTC
+    return None
+
+def format_published_date(date_str):
+    """Helper to format published_at date string for display."""
+    if not date_str:
+        return "N/A"
+    dt_obj = parse_published_date(date_str)
+    if dt_obj:
+        return dt_obj.strftime('%B %d, %Y') # e.g., June 10, 2025
+    return date_str # Return original if no format matched
+
+_environment = None
+_environment_lock = threading.Lock()
+
+def get_environment() -> Environment:
+    """The process-wide Jinja2 environment: templates are compiled once and their bytecode cached on disk."""
+    global _environment
+    if _environment is None:
+        with _environment_lock:
+            if _environment is None:
+                os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+                _environment = Environment(
+                    loader=FileSystemLoader(TEMPLATE_DIR),
+                    autoescape=select_autoescape(['html', 'xml']),
+                    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+                )
+    return _environment
+
+@lru_cache(maxsize=None)
+def _template_version(fmt: str) -> str:
+    """Hash of the fragment template source, so editing a template invalidates its cached fragments."""
+    template_name = FORMATS[fmt]["fragment"]
+    if template_name is None:
+        return fmt
+    source, _, _ = get_environment().loader.get_source(get_environment(), template_name)
+    return f"{fmt}:{hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]}"
+
+def fragment_input_hash(article: dict, fmt: str) -> str:
+    """Everything a fragment is rendered from: the template version and the article's display fields."""
+    digest = hashlib.sha256(_template_version(fmt).encode("utf-8"))
+    for field in ("title", "link", "source_name", "published_at", "llm_summary"):
+        digest.update(b"\0")
+        digest.update(str(article.get(field) or "").encode("utf-8"))
+    return digest.hexdigest()
+
+def _fragment_context(article: dict) -> dict:
+    published = parse_published_date(article.get("published_at"))
+    return {
+        "title": article["title"],
+        "link": article["link"],
+        "source_name": article["source_name"],
+        "published_at_formatted": format_published_date(article.get("published_at")),
+        "published_at_rfc822": format_datetime(published) if published else None,
+        "published_at_iso": published.isoformat() if published else None,
+        "llm_summary": article["llm_summary"],
+    }
+
+def _render_fragment(article: dict, fmt: str) -> str:
+    context = _fragment_context(article)
+    if fmt == "json":
+        item = {
+            "id": context["link"],
+            "url": context["link"],
+            "title": context["title"],
+            "content_text": context["llm_summary"],
+            "authors": [{"name": context["source_name"]}],
+            "tags": [context["source_name"]],
+        }
+        if context["published_at_iso"]:
+            item["date_published"] = context["published_at_iso"]
+        return json.dumps(item, ensure_ascii=False)
+    return get_environment().get_template(FORMATS[fmt]["fragment"]).render(article=context)
+
+class FragmentCache:
+    """
+    Rendered per-article fragments keyed by (article id, format), valid while the article's
+    fragment_input_hash() matches. An in-memory layer sits in front of the render_cache table,
+    so later runs (re-sends, feeds) reuse what earlier runs rendered.
+    """
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, articles: list[dict], fmt: str) -> list[str]:
+        hashes = [fragment_input_hash(article, fmt) for article in articles]
+        fragments = [None] * len(articles)
+        with self._lock:
+            for i, (article, input_hash) in enumerate(zip(articles, hashes)):
+                cached = self._memory.get((article["id"], fmt))
+                if cached and cached[0] == input_hash:
+                    fragments[i] = cached[1]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        if missing and self.persist:
+            stored = self._load([articles[i]["id"] for i in missing], fmt)
+            for i in missing:
+                hit = stored.get(articles[i]["id"])
+                if hit and hit[0] == hashes[i]:
+                    fragments[i] = hit[1]
+        rendered = []
+        for i in missing:
+            if fragments[i] is None:
+                fragments[i] = _render_fragment(articles[i], fmt)
+                rendered.append((articles[i]["id"], fmt, hashes[i], fragments[i]))
+        if rendered and self.persist:
+            self._store(rendered)
+        with self._lock:
+            for i in missing:
+                self._memory[(articles[i]["id"], fmt)] = (hashes[i], fragments[i])
+        return fragments
+
+    def _load(self, article_ids: list[int], fmt: str) -> dict:
+        conn = db_utils.get_db_connection()
+        try:
+            placeholders = ",".join("?" * len(article_ids))
+            rows = conn.execute(
+                f"SELECT article_id, input_hash, fragment FROM render_cache WHERE format = ? AND article_id IN ({placeholders})",
+                (fmt, *article_ids)).fetchall()
+            return {row["article_id"]: (row["input_hash"], row["fragment"]) for row in rows}
+        except Exception as e:
+            print(f"❌ ERROR render_utils: Error reading render cache: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def _store(self, rows: list[tuple]):
+        conn = db_utils.get_db_connection()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO render_cache (article_id, format, input_hash, fragment) VALUES (?, ?, ?, ?)", rows)
+        except Exception as e:
+            print(f"❌ ERROR render_utils: Error writing render cache: {e}")  # Only costs a re-render next time
+        finally:
+            conn.close()
+
+_default_cache = FragmentCache()
+
+@lru_cache(maxsize=32)
+def _shell(fmt: str, date_str: str, build_date: str | None) -> tuple[str, str]:
+    """
+    (head, tail) around the fragments of one format, rendered once per format, date and build time.
+    `build_date` is only passed for RSS (its lastBuildDate), so the other shells stay cached all day.
+    """
+    if fmt == "json":
+        page = json.dumps({
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": FEED_TITLE,
+            "home_page_url": FEED_HOME_PAGE_URL,
+            "description": f"AI news, filtered and summarized by BittyNews. Updated {date_str}.",
+            "items": [_SHELL_MARKER],
+        }, ensure_ascii=False, indent=2)
+        head, tail = page.split(json.dumps(_SHELL_MARKER), 1)
+        return head, tail
+    page = get_environment().get_template(FORMATS[fmt]["shell"]).render(
+        date=date_str,
+        title=FEED_TITLE,
+        home_page_url=FEED_HOME_PAGE_URL,
+        build_date=build_date,
+        article_fragments=Markup(_SHELL_MARKER),
+    )
+    head, tail = page.split(_SHELL_MARKER, 1)
+    return head, tail
+
+def render_digest(articles: list[dict], fmt: str = "html", date_str: str | None = None,
+                  cache: FragmentCache | None = None, built_at: datetime | None = None) -> str:
+    """
+    One digest (or feed) in `fmt` ('html', 'text', 'json' for JSON Feed 1.1, 'rss' for RSS 2.0):
+    the cached shell with each article's cached fragment in between. Only articles whose fragment
+    isn't cached yet (or whose summary/template changed) are rendered. `built_at` (default: now)
+    is the RSS lastBuildDate.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown digest format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+    date_str = date_str or datetime.now().strftime('%B %d, %Y')
+    build_date = format_datetime(built_at or datetime.now(timezone.utc)) if fmt == "rss" else None
+    head, tail = _shell(fmt, date_str, build_date)
+    fragments = (cache or _default_cache).get_many(articles, fmt)
+    return head + FORMATS[fmt]["separator"].join(fragments) + tail
+
+def write_feeds(articles: list[dict] | None = None, feed_dir: str | None = None) -> dict:
+    """
+    Writes the JSON Feed and RSS output feeds (the last FEED_ITEM_COUNT articles sent in a
+    newsletter, unless `articles` is given) into `feed_dir`, replacing each file atomically.
+
+    Returns:
+        dict: {format: path written}
+    """
+    feed_dir = feed_dir or FEED_DIR
+    articles = db_utils.get_recently_sent_articles(FEED_ITEM_COUNT) if articles is None else articles
+    os.makedirs(feed_dir, exist_ok=True)
+    written = {}
+    built_at = datetime.now(timezone.utc)
+    for fmt, file_name in FEED_FILES.items():
+        path = os.path.join(feed_dir, file_name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(render_digest(articles, fmt, built_at=built_at))
+        os.replace(path + ".tmp", path)
+        written[fmt] = path
+    print(f"DEBUG render_utils: Wrote {len(articles)}-item feeds to {feed_dir}.")
+    return written
+
+
+if __name__ == "__main__":
+    print("--- Testing render_utils.py ---")
+    recent = db_utils.get_recently_sent_articles(5)
+    for output_format in FORMATS:
+        print(f"\n--- {output_format} ({len(recent)} articles) ---")
+        print(render_digest(recent, output_format)[:600])
+    print("--- Test complete ---")
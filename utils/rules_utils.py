@@ -0,0 +1,184 @@
+# BittyNews/utils/rules_utils.py
+"""
+Rule gate in front of the LLM relevance filter (planning/filtering.md, "Pre-Summary Filtering").
+It checks minimum length, age, a title blacklist, language and a keyword score, and rejects
+junk before it costs an LLM call.
+
+The rules come from config/filter_rules.yaml (FILTER_RULES_FILE) and are compiled once per
+process. Every term (blacklist and scored keywords) goes into one table keyed by its word
+n-gram. An article is then tokenized once, and that single pass over its words looks up every
+n-gram that could start at each word (so any number of terms costs the same). It also counts
+stopwords for the language guess, which only looks at the first LANGUAGE_SAMPLE_WORDS words.
+"""
+import calendar
+import os
+import re
+import time
+from dataclasses import dataclass
+
+try:
+    from utils.settings import PROJECT_ROOT, get_settings
+except ImportError:
+    from settings import PROJECT_ROOT, get_settings
+
+# --- Rule Gate Configuration ---
+DEFAULT_RULES_FILE = os.path.join(PROJECT_ROOT, "config", "filter_rules.yaml")
+LANGUAGE_SAMPLE_WORDS = 400    # Words sampled for the language guess
+LANGUAGE_MIN_STOPWORDS = 8     # Fewer stopword hits than this: language unknown, not rejected
+RULES_MODEL_NAME = "rules"     # ai_filter_model_used for articles the gate rejected
+
+_WORD_RE = re.compile(r"\w+(?:[-'.+]\w+)*")
+
+# Short, distinctive stopword lists: enough to tell the languages news feeds usually come in apart
+_STOPWORDS = {
+    "en": "the and of to in is that for with on as are was this by be from at have it not an or which they has were their",
+    "de": "der die und das ist nicht mit von den zu ein eine sich auch auf für des dem im wird sind wurde nach bei",
+    "fr": "le la les et des est une un du pour dans que qui sur pas par au avec sont ce il elle aux plus",
+    "es": "el la los las y de que en un una es por con para del se no al lo como más pero sus",
+    "it": "il di che la per un una non sono del della le gli con si nel è anche ma dei alla",
+    "nl": "de het een en van is dat op te niet met voor zijn ook als bij door aan maar wordt",
+    "pt": "o os de que em um uma para com não do da dos das ao mais se por como mas foi",
+}
+_STOPWORD_LANGUAGES = {}
+for _language, _words in _STOPWORDS.items():
+    for _word in _words.split():
+        _STOPWORD_LANGUAGES.setdefault(_word, []).append(_language)
+
+
+def _tokens(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class RuleDecision:
+    passed: bool
+    score: int
+    reason: str             # "pass", or why it was rejected: too_short, too_old, blacklist, language, score
+    detail: str = ""        # The blacklisted term, detected language, ...
+    language: str | None = None
+
+    @property
+    def label(self) -> str:
+        """What is stored in articles.rule_decision: 'pass' or 'reject:<reason>[:<detail>]'."""
+        if self.passed:
+            return "pass"
+        return f"reject:{self.reason}:{self.detail}" if self.detail else f"reject:{self.reason}"
+
+
+class RuleSet:
+    def __init__(self, config: dict):
+        self.min_chars = int(config.get("min_chars") or 0)
+        self.max_age_days = config.get("max_age_days")
+        self.languages = {language.lower() for language in config.get("languages") or []}
+        self.reject_score = config.get("reject_score")
+        # n-gram (tuple of words) -> (weight, blacklisted); one table for every term
+        self.terms = {}
+        for term in config.get("title_blacklist") or []:
+            self.terms[tuple(_tokens(str(term)))] = (0, True)
+        for weight, terms in (config.get("keywords") or {}).items():
+            for term in terms or []:
+                key = tuple(_tokens(str(term)))
+                _, blacklisted = self.terms.get(key, (0, False))
+                self.terms[key] = (int(weight), blacklisted)
+        self.terms.pop((), None)
+        self.max_ngram = max((len(key) for key in self.terms), default=0)
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        import yaml
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls(yaml.safe_load(handle) or {})
+
+    def _scan(self, words: list[str], matched: set, blacklisted: list | None, language_counts: dict | None):
+        """One pass over `words`: term n-grams into `matched` (blacklisted ones into `blacklisted`), stopwords counted."""
+        terms, max_ngram = self.terms, self.max_ngram
+        for i, word in enumerate(words):
+            if language_counts is not None and i < LANGUAGE_SAMPLE_WORDS:
+                for language in _STOPWORD_LANGUAGES.get(word, ()):
+                    language_counts[language] = language_counts.get(language, 0) + 1
+            for n in range(1, min(max_ngram, len(words) - i) + 1):
+                key = tuple(words[i:i + n]) if n > 1 else (word,)
+                hit = terms.get(key)
+                if hit is not None:
+                    matched.add(key)
+                    if hit[1] and blacklisted is not None:
+                        blacklisted.append(" ".join(key))
+
+    def evaluate(self, title: str, body: str, published_ts: float | None = None, now: float | None = None) -> RuleDecision:
+        title, body = title or "", body or ""
+        title_words, body_words = _tokens(title), _tokens(body)
+        matched, blacklisted, language_counts = set(), [], {}
+        self._scan(title_words, matched, blacklisted, language_counts)
+        self._scan(body_words, matched, None, language_counts)
+        score = sum(self.terms[key][0] for key in matched)
+        language = None
+        if sum(language_counts.values()) >= LANGUAGE_MIN_STOPWORDS:
+            language = max(language_counts, key=language_counts.get)
+
+        if len(title) + len(body) < self.min_chars:
+            return RuleDecision(False, score, "too_short", str(len(title) + len(body)), language)
+        if self.max_age_days is not None and published_ts is not None:
+            age_days = ((time.time() if now is None else now) - published_ts) / 86400
+            if age_days > float(self.max_age_days):
+                return RuleDecision(False, score, "too_old", f"{age_days:.0f}d", language)
+        if blacklisted:
+            return RuleDecision(False, score, "blacklist", blacklisted[0], language)
+        if self.languages and language is not None and language not in self.languages:
+            return RuleDecision(False, score, "language", language, language)
+        if self.reject_score is not None and score <= int(self.reject_score):
+            return RuleDecision(False, score, "score", str(score), language)
+        return RuleDecision(True, score, "pass", "", language)
+
+
+def published_timestamp(article) -> float | None:
+    """Unix time an article (DB row or scraper dict) was published, or None if unknown."""
+    published_at = article.get("published_at")
+    if published_at:
+        try:
+            return calendar.timegm(time.strptime(str(published_at)[:19], "%Y-%m-%d %H:%M:%S")) # Stored in UTC
+        except ValueError:
+            return None # A raw feed date string upsert_article couldn't normalize
+    published_parsed = article.get("published_parsed")
+    return calendar.timegm(published_parsed) if published_parsed else None
+
+
+_rules = None
+_rules_loaded = False
+
+
+def get_rules() -> "RuleSet | None":
+    """The compiled RuleSet from FILTER_RULES_FILE, loaded on first use. None if disabled or missing."""
+    global _rules, _rules_loaded
+    if not _rules_loaded:
+        path = get_settings().filter_rules_file
+        if path and path.lower() not in ("off", "none", "false", "0"):
+            path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+            if os.path.exists(path):
+                _rules = RuleSet.load(path)
+            else:
+                print(f"WARNING rules_utils: {path} not found; articles go to the LLM filter unchecked.")
+        _rules_loaded = True
+    return _rules
+
+
+def evaluate_article(article) -> RuleDecision | None:
+    """The rule decision for an article (row or dict with title, original_summary, published date), None if the gate is off."""
+    rules = get_rules()
+    if rules is None:
+        return None
+    return rules.evaluate(article.get("title") or "", article.get("original_summary") or "", published_timestamp(article))
+
+
+if __name__ == "__main__":
+    print("--- Testing rules_utils.py ---")
+    rules = RuleSet.load(DEFAULT_RULES_FILE)
+    print(f"{len(rules.terms)} terms, longest {rules.max_ngram} words")
+    samples = [
+        ("OpenAI releases a new open source model", "The company said the large language model is available through its API " * 5),
+        ("Sponsored: the best laptop deals", "Save on laptops this week with the deals below " * 5),
+        ("Die neue KI von Google", "Die Firma hat am Montag eine neue Version vorgestellt, die auch auf dem Handy läuft und mit der man sich unterhalten kann " * 3),
+        ("Short", "Too short."),
+    ]
+    for title, body in samples:
+        print(f"  {rules.evaluate(title, body).label:<28} {title}")
+    print("--- Test complete ---")
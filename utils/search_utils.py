@@ -0,0 +1,130 @@
+# BittyNews/utils/search_utils.py
+import sqlite3
+
+try:
+    from utils.db_utils import get_db_connection
+except ImportError:
+    from db_utils import get_db_connection
+
+# bm25() column weights, in articles_fts column order: title, original_summary, llm_summary.
+# A hit in the title is worth much more than one buried in a 3,000-word body.
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+def build_match_query(query: str) -> str:
+    """
+    Turns free text into a safe FTS5 MATCH expression.
+    Each whitespace-separated term is quoted (so 'gpt-4' or 'c++' don't trip the FTS5
+    query parser) and terms are implicitly AND-ed. A trailing '*' keeps prefix matching.
+    """
+    terms = []
+    for raw_term in query.split():
+        prefix = raw_term.endswith("*") and len(raw_term) > 1
+        term = raw_term.rstrip("*") if prefix else raw_term
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_articles(
+    query: str,
+    source: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    relevant_only: bool | None = None,
+    limit: int = 20,
+    raw: bool = False,
+    conn: sqlite3.Connection | None = None,
+    schema: str = "main",
+    include_archives: bool = False,
+) -> list[dict]:
+    """
+    Full-text search over article titles, bodies and LLM summaries, ranked by BM25.
+
+    Args:
+        query (str): Free-text query (or an FTS5 expression when raw=True).
+        source (str, optional): Only articles whose source_name matches exactly.
+        since / until (str, optional): Inclusive date bounds ('YYYY-MM-DD' or full timestamp),
+            compared against published_at, falling back to fetched_at.
+        relevant_only (bool, optional): True / False filters on is_ai_relevant; None means any.
+        limit (int): Maximum results.
+        raw (bool): Pass `query` to FTS5 unmodified (allows OR, NEAR(), column filters).
+        conn (sqlite3.Connection, optional): Connection to reuse (e.g. one with archives ATTACHed).
+        schema (str): Database schema to search on `conn` ('main' or an ATTACHed archive).
+        include_archives (bool): Also search the monthly archive DBs overlapping since/until
+            and interleave each tier's ranked results (see utils/archive_utils.search_all_tiers).
+
+    Returns:
+        list[dict]: id, link, title, source_name, published_at, is_ai_relevant, snippet, rank
+        (lower rank is better, as returned by bm25()).
+    """
+    match_expr = query if raw else build_match_query(query)
+    if not match_expr:
+        return []
+
+    if include_archives:
+        try:
+            from utils import archive_utils
+        except ImportError:
+            import archive_utils
+        return archive_utils.search_all_tiers(
+            query, source=source, since=since, until=until,
+            relevant_only=relevant_only, limit=limit, raw=raw,
+        )
+
+    where = ["articles_fts MATCH ?"]
+    params: list = [match_expr]
+    if source:
+        where.append("a.source_name = ?")
+        params.append(source)
+    if since:
+        where.append("COALESCE(a.published_at, a.fetched_at) >= ?")
+        params.append(since)
+    if until:
+        # A bare date means "through the end of that day"
+        where.append("COALESCE(a.published_at, a.fetched_at) <= ?")
+        params.append(until + " 23:59:59" if len(until) == 10 else until)
+    if relevant_only is not None:
+        where.append("a.is_ai_relevant = ?")
+        params.append(bool(relevant_only))
+    params.append(limit)
+
+    sql = f"""
+        SELECT a.id, a.link, a.title, a.source_name, a.published_at, a.is_ai_relevant,
+               snippet(articles_fts, -1, '[', ']', ' … ', 16) AS snippet,
+               bm25(articles_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS rank
+        FROM {schema}.articles_fts
+        JOIN {schema}.articles a ON a.id = articles_fts.rowid
+        WHERE {' AND '.join(where)}
+        ORDER BY rank
+        LIMIT ?
+    """
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+    except sqlite3.OperationalError as e:
+        print(f"❌ ERROR search_utils: Search failed for query '{query}': {e}")
+        return []
+    finally:
+        if own_conn:
+            conn.close()
+
+def rebuild_search_index():
+    """Rebuilds articles_fts from scratch (e.g. after bulk-loading rows with triggers disabled)."""
+    conn = get_db_connection()
+    try:
+        conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+        conn.commit()
+        print("DEBUG search_utils: Full-text search index rebuilt and optimized.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+    print("--- Testing search_utils.py ---")
+    test_query = " ".join(sys.argv[1:]) or "OpenAI"
+    for hit in search_articles(test_query, limit=5):
+        print(f"  [{hit['rank']:.2f}] {hit['source_name']} | {hit['title'][:60]}")
+        print(f"      {hit['snippet']}")
+    print("--- Test complete ---")
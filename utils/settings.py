@@ -0,0 +1,197 @@
+# BittyNews/utils/settings.py
+"""
+One typed snapshot of the settings read on hot paths (every LLM call, every pipeline loop
+iteration), taken on the first get_settings() call: .env is loaded then, not at import time,
+and os.environ isn't re-read afterwards.
+
+Some utils modules still read configuration constants from the environment at import time
+(DATABASE_NAME in db_utils, the digest, ranking, outbox, render and archive knobs). For those
+to see .env values, every entry point calls get_settings() before importing them: bittynews.py
+before dispatching a command, main.py, send_newsletter_job.py and api.py at the top of the
+module, and pipeline.py and daemon.py by importing main first.
+"""
+import os
+from dataclasses import dataclass
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ENV_FILE = os.path.join(PROJECT_ROOT, ".env")
+
+def _env_bool(value: str | None, default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+@dataclass(frozen=True)
+class Settings:
+    env_loaded: bool
+    # LLM providers (utils/llm_utils.py)
+    groq_api_key: str | None
+    groq_base_url: str
+    openrouter_api_key: str | None
+    openrouter_base_url: str
+    primary_groq_model: str
+    fallback_openrouter_model: str
+    llm_temperature: float
+    llm_max_retries: int
+    llm_base_backoff_seconds: float
+    groq_timeout_seconds: int
+    openrouter_timeout_seconds: int
+    http_referer: str
+    x_title: str
+    # Daily LLM token budget (utils/budget_utils.py)
+    llm_daily_token_budget: int
+    llm_budget_tight_fraction: float
+    llm_offpeak_hours: str
+    llm_low_priority_below: float
+    # Pipeline stages (main.py)
+    filter_delay_seconds: float
+    summary_delay_seconds: float
+    top_n_summaries: int
+    filter_rules_file: str
+    # Streaming pipeline (pipeline.py)
+    pipeline_queue_size: int
+    pipeline_filter_workers: int
+    pipeline_summarize_workers: int
+    # Story clustering and trends (utils/cluster_utils.py)
+    cluster_window_days: int
+    cluster_similarity: float
+    trend_recent_hours: float
+    trend_baseline_hours: float
+    # Scraper (agents/scraper/scraper_agent.py)
+    scraper_user_agent: str
+    scraper_request_timeout: int
+    article_fetch_delay_seconds: float
+    rss_content_fallback_threshold: int
+    article_max_bytes: int
+    article_ttfb_seconds: float
+    # Feed polling (utils/poll_utils.py) and source health (utils/health_utils.py)
+    poll_min_interval_seconds: int
+    poll_max_interval_seconds: int
+    poll_initial_interval_seconds: int
+    poll_target_new_items: float
+    poll_rate_smoothing: float
+    health_quarantine_base_seconds: int
+    health_quarantine_max_seconds: int
+    health_smoothing: float
+    health_fulltext_min_rate: float
+    health_fulltext_min_attempts: int
+    # Shared HTTP session (utils/http_utils.py)
+    http_pool_hosts: int
+    http_pool_maxsize: int
+    # Newsletter (send_newsletter_job.py)
+    brevo_api_key: str | None
+    newsletter_sender_email: str | None
+    newsletter_recipient_email: str | None
+    newsletter_deliver_inline: bool
+    # Daemon stage intervals, seconds (daemon.py)
+    daemon_scrape_interval: int
+    daemon_filter_interval: int
+    daemon_summarize_interval: int
+    daemon_cluster_interval: int
+    daemon_newsletter_interval: int
+    daemon_delivery_interval: int
+    # HTTP API (api.py)
+    api_host: str
+    api_port: int
+    api_cache_entries: int
+    api_page_size: int
+    # Logging and metrics (utils/log_utils.py, utils/metrics_utils.py)
+    log_level: str
+    log_format: str
+    log_articles: bool
+    metrics_textfile: str | None
+    metrics_port: int
+
+    @classmethod
+    def from_env(cls, env=None, env_loaded: bool = False) -> "Settings":
+        env = os.environ if env is None else env
+        return cls(
+            env_loaded=env_loaded,
+            groq_api_key=env.get("GROQ_API_KEY"),
+            groq_base_url=env.get("GROQ_API_BASE_URL", "https://api.groq.com/openai/v1"), # OpenAI-compatible endpoint
+            openrouter_api_key=env.get("OPENROUTER_API_KEY"),
+            openrouter_base_url=env.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            primary_groq_model=env.get("PRIMARY_GROQ_MODEL", "llama3-8b-8192"),
+            fallback_openrouter_model=env.get("FALLBACK_OPENROUTER_MODEL", "mistralai/mistral-7b-instruct"),
+            llm_temperature=float(env.get("LLM_TEMPERATURE", 0.7)),
+            llm_max_retries=int(env.get("LLM_MAX_RETRIES", 3)),
+            llm_base_backoff_seconds=float(env.get("LLM_BASE_BACKOFF_SECONDS", 1.0)),
+            groq_timeout_seconds=int(env.get("GROQ_TIMEOUT_SECONDS", 15)),
+            openrouter_timeout_seconds=int(env.get("OPENROUTER_TIMEOUT_SECONDS", 30)),
+            http_referer=env.get("HTTP_REFERER", "http://localhost:3000"),
+            x_title=env.get("X_TITLE", "BittyNews"),
+            llm_daily_token_budget=int(env.get("LLM_DAILY_TOKEN_BUDGET", 0)), # Tokens per UTC day, all providers; 0 = no budget
+            llm_budget_tight_fraction=float(env.get("LLM_BUDGET_TIGHT_FRACTION", 0.25)), # Budget left below this share = tight
+            llm_offpeak_hours=env.get("LLM_OFFPEAK_HOURS", "0-6"), # UTC hours (start-end, may wrap) when low-priority work runs anyway
+            llm_low_priority_below=float(env.get("LLM_LOW_PRIORITY_BELOW", 0.5)), # Priority (weight x recency) deferred when tight
+            filter_delay_seconds=float(env.get("FILTER_DELAY_SECONDS", 1.5)),
+            summary_delay_seconds=float(env.get("SUMMARY_DELAY_SECONDS", 2.0)),
+            top_n_summaries=int(env.get("TOP_N_SUMMARIES", 5)),
+            filter_rules_file=env.get("FILTER_RULES_FILE", "config/filter_rules.yaml"), # Rule gate before the LLM filter; "off" disables
+            pipeline_queue_size=int(env.get("PIPELINE_QUEUE_SIZE", 50)), # Per queue; a full queue blocks its producers
+            pipeline_filter_workers=int(env.get("PIPELINE_FILTER_WORKERS", 2)),
+            pipeline_summarize_workers=int(env.get("PIPELINE_SUMMARIZE_WORKERS", 1)),
+            cluster_window_days=int(env.get("CLUSTER_WINDOW_DAYS", 14)), # Articles fetched this recently are clustered
+            cluster_similarity=float(env.get("CLUSTER_SIMILARITY", 0.25)), # Cosine to a cluster centroid needed to join it
+            trend_recent_hours=float(env.get("TREND_RECENT_HOURS", 24)), # Window whose article rate is compared...
+            trend_baseline_hours=float(env.get("TREND_BASELINE_HOURS", 72)), # ...with the rate over this window before it
+            scraper_user_agent=env.get("SCRAPER_USER_AGENT", "BittyNewsFetcher/1.0 (+https://your-project-url.com)"),
+            scraper_request_timeout=int(env.get("SCRAPER_REQUEST_TIMEOUT", 15)),
+            article_fetch_delay_seconds=float(env.get("ARTICLE_FETCH_DELAY_SECONDS", 2.0)),
+            rss_content_fallback_threshold=int(env.get("RSS_CONTENT_FALLBACK_THRESHOLD", 150)), # Min chars from newspaper3k
+            article_max_bytes=int(env.get("ARTICLE_MAX_BYTES", 5_000_000)), # Article pages larger than this are abandoned
+            article_ttfb_seconds=float(env.get("ARTICLE_TTFB_SECONDS", 5.0)), # Max wait for an article page to start answering
+            poll_min_interval_seconds=int(env.get("POLL_MIN_INTERVAL_SECONDS", 900)),
+            poll_max_interval_seconds=int(env.get("POLL_MAX_INTERVAL_SECONDS", 6 * 3600)),
+            poll_initial_interval_seconds=int(env.get("POLL_INITIAL_INTERVAL_SECONDS", 1800)), # Sources with no history yet
+            poll_target_new_items=float(env.get("POLL_TARGET_NEW_ITEMS", 3)), # New articles per poll the interval aims for
+            poll_rate_smoothing=float(env.get("POLL_RATE_SMOOTHING", 0.3)), # Weight of the latest poll in the new-items rate
+            health_quarantine_base_seconds=int(env.get("HEALTH_QUARANTINE_BASE_SECONDS", 1800)), # Doubles per consecutive failure...
+            health_quarantine_max_seconds=int(env.get("HEALTH_QUARANTINE_MAX_SECONDS", 2 * 86400)), # ...up to this
+            health_smoothing=float(env.get("HEALTH_SMOOTHING", 0.2)), # Weight of the latest poll in latency / bozo / full-text rates
+            health_fulltext_min_rate=float(env.get("HEALTH_FULLTEXT_MIN_RATE", 0.2)), # Below this, one newspaper3k probe per poll
+            health_fulltext_min_attempts=int(env.get("HEALTH_FULLTEXT_MIN_ATTEMPTS", 10)), # Tries before the rate counts
+            http_pool_hosts=int(env.get("HTTP_POOL_HOSTS", 64)), # Host pools kept open (urllib3's default is 10)
+            http_pool_maxsize=int(env.get("HTTP_POOL_MAXSIZE", 8)), # Keep-alive connections kept per host
+            brevo_api_key=env.get("BREVO_API_KEY"),
+            newsletter_sender_email=env.get("NEWSLETTER_SENDER_EMAIL"), # Should be verified with Brevo
+            newsletter_recipient_email=env.get("NEWSLETTER_RECIPIENT_EMAIL"),
+            newsletter_deliver_inline=_env_bool(env.get("NEWSLETTER_DELIVER_INLINE"), True),
+            daemon_scrape_interval=int(env.get("DAEMON_SCRAPE_INTERVAL", 300)), # Only due sources are fetched, so this is cheap
+            daemon_filter_interval=int(env.get("DAEMON_FILTER_INTERVAL", 600)),
+            daemon_summarize_interval=int(env.get("DAEMON_SUMMARIZE_INTERVAL", 600)),
+            daemon_cluster_interval=int(env.get("DAEMON_CLUSTER_INTERVAL", 3600)), # Story clusters for the trend report
+            daemon_newsletter_interval=int(env.get("DAEMON_NEWSLETTER_INTERVAL", 86400)),
+            daemon_delivery_interval=int(env.get("DAEMON_DELIVERY_INTERVAL", 300)), # Outbox retries
+            api_host=env.get("API_HOST", "127.0.0.1"), # Local only by default: the API has no authentication
+            api_port=int(env.get("API_PORT", 8088)),
+            api_cache_entries=int(env.get("API_CACHE_ENTRIES", 512)), # Responses kept in the in-process LRU cache; 0 disables it
+            api_page_size=int(env.get("API_PAGE_SIZE", 50)), # Articles per page when ?limit= is not given
+            log_level=env.get("LOG_LEVEL", "INFO").upper(), # DEBUG restores the full diagnostic output
+            log_format=env.get("LOG_FORMAT", "text").lower(), # text | json
+            log_articles=_env_bool(env.get("LOG_ARTICLES"), True), # One console line per article
+            metrics_textfile=env.get("METRICS_TEXTFILE") or None, # e.g. /var/lib/node_exporter/bittynews.prom
+            metrics_port=int(env.get("METRICS_PORT", 0)), # Daemon only; 0 = don't serve /metrics
+        )
+
+_settings = None
+
+def load_env_file() -> bool:
+    """Loads .env into os.environ (existing variables win). Returns True if a file was loaded."""
+    from dotenv import load_dotenv
+    return load_dotenv(dotenv_path=ENV_FILE, override=False)
+
+def get_settings() -> Settings:
+    """The settings snapshot, loading .env first on the first call."""
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env(env_loaded=load_env_file())
+    return _settings
+
+
+if __name__ == "__main__":
+    print("--- Testing settings.py ---")
+    settings = get_settings()
+    for field, value in vars(settings).items():
+        print(f"  {field}: {'***' if value and field.endswith('api_key') else value}")
+    print("--- Test complete ---")